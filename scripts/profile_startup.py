@@ -0,0 +1,46 @@
+import argparse
+import sys
+import os
+
+# --- CONFIGURAÇÃO DE PATH ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+sys.path.append(os.path.join(root_dir, "src"))
+
+from core.perfil import PROFILE_FLAG, profile_page
+
+ENTRYPOINT = os.path.join(root_dir, "src", "app", "streamlit_app.py")
+# None = Home; demais relativos ao entrypoint
+PAGINAS = [None, "pages/titulos.py", "pages/carteira.py", "pages/macro.py", "pages/consultor.py"]
+
+# módulos do próprio ambiente (o streamlit.testing já paga por eles em qualquer página)
+IGNORAR = ("streamlit", "encodings", "_")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start das páginas: imports e tempo até o primeiro render")
+    parser.add_argument(PROFILE_FLAG, action="store_true", help="(padrão) mesmo modo do app")
+    parser.add_argument("--top", type=int, default=15, help="quantos imports mostrar por página")
+    parser.add_argument("paginas", nargs="*", help="ex: pages/macro.py (padrão: Home e todas as páginas)")
+    args = parser.parse_args()
+
+    for pagina in args.paginas or PAGINAS:
+        try:
+            r = profile_page(ENTRYPOINT, pagina)
+        except Exception as e:
+            print(f"❌ {pagina or 'Home'}: {e}")
+            continue
+
+        extra = f" (após a Home em {r['home_render_s']:.2f}s)" if pagina else ""
+        print(f"\n⏱️ {r['page']}: primeiro render em {r['first_render_s']:.2f}s{extra} "
+              f"| import do streamlit {r['streamlit_import_s']:.2f}s | {r['modules']} módulos")
+        for exc in r["exceptions"]:
+            print(f"   ⚠️ exceção na página: {exc}")
+
+        imp = r["imports"]
+        imp = imp[(imp["nivel"] == 0) & ~imp["modulo"].str.startswith(IGNORAR)]
+        print(imp.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,37 @@
-from core.datasources.bcb_expectativas import fetch_expectativas_anuais, latest_expectativas_snapshot
+import sys
+
+from core.datasources.bcb_expectativas import (
+    fetch_expectativas_anuais,
+    fetch_expectativas_incremental,
+    latest_expectativas_snapshot,
+    load_historico,
+)
 from core.expectativas import append_expectativas_history
 from core.config import PROCESSED_DIR
+from core.storage import atomic_write_parquet
 
 
 def main():
     anos = list(range(2026, 2046))  # 2026..2035
-    df = fetch_expectativas_anuais(indicadores=["Selic", "IPCA"], anos=anos)
+
+    # padrão: incremental (só datas novas por série). "--full" rebaixa tudo.
+    if "--full" in sys.argv:
+        df = fetch_expectativas_anuais(indicadores=["Selic", "IPCA"], anos=anos)
+    else:
+        df = fetch_expectativas_incremental(indicadores=["Selic", "IPCA"], anos=anos, historico=load_historico())
 
     data_ref, snap = latest_expectativas_snapshot(df)
     if snap.empty:
-        print("Sem dados retornados do BCB.")
+        print("Sem dados novos do BCB.")
         return
 
     out = PROCESSED_DIR / f"expectativas_snapshot_{data_ref.date().isoformat()}.parquet"
-    snap.to_parquet(out, index=False)
+    atomic_write_parquet(snap, out, dataset="expectativas_snapshot")
 
     hist_path = append_expectativas_history(df)
 
     print("Data ref (snapshot):", data_ref.date())
+    print("Linhas novas:", len(df))
     print("Linhas snapshot:", len(snap))
     print("Anos no snapshot:", sorted(snap["ano"].unique().tolist()))
     print("Arquivo salvo:", out)
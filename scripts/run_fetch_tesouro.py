@@ -0,0 +1,43 @@
+import argparse
+import sys
+import os
+
+# --- CONFIGURAÇÃO DE CAMINHOS (CRÍTICO PARA NUVEM) ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+sys.path.append(os.path.join(root_dir, "src"))
+
+from core.datasources.tesouro import RAW_ARCHIVE_PATH, latest_offer_raw
+from core.historico import append_to_history, rebuild_history_from_archive
+from core.transforms.normalize import normalize_oferta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preços e taxas do Tesouro Transparente")
+    parser.add_argument(
+        "--offline", action="store_true",
+        help="não baixa o CSV: reprocessa o histórico a partir do arquivo bruto local",
+    )
+    parser.add_argument("--inicio", help="início do reprocessamento (AAAA-MM-DD)")
+    parser.add_argument("--fim", help="fim do reprocessamento (AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    try:
+        if args.offline:
+            out = rebuild_history_from_archive(start=args.inicio, end=args.fim)
+            print(f"♻️ Histórico reprocessado do arquivo local: {out}")
+            return
+
+        oferta = latest_offer_raw()
+        print(f"✅ Data base: {oferta.data_base.date()} ({len(oferta.df_raw)} linhas)")
+        print(f"🗄️ Arquivo bruto: {RAW_ARCHIVE_PATH}")
+        out = append_to_history(normalize_oferta(oferta.df_raw))
+        print(f"💾 Histórico atualizado: {out}")
+
+    except Exception as e:
+        print(f"❌ Erro Crítico: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
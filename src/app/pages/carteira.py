@@ -84,6 +84,142 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+from core.portfolio import Portfolio, como_portfolio
+
+# --- Dados de mercado (preço atual e duration por título) ---
+def carregar_mercado() -> tuple[pd.DataFrame, pd.DataFrame]:
+    try:
+        from core.titulos_view import titulos_view
+        precos = titulos_view("Venda")
+    except Exception:
+        precos = pd.DataFrame()
+    try:
+        from core.derivados import load_derivado
+        metricas = load_derivado("metricas_risco")
+    except Exception as e:
+        st.warning(f"⚠️ Métricas de risco indisponíveis ({e}): duration estimada pela taxa de compra de cada lote.")
+        metricas = pd.DataFrame()
+    return precos, metricas
+
+def carregar_historico():
+    # índice as-of do histórico (um por versão do dataset, compartilhado entre sessões)
+    try:
+        from core.serie_index import get_serie_index
+        return get_serie_index()
+    except Exception:
+        return None
+
+# --- Carteiras salvas (disco) ---
+def render_carteiras_salvas(carteira: Portfolio):
+    try:
+        from core.carteiras import get_carteiras
+        store = get_carteiras()
+        salvas = store.listar()
+    except Exception as e:
+        st.caption(f"Carteiras salvas indisponíveis: {e}")
+        return
+
+    nome_atual = st.session_state.get("carteira_nome", "Minha Carteira")
+    with st.expander(f"💾 Carteiras salvas · ativa: {nome_atual}", expanded=False):
+        c1, c2, c3 = st.columns([3, 3, 2])
+        with c1:
+            nome = st.text_input("Salvar como", value=nome_atual)
+            if st.button("Salvar", use_container_width=True, disabled=not nome.strip()):
+                st.session_state.portfolio = store.salvar(nome.strip(), carteira)
+                st.session_state.carteira_nome = nome.strip()
+                st.rerun()
+        with c2:
+            opcoes = salvas["nome"].tolist()
+            escolha = st.selectbox("Abrir", opcoes, index=opcoes.index(nome_atual) if nome_atual in opcoes else 0) if opcoes else None
+            b1, b2 = st.columns(2)
+            if b1.button("Abrir", use_container_width=True, disabled=escolha is None):
+                st.session_state.portfolio = store.carregar(escolha)
+                st.session_state.carteira_nome = escolha
+                st.rerun()
+            if b2.button("Excluir", use_container_width=True, disabled=escolha is None):
+                store.excluir(escolha)
+                st.rerun()
+        with c3:
+            if not salvas.empty:
+                st.dataframe(salvas[["nome", "lotes"]], hide_index=True, use_container_width=True)
+
+# --- Histórico (marcação a mercado diária) ---
+def render_historico(carteira: Portfolio):
+    try:
+        from core.mtm import mtm_historico
+        serie = mtm_historico(carteira)
+    except Exception as e:
+        st.caption(f"Histórico indisponível: {e}")
+        return
+
+    st.subheader("📈 Histórico da Carteira")
+    fora = serie.attrs.get("sem_historico", [])
+    if fora:
+        st.caption(f"Lotes sem série no histórico (fora da curva): {', '.join(map(str, fora))}")
+    depois = serie.attrs.get("apos_historico", [])
+    if depois:
+        st.caption(f"Lotes comprados depois do último dia do histórico (entram na próxima atualização): {', '.join(map(str, depois))}")
+    serie = serie[serie["custo"] > 0]
+    if serie.empty:
+        st.info("Nenhum lote comprado dentro do período do histórico.")
+        return
+
+    import plotly.graph_objects as go  # lazy: só quando o gráfico é desenhado
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Scatter(x=serie["data"], y=serie["valor"], name="Valor (MTM)", line=dict(color="#002B49", width=3)))
+    fig.add_trace(go.Scatter(x=serie["data"], y=serie["custo"], name="Custo", line=dict(color="#90A4AE", dash="dot")))
+    fig.add_trace(go.Scatter(x=serie["data"], y=serie["duration"], name="Duration (anos)", line=dict(color="#CFA257")), secondary_y=True)
+    fig.update_layout(template="plotly_white", height=360, margin=dict(l=10, r=10, t=30, b=10), hovermode="x unified", legend=dict(orientation="h"))
+    fig.update_yaxes(title_text="R$", secondary_y=False)
+    fig.update_yaxes(title_text="Duration", secondary_y=True, showgrid=False)
+    st.plotly_chart(fig, use_container_width=True)
+
+    ult = serie.iloc[-1]
+    h1, h2, h3 = st.columns(3)
+    h1.metric(f"Valor em {ult['data']:%d/%m/%Y}", _brl(ult["valor"]))
+    h2.metric("Resultado", _brl(ult["pnl"]), f"{ult['pnl'] / ult['custo']:.2%}")
+    h3.metric("Pior resultado no período", _brl(serie["pnl"].min()))
+
+# --- VaR / Expected Shortfall ---
+def render_var(carteira: Portfolio):
+    try:
+        from core.var import MIN_JANELAS, var_carteira
+        tabela = var_carteira(carteira)
+    except Exception as e:
+        st.caption(f"VaR indisponível: {e}")
+        return
+
+    st.subheader("📉 VaR / Expected Shortfall")
+    if tabela.empty or not tabela.attrs.get("valor"):
+        st.info("Nenhuma posição com histórico de taxas para reprecificar.")
+        return
+    st.caption(
+        f"Posições de {tabela.attrs['data']:%d/%m/%Y} ({_brl(tabela.attrs['valor'])}) reprecificadas "
+        "em cada cenário de variação das taxas: histórico (variações observadas) e Monte Carlo "
+        "(normal com a covariância histórica). Horizonte em dias úteis."
+    )
+    n_hist = int(tabela.loc[(tabela["metodo"] == "Histórico") & (tabela["horizonte"] == 1), "cenarios"].max())
+    if n_hist < MIN_JANELAS:
+        st.warning(f"Histórico curto ({n_hist} variações diárias): estimativas pouco confiáveis.")
+
+    tab = pd.DataFrame({
+        "Método": tabela["metodo"].to_numpy(),
+        "Horizonte": [
+            (f"{h} dia" if h == 1 else f"{h} dias") + (" (√h)" if esc else "")
+            for h, esc in zip(tabela["horizonte"], tabela["escalado"])
+        ],
+        "Nível": tabela["nivel"].map(lambda x: f"{x:.0%}").to_numpy(),
+        "VaR": tabela["var"].map(_brl).to_numpy(),
+        "ES": tabela["es"].map(_brl).to_numpy(),
+        "VaR (% valor)": tabela["var_pct"].map(lambda x: f"{x:.2%}").to_numpy(),
+        "Cenários": tabela["cenarios"].to_numpy(),
+    })
+    st.dataframe(tab, hide_index=True, use_container_width=True)
+    if tabela["escalado"].any():
+        st.caption("(√h): sem janelas históricas suficientes; usa as variações de 1 dia x √h.")
+
 # --- Formatação ---
 def _brl(x: float) -> str:
     return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -117,7 +253,12 @@ def render():
         st.markdown("<h1 style='margin-top: 0; font-size: 32px; color: #002B49;'>Minha Carteira</h1>", unsafe_allow_html=True)
         st.caption("Monitoramento de risco, duration e testes de estresse.")
 
-    if "portfolio" not in st.session_state or not st.session_state.portfolio:
+    carteira = como_portfolio(st.session_state.get("portfolio"))
+    st.session_state.portfolio = carteira
+
+    render_carteiras_salvas(carteira)
+
+    if carteira.vazia:
         st.info("👈 Sua carteira está vazia.")
         st.markdown("""
         <div style="background-color: white; padding: 20px; border-radius: 10px; border: 1px solid #DDD;">
@@ -127,17 +268,13 @@ def render():
         """, unsafe_allow_html=True)
         return
 
-    # Cálculos
-    total_investido = 0.0
-    soma_duration_ponderada = 0.0
-    
-    for item in st.session_state.portfolio:
-        val_total = item["pu_compra"] * item["qtd"]
-        total_investido += val_total
-        dur = item["metrics"].get("duration_modified_anos", 0)
-        soma_duration_ponderada += (dur * val_total)
-    
-    duration_media = soma_duration_ponderada / total_investido if total_investido > 0 else 0
+    # Cálculos (vetorizados sobre os lotes)
+    precos, metricas = carregar_mercado()
+    val = carteira.valorizar(precos, historico=carregar_historico())
+    risco = carteira.risco(val, metricas)
+    total_investido = risco["valor_total"]
+    soma_duration_ponderada = risco["duration_media"] * total_investido
+    duration_media = risco["duration_media"]
 
     if duration_media < 2: nivel = "🟢 Baixa (Conservador)"
     elif duration_media < 6: nivel = "🟡 Média (Moderado)"
@@ -148,12 +285,38 @@ def render():
     k1, k2, k3 = st.columns(3)
     
     with k1:
-        st.markdown(f"""<div class="kpi-card"><div class="kpi-label">Patrimônio Total</div><div class="kpi-value">{_brl(total_investido)}</div></div>""", unsafe_allow_html=True)
+        st.markdown(f"""<div class="kpi-card"><div class="kpi-label">Patrimônio Total</div><div class="kpi-value">{_brl(total_investido)}</div><div style="font-size: 12px; color: #888;">Custo {_brl(risco['custo_total'])}</div></div>""", unsafe_allow_html=True)
     with k2:
-        st.markdown(f"""<div class="kpi-card" style="border-left-color: #CFA257;"><div class="kpi-label">Duration Média</div><div class="kpi-value">{duration_media:.2f} Anos</div></div>""", unsafe_allow_html=True)
+        st.markdown(f"""<div class="kpi-card" style="border-left-color: #CFA257;"><div class="kpi-label">Duration Média</div><div class="kpi-value">{duration_media:.2f} Anos</div><div style="font-size: 12px; color: #888;">DV01 {_brl(risco['dv01'])}</div></div>""", unsafe_allow_html=True)
     with k3:
         st.markdown(f"""<div class="kpi-card" style="border-left-color: #999;"><div class="kpi-label">Nível de Risco</div><div class="kpi-value" style="font-size: 18px; padding-top: 4px;">{nivel}</div></div>""", unsafe_allow_html=True)
 
+    if risco["dmod_estimado"]:
+        st.caption(f"Lotes sem métrica de risco atual, duration estimada pela taxa de compra: {', '.join(map(str, risco['dmod_estimado']))}")
+    if val.attrs.get("pu_historico"):
+        st.caption(f"Lotes fora do catálogo atual, marcados pelo último PU do histórico: {', '.join(map(str, val.attrs['pu_historico']))}")
+
+    # --- Composição ---
+    g1, g2 = st.columns(2)
+    for col, por, titulo in ((g1, "indexador", "Por indexador"), (g2, "ano", "Por ano de vencimento")):
+        agg = carteira.agregar(val, por=por)
+        tab = pd.DataFrame({
+            titulo: agg[por].astype(str).to_numpy(),
+            "Valor": agg["valor_atual"].map(_brl).to_numpy(),
+            "Resultado": agg["resultado"].map(_brl).to_numpy(),
+            "Peso": agg["peso"].map(lambda x: f"{x:.1%}").to_numpy(),
+            "Lotes": agg["lotes"].to_numpy(),
+        })
+        col.dataframe(tab, hide_index=True, use_container_width=True)
+
+    st.markdown("---")
+
+    render_historico(carteira)
+
+    st.markdown("---")
+
+    render_var(carteira)
+
     st.markdown("---")
 
     # --- Stress Test ---
@@ -195,63 +358,55 @@ def render():
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-    # --- Lista de Ativos (Layout Novo e Limpo) ---
+    # --- Lotes (tabela editável: exclusão e quantidade aplicadas em bloco) ---
     st.markdown("<br>", unsafe_allow_html=True)
     st.subheader("📋 Ativos Custodiados")
 
-    # Headers alinhados
-    # Usamos container border=False para alinhar, mas o fundo é cinza da página
-    h1, h2, h3, h4, h5 = st.columns([3, 2, 2, 2, 1])
-    h1.markdown("**TÍTULO**")
-    h2.markdown("**TAXA**")
-    h3.markdown("**VENCIMENTO**")
-    h4.markdown("**VALOR**")
-    h5.markdown("")
-
-    for i, item in enumerate(st.session_state.portfolio):
-        val_total_item = item["pu_compra"] * item["qtd"]
-        
-        # Cria um container branco (Card) para cada linha
-        # Isso substitui a DIV HTML manual e corrige o layout
-        with st.container():
-            st.markdown(
-                """<div style="background-color: white; border-radius: 12px; padding: 10px; border: 1px solid #E0E0E0; margin-bottom: 8px;">""", 
-                unsafe_allow_html=True
-            )
-            
-            # ATENÇÃO: vertical_alignment='center' é a chave aqui! (Requer Streamlit > 1.31)
-            # Se der erro, remova o argumento, mas a maioria já tem atualizado.
-            try:
-                c1, c2, c3, c4, c5 = st.columns([3, 2, 2, 2, 1], vertical_alignment="center")
-            except TypeError:
-                # Fallback para versões antigas
-                c1, c2, c3, c4, c5 = st.columns([3, 2, 2, 2, 1])
-
-            with c1:
-                st.markdown(f"<div class='cell-title'>{item['id']}</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='cell-label'>{item['indexador']}</div>", unsafe_allow_html=True)
-            
-            with c2:
-                st.markdown(f"<div class='cell-value'>{item['taxa_compra']:.2f}%</div>", unsafe_allow_html=True)
-            
-            with c3:
-                st.markdown(f"<div class='cell-value'>{item['vencimento'].strftime('%d/%m/%Y')}</div>", unsafe_allow_html=True)
-            
-            with c4:
-                st.markdown(f"<div class='cell-value'>{_brl(val_total_item)}</div>", unsafe_allow_html=True)
-            
-            with c5:
-                # Botão de Lixeira limpo e nativo
-                if st.button("🗑️", key=f"del_{i}", help="Remover"):
-                    st.session_state.portfolio.pop(i)
-                    st.rerun()
+    grade = pd.DataFrame({
+        "Remover": False,
+        "Lote": carteira.lote,
+        "Título": carteira.titulo,
+        "Indexador": carteira.indexador,
+        "Taxa": carteira.taxa_compra,
+        "Vencimento": pd.to_datetime(carteira.vencimento),
+        "Compra": pd.to_datetime(carteira.data_compra),
+        "Qtd": carteira.qtd,
+        "Custo": val["custo"].to_numpy(),
+        "Valor": val["valor_atual"].to_numpy(),
+    })
+    editada = st.data_editor(
+        grade,
+        hide_index=True,
+        use_container_width=True,
+        disabled=["Lote", "Título", "Indexador", "Taxa", "Vencimento", "Compra", "Custo", "Valor"],
+        column_config={
+            "Remover": st.column_config.CheckboxColumn("🗑️", help="Marque para remover"),
+            "Taxa": st.column_config.NumberColumn(format="%.2f%%"),
+            "Vencimento": st.column_config.DateColumn(format="DD/MM/YYYY"),
+            "Compra": st.column_config.DateColumn(format="DD/MM/YYYY"),
+            "Qtd": st.column_config.NumberColumn(min_value=0.0, format="%.4f"),
+            "Custo": st.column_config.NumberColumn(format="R$ %.2f"),
+            "Valor": st.column_config.NumberColumn(format="R$ %.2f"),
+        },
+        key="editor_lotes",
+    )
 
-            st.markdown("</div>", unsafe_allow_html=True) # Fecha o container visual
+    remover = editada.loc[editada["Remover"], "Lote"].to_numpy()
+    mudou_qtd = editada["Qtd"].to_numpy() != grade["Qtd"].to_numpy()
+    if len(remover) or mudou_qtd.any():
+        if st.button("Aplicar alterações", type="primary"):
+            nova = carteira
+            if mudou_qtd.any():
+                nova = nova.editar(editada.loc[mudou_qtd, "Lote"].to_numpy(), qtd=editada.loc[mudou_qtd, "Qtd"].to_numpy())
+            if len(remover):
+                nova = nova.remover(remover)
+            st.session_state.portfolio = nova
+            st.rerun()
 
     st.markdown("<br>", unsafe_allow_html=True)
     
     if st.button("Limpar Carteira Completa", type="secondary"):
-        st.session_state.portfolio = []
+        st.session_state.portfolio = Portfolio.vazio()
         st.rerun()
 
 if __name__ == "__main__":
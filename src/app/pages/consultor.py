@@ -2,7 +2,6 @@ import sys
 import os
 import streamlit as st
 import pandas as pd
-import google.generativeai as genai
 from datetime import datetime
 from pathlib import Path
 
@@ -52,9 +51,15 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- SDK DO GEMINI (IMPORT LAZY: SÓ QUANDO A PÁGINA PRECISA) ---
+def _genai():
+    import google.generativeai as genai
+    return genai
+
 # --- FUNÇÃO QUE CAÇA O MODELO CERTO (A SALVAÇÃO) ---
 def descobrir_modelo_disponivel():
     try:
+        genai = _genai()
         # Tenta pegar dos secrets ou variáveis de ambiente
         api_key = st.secrets.get("GOOGLE_API_KEY")
         if not api_key: return None
@@ -195,7 +200,7 @@ def render():
             
             try:
                 # Cria o modelo usando o nome descoberto dinamicamente (evita erro 404)
-                model = genai.GenerativeModel(modelo_nome)
+                model = _genai().GenerativeModel(modelo_nome)
                 
                 # Monta histórico para contexto
                 historico = "\n".join([f"{m['role']}: {m['content']}" for m in st.session_state.messages[-4:]])
@@ -2,14 +2,11 @@ import sys
 import os
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from pathlib import Path
 from datetime import datetime
 
 # --- CONFIGURAÇÃO DE CAMINHOS ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
-possible_roots = [Path(root_dir), Path(os.getcwd()), Path("/mount/src/tesouro-quant")]
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -54,31 +51,31 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- FUNÇÃO DE CARGA ---
-def carregar_arquivo(nome_arquivo):
-    for root in possible_roots:
-        path = root / "data" / "processed" / nome_arquivo
-        if path.exists(): return pd.read_parquet(path), path
-        path_local = Path("data/processed") / nome_arquivo
-        if path_local.exists(): return pd.read_parquet(path_local), path_local
-    return pd.DataFrame(), None
-
-# --- CARGA DE DADOS ---
-df_focus, _ = carregar_arquivo("focus_ipca.parquet")
-df_titulos, _ = carregar_arquivo("tesouro_catalogo_2026-01-28.parquet")
-if df_titulos.empty:
-    try:
-        p = Path("data/processed")
-        files = sorted(list(p.glob("tesouro_catalogo_*.parquet")))
-        if files: df_titulos = pd.read_parquet(files[-1])
-    except: pass
-
-# --- PREPARAÇÃO DOS DADOS ---
-if not df_titulos.empty:
-    if 'vencimento' in df_titulos.columns: df_titulos['vencimento'] = pd.to_datetime(df_titulos['vencimento'])
-    if 'data_base' in df_titulos.columns: df_titulos['data_base'] = pd.to_datetime(df_titulos['data_base'])
-    else: df_titulos['data_base'] = pd.Timestamp.now()
-    
-    df_titulos['prazo_anos'] = (df_titulos['vencimento'] - df_titulos['data_base']).dt.days / 365.25
+sys.path.append(os.path.join(root_dir, "src"))
+try:
+    from core.store import get_store
+except ImportError:
+    get_store = None
+
+def carregar_arquivo(nome_dataset):
+    # store do processo: um único load por versão, compartilhado entre sessões
+    if get_store is None: return pd.DataFrame(), None
+    store = get_store()
+    return store.frame(nome_dataset), store.path(nome_dataset)
+
+# --- CARGA E PREPARAÇÃO DOS DADOS (a cada render, nada no import) ---
+def carregar_dados():
+    df_focus, _ = carregar_arquivo("focus_ipca")
+    df_titulos, _ = carregar_arquivo("tesouro_catalogo")
+
+    if not df_titulos.empty:
+        if 'vencimento' in df_titulos.columns: df_titulos['vencimento'] = pd.to_datetime(df_titulos['vencimento'])
+        if 'data_base' in df_titulos.columns: df_titulos['data_base'] = pd.to_datetime(df_titulos['data_base'])
+        else: df_titulos['data_base'] = pd.Timestamp.now()
+        
+        df_titulos['prazo_anos'] = (df_titulos['vencimento'] - df_titulos['data_base']).dt.days / 365.25
+
+    return df_focus, df_titulos
 
 # --- SIDEBAR ---
 def render_sidebar():
@@ -93,8 +90,103 @@ def render_sidebar():
         st.page_link("pages/consultor.py", label="Consultor U AI", icon="🤖")
         st.markdown("---")
 
+# --- HISTÓRICO DE TAXAS (consultas nomeadas da camada analítica) ---
+def render_historico_taxas():
+    try:
+        from core.analytics import AnalyticsUnavailable, get_engine
+        engine = get_engine()
+        periodo = engine.sql(
+            "SELECT CAST(min(data_base) AS DATE) AS inicio, CAST(max(data_base) AS DATE) AS fim FROM tesouro_historico"
+        ).to_pylist()[0]
+    except AnalyticsUnavailable as e:
+        st.info(f"Histórico indisponível: {e}")
+        return
+    except Exception:
+        st.info("Histórico do Tesouro ainda não gerado (rode a atualização de dados).")
+        return
+    inicio, fim = periodo["inicio"], periodo["fim"]
+    if inicio is None:
+        st.info("Histórico do Tesouro vazio.")
+        return
+
+    c1, c2 = st.columns(2)
+    de = c1.date_input("De", value=inicio, min_value=inicio, max_value=fim)
+    ate = c2.date_input("Até", value=fim, min_value=inicio, max_value=fim)
+    params = {"inicio": str(de), "fim": str(ate)}
+
+    medias = engine.query("taxa_media_indexador", **params).to_pandas()
+    if medias.empty:
+        st.warning("Nenhuma cotação no período.")
+        return
+
+    import plotly.express as px  # lazy: só quando o gráfico é desenhado
+
+    fig = px.line(
+        medias, x="data_base", y="taxa_media", color="indexador",
+        title="<b>Taxa média por indexador</b>",
+        labels={"taxa_media": "Taxa média (% a.a.)", "data_base": "Data"},
+        color_discrete_map={"PREFIXADO": "#D32F2F", "IPCA": "#1976D2", "SELIC": "#388E3C"},
+    )
+    fig.update_layout(height=420, hovermode="x unified", template="plotly_white", legend=dict(orientation="h"))
+    st.plotly_chart(fig, use_container_width=True)
+
+    stats = engine.query("estatisticas_titulos", **params).to_pandas()
+    st.dataframe(
+        stats[["id_titulo", "indexador", "n", "taxa_atual", "taxa_media", "taxa_desvio", "taxa_min", "taxa_max"]],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "id_titulo": "Título", "indexador": "Indexador", "n": "Dias",
+            "taxa_atual": st.column_config.NumberColumn("Atual", format="%.2f%%"),
+            "taxa_media": st.column_config.NumberColumn("Média", format="%.2f%%"),
+            "taxa_desvio": st.column_config.NumberColumn("Desvio", format="%.2f"),
+            "taxa_min": st.column_config.NumberColumn("Mín", format="%.2f%%"),
+            "taxa_max": st.column_config.NumberColumn("Máx", format="%.2f%%"),
+        },
+    )
+    st.caption("Fonte: histórico do Tesouro Direto (consultas DuckDB sobre os parquets processados).")
+
+    render_titulo_vs_macro(de, ate)
+
+# --- TÍTULO x SELIC / FOCUS (o que era conhecido em cada data do histórico) ---
+def render_titulo_vs_macro(de, ate):
+    try:
+        from core.asof import historico_macro
+        df = historico_macro()
+    except Exception as e:
+        st.caption(f"Alinhamento com Selic/Focus indisponível: {e}")
+        return
+    if df.empty:
+        return
+
+    st.markdown("##### Taxa do título x Selic e Focus vigentes")
+    ids = sorted(df["id_titulo"].astype(str).unique())
+    escolha = st.selectbox("Título", ids)
+    dias = pd.to_datetime(df["data_base"])
+    sel = df[(df["id_titulo"].astype(str) == escolha) & (dias >= pd.Timestamp(de)) & (dias <= pd.Timestamp(ate))]
+    if sel.empty:
+        st.info("Título sem cotação no período.")
+        return
+
+    series = {
+        "taxa_compra": "Taxa do título",
+        "selic_meta": "Meta Selic",
+        "focus_selic_ano": "Focus Selic (ano)",
+        "focus_ipca_ano": "Focus IPCA (ano)",
+    }
+    longo = sel.melt(id_vars="data_base", value_vars=list(series), var_name="serie", value_name="taxa").dropna()
+    longo["serie"] = longo["serie"].map(series)
+
+    import plotly.express as px  # lazy: só quando o gráfico é desenhado
+
+    fig = px.line(longo, x="data_base", y="taxa", color="serie", labels={"taxa": "% a.a.", "data_base": "Data", "serie": ""})
+    fig.update_layout(height=380, hovermode="x unified", template="plotly_white", legend=dict(orientation="h"))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Em cada data, a Meta Selic e a mediana Focus mais recentes publicadas até aquele dia.")
+
 def render():
     render_sidebar()
+    df_focus, df_titulos = carregar_dados()
 
     # --- HEADER ---
     c_back, c_title = st.columns([1, 5]) 
@@ -111,7 +203,7 @@ def render():
     st.markdown("<br>", unsafe_allow_html=True)
 
     # --- TABS (SEM BREAKEVEN) ---
-    tab1, tab2 = st.tabs(["📉 Curva de Juros (Nominal)", "🔮 Boletim Focus"])
+    tab1, tab2, tab3 = st.tabs(["📉 Curva de Juros (Nominal)", "🔮 Boletim Focus", "📜 Histórico de Taxas"])
 
     # === ABA 1: CURVA DE JUROS ===
     with tab1:
@@ -135,7 +227,7 @@ def render():
             c_filt1, c_filt2 = st.columns(2)
             
             # Filtro Indexador
-            all_indexes = df_titulos['indexador'].unique()
+            all_indexes = df_titulos['indexador'].astype(str).unique()
             sel_indexes = c_filt1.multiselect("1. Filtrar Família", all_indexes, default=['PREFIXADO', 'IPCA'])
             
             # Filtro Títulos
@@ -170,6 +262,8 @@ def render():
                 # --- GRÁFICO (DENTRO DO CARD BRANCO) ---
                 st.markdown("<div class='chart-card'>", unsafe_allow_html=True)
                 
+                import plotly.express as px  # lazy: só quando o gráfico é desenhado
+
                 fig = px.line(
                     df_chart.sort_values('prazo_anos'), 
                     x="vencimento", 
@@ -241,5 +335,10 @@ def render():
         else:
             st.warning("Dados do Focus não encontrados.")
 
+    # === ABA 3: HISTÓRICO ===
+    with tab3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        render_historico_taxas()
+
 if __name__ == "__main__":
     render()
@@ -60,36 +60,31 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- FUNÇÃO DE CARGA BLINDADA (ROBUSTEZ TOTAL) ---
+try:
+    from core.store import get_store
+    from core.titulos_view import fmt_taxa, titulos_view
+    from core.simulador import ipca_breakeven, sensibilidade, simular_catalogo, taxa_para_alvo, valor_para_alvo
+    from core.projecao import focus_por_ano, projetar_trajetorias
+    from core.montecarlo import calibracao, monte_carlo
+    from core.portfolio import Portfolio, como_portfolio
+except ImportError as e:
+    # sem o core a página não tem o que mostrar: render() avisa e para
+    _erro_import = e
+else:
+    _erro_import = None
+
+def carregar_dataset(nome: str):
+    """
+    Versão atual de um dataset, vinda do store do processo (compartilhado entre sessões).
+    Retorna (df, caminho).
+    """
+    store = get_store()
+    return store.frame(nome), store.path(nome)
+
 def carregar_dados_blindado():
-    """Tenta carregar o catálogo de qualquer lugar possível."""
+    """Carrega o catálogo atual (resolvido pelo manifest, sem varrer pastas)."""
     try:
-        # 1. Tenta definir onde buscar
-        possible_paths = [
-            Path(root_dir) / "data" / "processed",           # Caminho relativo calculado
-            Path("data/processed"),                          # Caminho relativo simples
-            Path("/mount/src/tesouro-quant/data/processed"), # Caminho absoluto Streamlit Cloud
-            Path(os.getcwd()) / "data" / "processed"         # Caminho absoluto local
-        ]
-        
-        found_file = None
-        
-        # 2. Varre as pastas
-        for pasta in possible_paths:
-            if pasta.exists():
-                # Busca arquivos que começam com 'tesouro_catalogo'
-                files = list(pasta.glob("tesouro_catalogo_*.parquet"))
-                if files:
-                    # Pega o último (mais recente)
-                    found_file = sorted(files)[-1]
-                    break
-        
-        # 3. Carrega se achou
-        if found_file:
-            df = pd.read_parquet(found_file)
-            return df, str(found_file)
-            
-        return pd.DataFrame(), None
-
+        return carregar_dataset("tesouro_catalogo")
     except Exception as e:
         return pd.DataFrame(), None
 
@@ -97,12 +92,6 @@ def carregar_dados_blindado():
 def _pct(x): return f"{x:.2f}%" if pd.notna(x) else "-"
 def _brl(x): return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) else "-"
 
-def calcular_aliquota_ir(dias: int) -> float:
-    if dias <= 180: return 22.5
-    if dias <= 360: return 20.0
-    if dias <= 720: return 17.5
-    return 15.0
-
 def fmt_taxa_humanizada(row, col_taxa):
     val = row.get(col_taxa)
     if pd.isna(val): return "-"
@@ -134,49 +123,28 @@ def analisar_oportunidade(row, ipca_proj):
     
     return score_visual, insights
 
-# Tenta importar metricas do core, se falhar usa dummy
-try:
-    from core.precificacao import compute_duration_metrics
-except ImportError:
-    def compute_duration_metrics(row, modo): return {}
-
 # --- FUNÇÃO DE DADOS DE MERCADO (SELIC/FOCUS) ---
 def get_market_data():
     ipca_ref = 4.0
     selic_ref = 11.25
     
-    # Define onde procurar (mesma lógica blindada)
-    possible_paths = [
-        Path(root_dir) / "data" / "processed",
-        Path("data/processed")
-    ]
-    
-    target_path = None
-    for p in possible_paths:
-        if p.exists():
-            target_path = p
-            break
-            
-    if target_path:
-        # Focus
-        try:
-            path_focus = target_path / "focus_ipca.parquet"
-            if path_focus.exists():
-                df_focus = pd.read_parquet(path_focus)
-                ano_alvo = datetime.now().year
-                row = df_focus[df_focus['DataReferencia'] == ano_alvo]
-                if not row.empty:
-                    ipca_ref = row['Mediana'].iloc[0]
-        except: pass
-
-        # Selic
-        try:
-            path_selic = target_path / "selic_meta_sgs.parquet"
-            if path_selic.exists():
-                df_selic = pd.read_parquet(path_selic)
-                # Pega ultima linha
-                selic_ref = df_selic.iloc[-1]['valor']
-        except: pass
+    # Focus
+    try:
+        df_focus, _ = carregar_dataset("focus_ipca")
+        if not df_focus.empty:
+            ano_alvo = datetime.now().year
+            row = df_focus[df_focus['DataReferencia'] == ano_alvo]
+            if not row.empty:
+                ipca_ref = float(row['Mediana'].iloc[0])
+    except: pass
+
+    # Selic
+    try:
+        df_selic, _ = carregar_dataset("selic_meta_sgs")
+        if not df_selic.empty:
+            # Pega ultima linha
+            selic_ref = float(df_selic.iloc[-1]['valor'])
+    except: pass
 
     return ipca_ref, selic_ref
 
@@ -195,9 +163,12 @@ def render_sidebar():
 # --- RENDERIZAÇÃO DA PÁGINA ---
 def render():
     render_sidebar()
+    if _erro_import is not None:
+        st.error(f"⚠️ Não foi possível carregar os módulos do simulador: {_erro_import}")
+        st.stop()
     st.markdown("<h1 style='margin-top: 0; font-size: 32px; color: #002B49;'>Simulador de Mercado</h1>", unsafe_allow_html=True)
 
-    if "portfolio" not in st.session_state: st.session_state.portfolio = []
+    if "portfolio" not in st.session_state: st.session_state.portfolio = Portfolio.vazio()
 
     # CARREGAMENTO DE DADOS BLINDADO
     df, path_used = carregar_dados_blindado()
@@ -208,52 +179,22 @@ def render():
         # Debug discreto
         with st.expander("Detalhes Técnicos"):
             st.write(f"Raiz do projeto identificada: {root_dir}")
-            st.write("Pastas verificadas sem sucesso.")
+            st.write("Nenhum catálogo registrado no manifest (data/processed/manifest.json).")
         return
 
-    # --- CORREÇÃO DE LOGICA DO INDEXADOR ---
-    def classificar_indexador(nome):
-        nome_upper = str(nome).upper()
-        if "IPCA" in nome_upper or "RENDA+" in nome_upper or "EDUCA+" in nome_upper:
-            return "IPCA"
-        elif "SELIC" in nome_upper:
-            return "SELIC"
-        else:
-            return "PREFIXADO"
-
-    if 'indexador' not in df.columns:
-        df['indexador'] = df['tipo_titulo'].apply(classificar_indexador)
-    else:
-        df['indexador'] = df.apply(lambda row: classificar_indexador(row['tipo_titulo']) if 'RENDA' in str(row['tipo_titulo']).upper() else row['indexador'], axis=1)
-
-    # Tratamento de Datas e Numéricos
-    if 'vencimento' in df.columns and 'data_vencimento' not in df.columns:
-        df['data_vencimento'] = pd.to_datetime(df['vencimento'])
-    elif 'data_vencimento' in df.columns:
-        df['data_vencimento'] = pd.to_datetime(df['data_vencimento'])
-    
-    if "data_base" in df.columns: ref_date = pd.to_datetime(df["data_base"].max())
-    else: ref_date = pd.Timestamp.today()
-
-    df["prazo_anos"] = (df["data_vencimento"] - ref_date).dt.days / 365.25
-    df["ano_vencimento"] = df["data_vencimento"].dt.year
-    
-    for c in ["taxa_compra", "pu_compra", "taxa_venda", "pu_venda"]:
-        if c in df.columns: df[c] = pd.to_numeric(df[c], errors="coerce")
-    
-    df["minimo_compra"] = df["pu_compra"].apply(lambda x: max(30.0, x * 0.01) if pd.notna(x) else 0)
-
-    # Top Cards
-    top_ipca = df[df["indexador"] == "IPCA"].nlargest(1, "taxa_compra")
-    top_pre = df[df["indexador"] == "PREFIXADO"].nlargest(1, "taxa_compra")
-    
     with st.expander("⚙️ Configurar Filtros de Taxa", expanded=False):
         modo = st.radio("Visualizar taxas para:", ["Investir (Compra)", "Resgatar (Venda)"], horizontal=True)
         col_taxa = "taxa_compra" if "Investir" in modo else "taxa_venda"
         col_pu = "pu_compra" if "Investir" in modo else "pu_venda"
 
-    df["rentabilidade_texto"] = df.apply(lambda row: fmt_taxa_humanizada(row, col_taxa), axis=1)
-    df["label_completo"] = df["tipo_titulo"] + " | " + df["rentabilidade_texto"]
+    # View-model (indexador, prazos, textos da tabela) vem pronto do core,
+    # memoizado por versão do catálogo + modo: reruns de outros widgets não recalculam nada
+    df = titulos_view("Compra" if "Investir" in modo else "Venda")
+    ref_date = df["ref_date"].iloc[0]
+
+    # Top Cards
+    top_ipca = df[df["indexador"] == "IPCA"].nlargest(1, "taxa_compra")
+    top_pre = df[df["indexador"] == "PREFIXADO"].nlargest(1, "taxa_compra")
 
     # Cards Visuais
     c1, c2, c3 = st.columns(3)
@@ -277,14 +218,11 @@ def render():
         opts = sorted(df["indexador"].astype(str).unique().tolist())
         defs = [x for x in ["IPCA", "PREFIXADO"] if x in opts]
         idx_sel = st.multiselect("Indexador", opts, default=defs)
-        
-        if "cupom_txt" not in df.columns:
-            df["cupom_txt"] = df["tipo_titulo"].apply(lambda x: "COM JUROS" if "Juros" in str(x) else "SEM CUPOM")
         cupom_sel = st.checkbox("Esconder com Juros Semestrais?", value=True)
     
     with col_f2:
         st.markdown("### 📊 Tabela de Taxas")
-        view = df.copy()
+        view = df
         if idx_sel: view = view[view["indexador"].isin(idx_sel)]
         if cupom_sel: view = view[view["cupom_txt"] == "SEM CUPOM"]
         view = view.sort_values("data_vencimento")
@@ -292,10 +230,10 @@ def render():
         view["Nome Tabela"] = view["tipo_titulo"]
         dsp = pd.DataFrame()
         dsp["Título"] = view["Nome Tabela"]
-        dsp["Vencimento"] = view["data_vencimento"].apply(lambda x: x.strftime("%d/%m/%Y"))
+        dsp["Vencimento"] = view["vencimento_txt"]
         dsp["Rendimento Anual"] = view["rentabilidade_texto"]
-        if col_pu in view.columns: dsp["Preço Unitário"] = view[col_pu].apply(_brl)
-        if "Investir" in modo: dsp["Investimento Mínimo"] = view["minimo_compra"].apply(_brl)
+        if col_pu in view.columns: dsp["Preço Unitário"] = view["pu_txt"]
+        if "Investir" in modo: dsp["Investimento Mínimo"] = view["minimo_txt"]
 
         st.dataframe(dsp, hide_index=True, use_container_width=True, height=400)
 
@@ -315,18 +253,23 @@ def render():
         sc1, sc2, sc3 = st.columns(3)
         calc_ir = sc2.checkbox("Descontar IR?", value=True)
         calc_b3 = sc3.checkbox("Descontar Taxa B3?", value=True)
+        usar_focus = sc1.checkbox("IPCA/Selic ano a ano pelo Focus?", value=False)
+
+    # Projeção de todos os títulos do filtro numa passada só (a do título escolhido sai daqui também)
+    hoje = pd.Timestamp.today()
+    sim = simular_catalogo(view, dinheiro, ipca_proj, selic_proj, col_taxa=col_taxa, calc_ir=calc_ir, calc_b3=calc_b3, hoje=hoje)
 
     if titulo_label:
         row = view[view["label_completo"] == titulo_label].iloc[0]
         if col_taxa in row:
-            taxa_titulo = float(row.get(col_taxa, 0))
-            dias_sim = (row["data_vencimento"] - pd.Timestamp.today()).days
+            dias_sim = (row["data_vencimento"] - hoje).days
             anos_sim = dias_sim / 365.25
             
             if anos_sim > 0:
+                s = sim[sim["label_completo"] == titulo_label].iloc[0]
                 st.markdown("#### 🗓️ Cronograma do Investimento")
                 t1, t2, t3 = st.columns(3)
-                hoje_str = pd.Timestamp.today().strftime("%d/%m/%Y")
+                hoje_str = hoje.strftime("%d/%m/%Y")
                 venc_str = row["data_vencimento"].strftime("%d/%m/%Y")
                 
                 with t1: st.markdown(f"<div class='timeline-card'><div>INÍCIO (HOJE)</div><div style='font-size:18px;font-weight:bold;'>{hoje_str}</div></div>", unsafe_allow_html=True)
@@ -335,28 +278,19 @@ def render():
                 
                 st.markdown("<br>", unsafe_allow_html=True)
 
-                # CÁLCULOS
-                idx = str(row["indexador"]).upper()
-                if "IPCA" in idx: 
-                    taxa_bruta = ((1 + taxa_titulo/100) * (1 + ipca_proj/100)) - 1
-                elif "PREFIXADO" in idx: 
-                    taxa_bruta = taxa_titulo/100
-                elif "SELIC" in idx: 
-                    taxa_bruta = (selic_proj + taxa_titulo)/100
-                else: 
-                    taxa_bruta = taxa_titulo/100
-
-                bruto = dinheiro * ((1 + taxa_bruta) ** anos_sim)
-                custo_b3 = bruto * (0.0020 * anos_sim) if calc_b3 else 0.0
-                aliq_ir = calcular_aliquota_ir(dias_sim)
-                lucro_bruto = bruto - dinheiro
-                base_ir = max(0, lucro_bruto - custo_b3)
-                ir_val = base_ir * (aliq_ir / 100.0) if calc_ir else 0.0
-                liquido = bruto - custo_b3 - ir_val
-                
-                poupanca_est = dinheiro * ((1 + 0.07) ** anos_sim)
-                cdi_bruto = dinheiro * ((1 + selic_proj/100) ** anos_sim)
-                cdi_liq = cdi_bruto - (cdi_bruto - dinheiro)*(aliq_ir/100) if calc_ir else cdi_bruto
+                # Trajetória mês a mês (custódia diária com isenção, IR se resgatar na data);
+                # o valor final sai da última coluna dela, para métrica e gráfico baterem
+                exp = get_store().frame("expectativas_historico") if usar_focus else None
+                traj = projetar_trajetorias(
+                    view[view["label_completo"] == titulo_label], dinheiro, ipca_proj, selic_proj,
+                    ipca_por_ano=focus_por_ano(exp, "IPCA") if usar_focus else None,
+                    selic_por_ano=focus_por_ano(exp, "Selic") if usar_focus else None,
+                    col_taxa=col_taxa, calc_ir=calc_ir, calc_b3=calc_b3, hoje=hoje,
+                )
+                liquido = float(traj.liquido[0, -1]) if traj.saldo.size else s["liquido"]
+                rent_liq_aa = ((liquido / dinheiro) ** (1 / anos_sim) - 1) * 100.0 if dinheiro > 0 else float("nan")
+                poupanca_est = s["poupanca"]
+                cdi_liq = s["cdi_liquido"]
 
                 st.markdown("#### 💰 Projeção Financeira")
                 r1, r2, r3, r4 = st.columns(4)
@@ -364,8 +298,19 @@ def render():
                 r2.metric("vs Poupança", _brl(poupanca_est), delta=f"{_brl(liquido - poupanca_est)}", delta_color="normal")
                 r3.metric("vs CDI (100%)", _brl(cdi_liq), delta=f"{_brl(liquido - cdi_liq)}", delta_color="normal")
                 
-                rent_aa = ((1 + (liquido - dinheiro)/dinheiro)**(1/anos_sim) - 1) * 100
-                r4.metric("Rentabilidade Líquida a.a.", f"{rent_aa:.2f}%")
+                r4.metric("Rentabilidade Líquida a.a.", f"{rent_liq_aa:.2f}%")
+                if usar_focus:
+                    st.caption(f"Poupança e CDI com IPCA {ipca_proj:.2f}% e Selic {selic_proj:.2f}% constantes; o título segue o Focus ano a ano.")
+
+                if traj.saldo.size:
+                    import plotly.graph_objects as go  # lazy: só quando o gráfico é desenhado
+
+                    fig = go.Figure()
+                    fig.add_trace(go.Scatter(x=traj.datas, y=traj.saldo[0], name="Saldo bruto", line=dict(color="#90A4AE")))
+                    fig.add_trace(go.Scatter(x=traj.datas, y=traj.liquido[0], name="Líquido se resgatar", line=dict(color="#002B49", width=3)))
+                    fig.update_layout(template="plotly_white", height=320, margin=dict(l=10, r=10, t=30, b=10), hovermode="x unified", legend=dict(orientation="h"))
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.caption(f"Custódia B3 acumulada no vencimento: {_brl(traj.custodia[0, -1])} (Tesouro Selic isento até R$ 10 mil).")
 
                 st.markdown("---")
                 score, insights = analisar_oportunidade(row, ipca_proj)
@@ -377,15 +322,160 @@ def render():
                 st.markdown("<br><div class='primary-btn'>", unsafe_allow_html=True)
                 if st.button("💾 Adicionar Título à Carteira", use_container_width=True):
                     qtd_calc = dinheiro / float(row["pu_compra"])
-                    item = {
-                        "id": row["Nome Tabela"], "indexador": row["indexador"],
-                        "vencimento": row["data_vencimento"], "taxa_compra": float(row["taxa_compra"]),
-                        "pu_compra": float(row["pu_compra"]), "qtd": qtd_calc,
-                        "metrics": compute_duration_metrics(row, modo="Compra")
-                    }
-                    st.session_state.portfolio.append(item)
+                    st.session_state.portfolio = como_portfolio(st.session_state.portfolio).adicionar(
+                        titulo=row["Nome Tabela"], indexador=str(row["indexador"]), vencimento=row["data_vencimento"],
+                        qtd=qtd_calc, pu_custo=float(row["pu_compra"]), taxa_compra=float(row["taxa_compra"]),
+                    )
                     st.success(f"✅ **{row['Nome Tabela']}** adicionado!")
                 st.markdown('</div>', unsafe_allow_html=True)
 
+    # Ranking: mesma projeção para todos os títulos do filtro
+    if not sim.empty:
+        st.markdown("---")
+        st.markdown(f"<h2 style='color: #002B49;'>🏆 Ranking: melhor retorno líquido para {_brl(dinheiro)}</h2>", unsafe_allow_html=True)
+        venc_max = st.date_input("Vencendo até", value=sim["data_vencimento"].max().date(), format="DD/MM/YYYY")
+        rk = sim[sim["data_vencimento"] <= pd.Timestamp(venc_max)]
+
+        tab = pd.DataFrame()
+        tab["#"] = range(1, len(rk) + 1)
+        tab["Título"] = rk["tipo_titulo"].astype(str).to_numpy()
+        tab["Vencimento"] = rk["data_vencimento"].dt.strftime("%d/%m/%Y").to_numpy()
+        tab["Rentab. Líq. a.a."] = rk["rent_liq_aa"].map(_pct).to_numpy()
+        tab["Valor Líquido"] = rk["liquido"].map(_brl).to_numpy()
+        tab["IR"] = rk["ir"].map(_brl).to_numpy()
+        tab["Custódia B3"] = rk["custo_b3"].map(_brl).to_numpy()
+        tab["vs Poupança"] = rk["vs_poupanca"].map(_brl).to_numpy()
+        tab["vs CDI"] = rk["vs_cdi"].map(_brl).to_numpy()
+        st.dataframe(tab, hide_index=True, use_container_width=True, height=min(400, 38 + 35 * len(tab)))
+
+    # Sensibilidade: grid IPCA x Selic inteiro num cálculo só (broadcast), sem rerun por ponto
+    if not sim.empty:
+        with st.expander("🌡️ Sensibilidade IPCA × Selic", expanded=False):
+            labels = list(sim["label_completo"])
+            s1, s2 = st.columns(2)
+            lab_a = s1.selectbox("Título", labels, index=labels.index(titulo_label) if titulo_label in labels else 0)
+            lab_b = s2.selectbox("Comparar com", ["(nenhum)"] + [l for l in labels if l != lab_a])
+            ipca_grid = np.linspace(max(0.0, ipca_proj - 4), ipca_proj + 4, 50)
+            selic_grid = np.linspace(max(0.0, selic_proj - 5), selic_proj + 5, 50)
+
+            alvo = view[view["label_completo"].isin([lab_a, lab_b])]
+            sup = sensibilidade(alvo, dinheiro, ipca_grid, selic_grid, col_taxa=col_taxa, calc_ir=calc_ir, calc_b3=calc_b3, hoje=hoje)
+            pos = {l: i for i, l in enumerate(sup.titulos["label_completo"])}
+
+            import plotly.graph_objects as go  # lazy: só quando o gráfico é desenhado
+
+            if lab_b == "(nenhum)":
+                z = sup.rent_liq_aa[pos[lab_a]]
+                heat = go.Heatmap(x=selic_grid, y=ipca_grid, z=z, colorscale="Blues", colorbar=dict(title="Líq. a.a. %"),
+                                  hovertemplate="Selic %{x:.2f}%<br>IPCA %{y:.2f}%<br>Líq. a.a. %{z:.2f}%<extra></extra>")
+                titulo_fig = f"Rentabilidade líquida a.a. — {lab_a}"
+            else:
+                # a.a. líquido (não R$ no vencimento): prazos diferentes ficam na mesma base
+                z = sup.rent_liq_aa[pos[lab_a]] - sup.rent_liq_aa[pos[lab_b]]
+                heat = go.Heatmap(x=selic_grid, y=ipca_grid, z=z, colorscale="RdBu", zmid=0, colorbar=dict(title="p.p. a.a."),
+                                  hovertemplate="Selic %{x:.2f}%<br>IPCA %{y:.2f}%<br>Diferença %{z:+.2f} p.p. a.a.<extra></extra>")
+                titulo_fig = f"Rentabilidade líquida a.a.: {lab_a} − {lab_b} (azul = primeiro ganha)"
+
+            fig = go.Figure(heat)
+            if lab_b != "(nenhum)" and z.min() < 0 < z.max():
+                # fronteira de empate
+                fig.add_trace(go.Contour(x=selic_grid, y=ipca_grid, z=z, contours=dict(start=0, end=0, coloring="none"),
+                                         line=dict(color="#002B49", width=2), showscale=False, hoverinfo="skip"))
+            fig.add_trace(go.Scatter(x=[selic_proj], y=[ipca_proj], mode="markers", marker=dict(symbol="x", size=12, color="#E65100"),
+                                     name="Cenário atual", hoverinfo="skip"))
+            fig.update_layout(template="plotly_white", height=450, title=titulo_fig, xaxis_title="Selic (%)", yaxis_title="IPCA (%)",
+                              margin=dict(l=10, r=10, t=50, b=10), showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("Títulos de vencimentos diferentes são comparados pela rentabilidade líquida anualizada até o vencimento de cada um.")
+
+    # Metas: inverso da projeção, para todos os títulos do filtro numa chamada
+    if not sim.empty:
+        with st.expander("🎯 Metas (quanto investir, qual taxa, IPCA de empate)", expanded=False):
+            pergunta = st.radio(
+                "Pergunta",
+                ["Quanto investir para ter R$ X no vencimento?", "Qual taxa mínima para ter R$ X (ou bater o CDI)?", "Qual IPCA faz o IPCA+ empatar com o CDI?"],
+            )
+            g1, g2 = st.columns(2)
+            ano_max = g2.number_input("Vencendo até (ano)", min_value=int(sim["data_vencimento"].dt.year.min()),
+                                      max_value=int(sim["data_vencimento"].dt.year.max()), value=int(sim["data_vencimento"].dt.year.max()))
+            alvo_view = view[view["data_vencimento"].dt.year <= ano_max]
+            kw = dict(col_taxa=col_taxa, calc_ir=calc_ir, calc_b3=calc_b3, hoje=hoje)
+
+            if pergunta.startswith("Quanto"):
+                alvo = g1.number_input("Quero ter (R$ líquido)", value=1_000_000.0, step=10_000.0, format="%.2f")
+                res = valor_para_alvo(alvo_view, alvo, ipca_proj, selic_proj, **kw)
+                tab = pd.DataFrame({
+                    "Título": res["label_completo"].astype(str).to_numpy(),
+                    "Vencimento": res["data_vencimento"].dt.strftime("%d/%m/%Y").to_numpy(),
+                    "Investir hoje": res["valor_necessario"].map(_brl).to_numpy(),
+                })
+            elif pergunta.startswith("Qual taxa"):
+                bater_cdi = g1.checkbox("Meta = CDI líquido no mesmo prazo", value=True)
+                alvo = None if bater_cdi else g1.number_input("Quero ter (R$ líquido)", value=2 * dinheiro, step=100.0, format="%.2f")
+                res = taxa_para_alvo(alvo_view, dinheiro, ipca_proj, selic_proj, alvo=alvo, **kw)
+                ind = res["indexador"]
+                tab = pd.DataFrame({
+                    "Título": res["label_completo"].astype(str).to_numpy(),
+                    "Meta líquida": res["alvo_liquido"].map(_brl).to_numpy(),
+                    "Taxa necessária": fmt_taxa(res["taxa_necessaria"], ind).to_numpy(),
+                    "Folga (p.p.)": res["folga"].map(lambda x: f"{x:+.2f}" if pd.notna(x) else "inalcançável").to_numpy(),
+                })
+            else:
+                res = ipca_breakeven(alvo_view, dinheiro, selic_proj, **kw)
+                tab = pd.DataFrame({
+                    "Título": res["label_completo"].astype(str).to_numpy(),
+                    "Vencimento": res["data_vencimento"].dt.strftime("%d/%m/%Y").to_numpy(),
+                    "IPCA de empate (a.a.)": res["ipca_breakeven"].map(_pct).to_numpy(),
+                    f"Folga vs IPCA {ipca_proj:.2f}%": (ipca_proj - res["ipca_breakeven"]).map(lambda x: f"{x:+.2f} p.p." if pd.notna(x) else "-").to_numpy(),
+                })
+            if tab.empty:
+                st.info("Nenhum título vivo no filtro.")
+            else:
+                st.dataframe(tab, hide_index=True, use_container_width=True)
+
+    # Modo estocástico: distribuição do líquido no vencimento (roda só no botão)
+    if not sim.empty:
+        with st.expander("🎲 Monte Carlo (Selic e IPCA estocásticos)", expanded=False):
+            m1, m2, m3 = st.columns(3)
+            metodo = m1.radio("Modelo", ["Reversão à média (OU)", "Bootstrap histórico"], horizontal=True)
+            n_cam = m2.select_slider("Caminhos", options=[1_000, 5_000, 10_000, 50_000, 100_000], value=10_000)
+            processos = m3.number_input("Processos", min_value=1, max_value=os.cpu_count() or 1, value=1)
+            # tudo que muda o resultado (processos só muda o tempo)
+            entradas = (
+                metodo, n_cam, col_taxa, calc_ir, calc_b3, float(dinheiro), hoje.date(), str(ref_date),
+                tuple(view["label_completo"].astype(str)), tuple(view[col_taxa].astype(float)),
+            )
+            if st.button("Simular cenários", use_container_width=True):
+                try:
+                    cal = calibracao()
+                    with st.spinner("Simulando..."):
+                        mc = monte_carlo(
+                            view, dinheiro, cal, n_caminhos=n_cam,
+                            metodo="ou" if metodo.startswith("Reversão") else "bootstrap",
+                            col_taxa=col_taxa, calc_ir=calc_ir, calc_b3=calc_b3, hoje=hoje, processos=int(processos),
+                        )
+                    st.session_state["mc_resultado"] = (mc, cal, entradas)
+                except Exception as e:
+                    st.error(f"Monte Carlo indisponível: {e}")
+            if "mc_resultado" in st.session_state:
+                mc, cal, entradas_mc = st.session_state["mc_resultado"]
+                if entradas_mc != entradas:
+                    st.warning("⚠️ Resultado de uma simulação anterior: filtros ou parâmetros mudaram. Clique em **Simular cenários** para atualizar.")
+                st.caption(
+                    f"Selic hoje {cal.selic0:.2f}% → longo prazo {cal.selic.mu:.2f}% · "
+                    f"IPCA (Focus 12m) {cal.ipca0:.2f}% → {cal.ipca.mu:.2f}% · correlação {cal.rho:.2f}"
+                )
+                mc = mc.sort_values("p50", ascending=False)
+                tab = pd.DataFrame({
+                    "Título": mc["label_completo"].astype(str).to_numpy(),
+                    "Pessimista (P5)": mc["p5"].map(_brl).to_numpy(),
+                    "P25": mc["p25"].map(_brl).to_numpy(),
+                    "Mediana": mc["p50"].map(_brl).to_numpy(),
+                    "P75": mc["p75"].map(_brl).to_numpy(),
+                    "Otimista (P95)": mc["p95"].map(_brl).to_numpy(),
+                    "Prob. perda": mc["prob_perda"].map(lambda x: f"{x:.1%}").to_numpy(),
+                })
+                st.dataframe(tab, hide_index=True, use_container_width=True)
+
 if __name__ == "__main__":
     render()
@@ -2,7 +2,6 @@ import sys
 import os
 import streamlit as st
 import pandas as pd
-import subprocess
 import time
 from datetime import datetime
 from pathlib import Path
@@ -16,15 +15,25 @@ root_dir = os.path.dirname(src_dir)                      # Raiz do projeto/
 sys.path.append(src_dir)
 sys.path.append(root_dir)
 
+# Perfil de cold start: streamlit run src/app/streamlit_app.py -- --profile-startup
+try:
+    from core.perfil import StartupTimer, profile_enabled
+    _timer = StartupTimer() if profile_enabled() else None
+except ImportError:
+    _timer = None
+
 # Imports com tratamento de erro (Fallback para Nuvem)
 try:
-    from core.datasources.bcb_sgs import load_selic_meta, latest_value
+    from core.datasources.bcb_sgs import latest_value
     from core.config import DATA_DIR
+    from core.store import get_store
 except ImportError:
-    load_selic_meta = None
     latest_value = None
+    get_store = None
     DATA_DIR = Path(root_dir) / "data"
 
+if _timer: _timer.mark("imports")
+
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
     page_title="Tesouro Quant | Home",
@@ -102,51 +111,33 @@ st.markdown("""
 # --- FUNÇÃO ATUALIZAR (COM DEBUG DE ERRO NA TELA) ---
 def atualizar_dados():
     with st.status("🔄 Conectando aos servidores do Governo...", expanded=True) as status:
-        erros = []
-        
-        # Caminho absoluto para a pasta scripts
-        scripts_path = os.path.join(root_dir, "scripts")
-        
-        # Lista de Scripts
-        scripts = [
-            ("Títulos", "run_fetch.py"),
-            ("Selic", "run_fetch_selic.py"),
-            ("Inflação", "run_fetch_inflation.py")
-        ]
+        st.write("📡 Baixando Títulos, Selic e Inflação em paralelo...")
+        try:
+            from core.refresh import refresh_single_flight
+            resultado = refresh_single_flight()
+        except Exception as e:
+            status.update(label="❌ Erro na atualização", state="error")
+            st.error(f"Erro crítico ao rodar a atualização: {e}")
+            return
 
-        for nome, script_file in scripts:
-            st.write(f"📡 Baixando {nome}...")
-            try:
-                full_path = os.path.join(scripts_path, script_file)
-                
-                # CAPTURA O OUTPUT COMPLETO (STDOUT + STDERR)
-                # Usa sys.executable para garantir que rode no mesmo ambiente Python da Nuvem
-                result = subprocess.run(
-                    [sys.executable, full_path], 
-                    capture_output=True, 
-                    text=True
-                )
-                
-                # VERIFICAÇÃO DE ERRO REFORÇADA:
-                # Se o returncode for diferente de 0 OU se o script imprimiu "Erro" ou "Exception"
-                if result.returncode != 0 or "Erro" in result.stdout or "Exception" in result.stdout:
-                    msg_erro = result.stderr if result.stderr else result.stdout
-                    erros.append(f"❌ {nome}: Falha na execução")
-                    st.error(f"Erro no script {nome}:")
-                    # Mostra o log real para você debugar
-                    st.code(result.stdout if result.stdout else result.stderr) 
-                else:
-                    st.write(f"✅ {nome} ok.")
-                    
-            except Exception as e:
-                erros.append(f"{nome}: {str(e)}")
-                st.error(f"Erro crítico ao tentar rodar {nome}: {e}")
-        
-        if not erros:
-            # O SEGREDO DO SUCESSO: LIMPAR O CACHE
-            st.cache_data.clear()
-            
-            status.update(label="✅ SUCESSO! Base Atualizada. Recarregando...", state="complete", expanded=False)
+        if resultado.joined:
+            st.write("🔗 Já havia uma atualização em andamento; usando o resultado dela.")
+
+        for r in resultado.stages.values():
+            if r.ok:
+                novidade = "dados novos" if r.changed else "sem mudanças"
+                st.write(f"✅ {r.label} ok ({r.seconds:.1f}s, {novidade}).")
+            elif r.skipped:
+                st.warning(f"⏭️ {r.label}: {r.error}")
+            else:
+                st.error(f"❌ {r.label}: Falha na execução ({r.seconds:.1f}s)")
+                st.code(r.error or "")
+
+        if resultado.ok:
+            # Sem st.cache_data.clear(): store e derivados são chaveados por versão/hash
+            # e se atualizam sozinhos só no que mudou
+
+            status.update(label=f"✅ SUCESSO! Base Atualizada em {resultado.seconds:.1f}s. Recarregando...", state="complete", expanded=False)
             st.toast("Base de dados 100% atualizada!", icon="🚀")
             time.sleep(1) # Dá um tempinho para ler a mensagem
             st.rerun()
@@ -184,9 +175,8 @@ def render_home():
 
     # 1. Carrega Selic
     try:
-        path_proc = os.path.join(DATA_DIR, "processed")
-        if load_selic_meta and latest_value:
-            df_selic = load_selic_meta(path_proc)
+        if get_store and latest_value:
+            df_selic = get_store().frame("selic_meta_sgs")
             _, val_selic = latest_value(df_selic)
             if val_selic: selic_display = f"{val_selic:.2f}%"
     except: 
@@ -194,9 +184,8 @@ def render_home():
 
     # 2. Carrega IPCA (Focus)
     try:
-        path_focus = os.path.join(DATA_DIR, "processed", "focus_ipca.parquet")
-        if os.path.exists(path_focus):
-            df_focus = pd.read_parquet(path_focus)
+        df_focus = get_store().frame("focus_ipca") if get_store else pd.DataFrame()
+        if not df_focus.empty:
             ano_alvo = datetime.now().year
             
             # Tenta pegar meta deste ano ou do próximo
@@ -271,5 +260,15 @@ def render_home():
         </a>
         """, unsafe_allow_html=True)
 
+def render_startup_profile():
+    """Modo --profile-startup: tempos até o primeiro render e módulos pesados já carregados."""
+    _timer.mark("primeiro render")
+    rel = _timer.report()
+    with st.sidebar.expander("⏱️ Startup", expanded=True):
+        st.json(rel)
+        st.caption("Import por módulo: python scripts/profile_startup.py")
+
 if __name__ == "__main__":
     render_home()
+    if _timer:
+        render_startup_profile()
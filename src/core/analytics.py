@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from pathlib import Path
+import tempfile
+import threading
+
+import pyarrow as pa
+
+from core.config import PROCESSED_DIR
+from core.manifest import dataset_path
+
+# Camada analítica opcional: DuckDB embarcado (sem servidor) lendo os parquets
+# processados direto do disco. Agregações rodam em paralelo e, se passarem da
+# memória, usam o diretório temporário (out-of-core). Sem duckdb instalado,
+# o resto do app continua funcionando; só estas consultas ficam indisponíveis.
+
+# view -> dataset do manifest (arquivo atual)
+DATASET_VIEWS = {
+    "tesouro_historico": "tesouro_historico",
+    "expectativas_historico": "expectativas_historico",
+    "selic_meta_sgs": "selic_meta_sgs",
+    "focus_ipca": "focus_ipca",
+}
+
+# view -> glob (todos os snapshots; a coluna "arquivo" identifica o dia)
+GLOB_VIEWS = {
+    "tesouro_catalogo_snapshots": "tesouro_catalogo_*.parquet",
+}
+
+DUCKDB_TEMP_DIR = Path(tempfile.gettempdir()) / "tesouro_quant_duckdb"
+
+# Consultas nomeadas. Parâmetros no formato $nome (sempre passados por bind, nunca formatados no SQL).
+QUERIES: dict[str, str] = {
+    # série de um título no período
+    "serie_titulo": """
+        SELECT data_base, id_titulo, taxa_compra, taxa_venda, pu_compra, pu_venda
+        FROM tesouro_historico
+        WHERE id_titulo = $id_titulo
+          AND data_base BETWEEN CAST($inicio AS DATE) AND CAST($fim AS DATE)
+        ORDER BY data_base
+    """,
+    # estatísticas de taxa por título no período
+    "estatisticas_titulos": """
+        SELECT
+            id_titulo,
+            any_value(indexador) AS indexador,
+            count(*) AS n,
+            min(data_base) AS primeira_data,
+            max(data_base) AS ultima_data,
+            avg(taxa_compra) AS taxa_media,
+            stddev_samp(taxa_compra) AS taxa_desvio,
+            min(taxa_compra) AS taxa_min,
+            max(taxa_compra) AS taxa_max,
+            arg_max(taxa_compra, data_base) AS taxa_atual
+        FROM tesouro_historico
+        WHERE data_base BETWEEN CAST($inicio AS DATE) AND CAST($fim AS DATE)
+        GROUP BY id_titulo
+        ORDER BY indexador, id_titulo
+    """,
+    # spread diário de um título contra outro, com média móvel (janela em dias corridos)
+    "spread_rolling": """
+        WITH a AS (
+            SELECT data_base, taxa_compra FROM tesouro_historico WHERE id_titulo = $id_a
+        ), b AS (
+            SELECT data_base, taxa_compra FROM tesouro_historico WHERE id_titulo = $id_b
+        ), s AS (
+            SELECT CAST(a.data_base AS DATE) AS data, a.taxa_compra - b.taxa_compra AS spread
+            FROM a JOIN b USING (data_base)
+        )
+        SELECT
+            data,
+            spread,
+            avg(spread) OVER (
+                ORDER BY data
+                RANGE BETWEEN to_days(CAST($janela_dias AS INTEGER) - 1) PRECEDING AND CURRENT ROW
+            ) AS spread_medio
+        FROM s
+        ORDER BY data
+    """,
+    # histórico com a Meta Selic vigente e a mediana Focus IPCA (ano corrente) mais recentes (as-of)
+    "historico_macro": """
+        WITH focus AS (
+            SELECT CAST(data AS DATE) AS data, CAST(ano AS INTEGER) AS ano, mediana
+            FROM expectativas_historico
+            WHERE indicador = 'IPCA'
+        ), selic AS (
+            SELECT CAST(data AS DATE) AS data, valor FROM selic_meta_sgs
+        ), h AS (
+            SELECT *, CAST(data_base AS DATE) AS dia, CAST(year(data_base) AS INTEGER) AS ano
+            FROM tesouro_historico
+            WHERE ($id_titulo IS NULL OR id_titulo = $id_titulo)
+        )
+        SELECT h.data_base, h.id_titulo, h.indexador, h.taxa_compra, h.pu_compra,
+               selic.valor AS selic_meta, focus.mediana AS focus_ipca
+        FROM h
+        ASOF LEFT JOIN selic ON h.dia >= selic.data
+        ASOF LEFT JOIN focus ON h.ano = focus.ano AND h.dia >= focus.data
+        ORDER BY h.data_base, h.id_titulo
+    """,
+    # taxa média diária por indexador
+    "taxa_media_indexador": """
+        SELECT data_base, indexador, avg(taxa_compra) AS taxa_media, count(*) AS n
+        FROM tesouro_historico
+        WHERE data_base BETWEEN CAST($inicio AS DATE) AND CAST($fim AS DATE)
+        GROUP BY ALL
+        ORDER BY data_base, indexador
+    """,
+}
+
+
+class AnalyticsUnavailable(RuntimeError):
+    pass
+
+
+def duckdb_available() -> bool:
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _sql_str(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class AnalyticsEngine:
+    """
+    Conexão DuckDB em memória, única por processo, com uma view por dataset.
+    As views leem o parquet na hora da consulta; só são recriadas quando o
+    arquivo do dataset muda de caminho (ex: novo snapshot) ou passa a existir.
+    Cada consulta usa um cursor próprio (seguro entre sessões/threads).
+    """
+
+    def __init__(self, processed_dir: str | Path = PROCESSED_DIR, threads: int | None = None):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise AnalyticsUnavailable("DuckDB não instalado. Rode: pip install duckdb") from e
+
+        self.processed_dir = Path(processed_dir)
+        self._lock = threading.Lock()
+        self._views: dict[str, str] = {}
+        self._con = duckdb.connect(database=":memory:")
+        DUCKDB_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+        self._con.execute(f"SET temp_directory = {_sql_str(DUCKDB_TEMP_DIR.as_posix())}")
+        if threads:
+            self._con.execute(f"SET threads = {int(threads)}")
+
+    def _sources(self) -> dict[str, str]:
+        sources = {}
+        for view, ds in DATASET_VIEWS.items():
+            path = dataset_path(ds)
+            if path is not None and path.exists():
+                sources[view] = f"read_parquet({_sql_str(path.as_posix())})"
+        for view, pattern in GLOB_VIEWS.items():
+            if any(self.processed_dir.glob(pattern)):
+                glob = _sql_str((self.processed_dir / pattern).as_posix())
+                sources[view] = f"read_parquet({glob}, filename = 'arquivo', union_by_name = true)"
+        return sources
+
+    def _ensure_views(self) -> None:
+        sources = self._sources()
+        if sources == self._views:
+            return
+        with self._lock:
+            for view, src in sources.items():
+                if self._views.get(view) != src:
+                    self._con.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM {src}")
+            for view in set(self._views) - set(sources):
+                self._con.execute(f"DROP VIEW IF EXISTS {view}")
+            self._views = sources
+
+    def views(self) -> list[str]:
+        self._ensure_views()
+        return sorted(self._views)
+
+    def sql(self, text: str, params: dict | None = None) -> pa.Table:
+        """SQL livre sobre as views (uso interno / exploração). Resultado em Arrow."""
+        self._ensure_views()
+        cur = self._con.cursor()
+        try:
+            res = cur.execute(text, params or {})
+            # to_arrow_table: duckdb >= 1.4 (fetch_arrow_table ficou deprecado)
+            return res.to_arrow_table() if hasattr(res, "to_arrow_table") else res.fetch_arrow_table()
+        finally:
+            cur.close()
+
+    def query(self, name: str, **params) -> pa.Table:
+        """Executa uma consulta de QUERIES com parâmetros nomeados."""
+        if name not in QUERIES:
+            raise KeyError(f"Consulta desconhecida: {name}. Disponíveis: {sorted(QUERIES)}")
+        return self.sql(QUERIES[name], params)
+
+
+_engine: AnalyticsEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AnalyticsEngine:
+    """Engine do processo (levanta AnalyticsUnavailable sem duckdb)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AnalyticsEngine()
+    return _engine
+
+
+def query(name: str, **params) -> pa.Table:
+    return get_engine().query(name, **params)
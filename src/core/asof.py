@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import threading
+
+import pandas as pd
+
+# Colunas macro acrescentadas ao histórico: (indicador Focus, anos à frente) -> coluna
+FOCUS_COLUNAS = {
+    ("IPCA", 0): "focus_ipca_ano",
+    ("IPCA", 1): "focus_ipca_prox",
+    ("Selic", 0): "focus_selic_ano",
+    ("Selic", 1): "focus_selic_prox",
+}
+
+# memo por (versões dos datasets, parâmetros); poucas combinações por processo
+_MEMO_MAX = 8
+_memo_lock = threading.Lock()
+_memo: dict[tuple, pd.DataFrame] = {}
+
+
+def _tolerancia(dias: int | None) -> pd.Timedelta | None:
+    return pd.Timedelta(days=int(dias)) if dias is not None else None
+
+
+def asof_join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_on: str,
+    right_on: str,
+    by: tuple[str, str] | None = None,
+    tolerancia_dias: int | None = None,
+) -> pd.DataFrame:
+    """
+    merge_asof "para trás": cada linha de left recebe a última linha de right
+    com data <= data da esquerda (e mesmo by, se informado).
+    Ordena os dois lados uma vez e alinha os dtypes das chaves; devolve left
+    na ordem original. tolerancia_dias: defasagem máxima aceita (senão NaN).
+    """
+    left = left.copy(deep=False)
+    right = right.copy(deep=False)
+    left["_ordem"] = range(len(left))
+    left["_chave"] = pd.to_datetime(left[left_on]).astype("datetime64[ns]")
+    right = right.drop(columns=[left_on], errors="ignore") if left_on != right_on else right
+    right["_chave"] = pd.to_datetime(right[right_on]).astype("datetime64[ns]")
+    right = right.drop(columns=[right_on]).dropna(subset=["_chave"])
+
+    kwargs = {}
+    if by is not None:
+        lb, rb = by
+        left["_by"] = left[lb].astype("int64")
+        right["_by"] = right[rb].astype("int64")
+        right = right.drop(columns=[rb])
+        kwargs["by"] = "_by"
+
+    validos = left["_chave"].notna()
+    out = pd.merge_asof(
+        left[validos].sort_values("_chave", kind="stable"),
+        right.sort_values("_chave", kind="stable"),
+        on="_chave",
+        direction="backward",
+        tolerance=_tolerancia(tolerancia_dias),
+        **kwargs,
+    )
+    if not validos.all():
+        out = pd.concat([out, left[~validos]], ignore_index=True)
+    out = out.sort_values("_ordem").drop(columns=["_ordem", "_chave", "_by"], errors="ignore")
+    return out.reset_index(drop=True)
+
+
+def _focus_largo(expectativas: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """{indicador: [data, ano, mediana]} só com os indicadores usados em FOCUS_COLUNAS."""
+    if expectativas.empty:
+        return {}
+    ind = expectativas["indicador"].astype(str)
+    out = {}
+    for nome in {i for i, _ in FOCUS_COLUNAS}:
+        sub = expectativas.loc[ind == nome, ["data", "ano", "mediana"]]
+        if not sub.empty:
+            out[nome] = sub
+    return out
+
+
+def alinhar_historico_macro(
+    historico: pd.DataFrame,
+    expectativas: pd.DataFrame,
+    selic_meta: pd.DataFrame,
+    tolerancia_dias: int | None = None,
+) -> pd.DataFrame:
+    """
+    Acrescenta a cada linha do histórico (data_base) o que era conhecido naquela data:
+    - selic_meta: Meta Selic vigente (SGS 432)
+    - focus_<ind>_ano / _prox: mediana Focus para o ano da data_base e o seguinte
+    Tudo via merge_asof (um merge por coluna, sem loop por linha).
+    """
+    out = historico
+    if not selic_meta.empty:
+        selic = selic_meta[["data", "valor"]].rename(columns={"valor": "selic_meta"})
+        out = asof_join(out, selic, "data_base", "data", tolerancia_dias=tolerancia_dias)
+    else:
+        out = out.assign(selic_meta=float("nan"))
+
+    ano_base = pd.to_datetime(out["data_base"]).dt.year
+    focus = _focus_largo(expectativas)
+    for (ind, k), col in FOCUS_COLUNAS.items():
+        sub = focus.get(ind)
+        if sub is None:
+            out[col] = float("nan")
+            continue
+        out["_ano_ref"] = ano_base + k
+        out = asof_join(
+            out, sub.rename(columns={"mediana": col}), "data_base", "data",
+            by=("_ano_ref", "ano"), tolerancia_dias=tolerancia_dias,
+        )
+    return out.drop(columns=["_ano_ref"], errors="ignore")
+
+
+def historico_macro(tolerancia_dias: int | None = None) -> pd.DataFrame:
+    """
+    Histórico do Tesouro alinhado com Selic e Focus, memoizado pela versão
+    (manifest) de tesouro_historico, expectativas_historico e selic_meta_sgs.
+    Devolve cópia rasa: não altere valores in-place.
+    """
+    from core.store import get_store
+
+    store = get_store()
+    nomes = ("tesouro_historico", "expectativas_historico", "selic_meta_sgs")
+    chave = (tuple(store.version(n) for n in nomes), tolerancia_dias)
+
+    with _memo_lock:
+        hit = _memo.get(chave)
+    if hit is not None:
+        return hit.copy(deep=False)
+
+    hist, exp, selic = (store.frame(n) for n in nomes)
+    if hist.empty:
+        return hist
+    df = alinhar_historico_macro(hist, exp, selic, tolerancia_dias=tolerancia_dias)
+
+    with _memo_lock:
+        # versões antigas não serão mais pedidas
+        for k in [k for k in _memo if k[0] != chave[0]]:
+            del _memo[k]
+        while len(_memo) >= _MEMO_MAX:
+            _memo.pop(next(iter(_memo)))
+        _memo[chave] = df
+    return df.copy(deep=False)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from core.config import DATA_DIR
+from core.portfolio import Portfolio
+from core.schemas import CARTEIRA_LOTES, row_filter
+from core.storage import FileLock, atomic_write_parquet, atomic_write_text
+
+# Carteiras salvas em disco: um parquet por carteira + indice.json (nome -> arquivo).
+# Cada arquivo guarda o histórico dos lotes (uma linha por revisão: versao,
+# removido), ordenado por título com row groups pequenos: ler uma carteira (ou
+# só alguns títulos dela) não depende de quantas outras existem, e o filtro por
+# título pula row groups pelas estatísticas. Salvar grava só as diferenças
+# (novas revisões) num único rewrite atômico do arquivo daquela carteira.
+CARTEIRAS_DIR = DATA_DIR / "carteiras"
+INDICE = "indice.json"
+ROW_GROUP_LOTES = 4_096
+
+_CAMPOS = ("titulo", "indexador", "vencimento", "qtd", "pu_custo", "taxa_compra", "data_compra")
+
+
+def _slug(nome: str) -> str:
+    base = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    base = re.sub(r"[^A-Za-z0-9]+", "_", base).strip("_").lower()[:40] or "carteira"
+    return f"{base}_{hashlib.sha1(nome.encode()).hexdigest()[:8]}"
+
+
+def _vigentes(table) -> np.ndarray:
+    """Posições (no table) da última revisão de cada lote não removido."""
+    lote = table.column("lote").to_numpy()
+    versao = table.column("versao").to_numpy()
+    removido = table.column("removido").to_numpy(zero_copy_only=False)
+    ordem = np.lexsort((versao, lote))
+    ls = lote[ordem]
+    ultima = ordem[np.r_[ls[1:] != ls[:-1], True]] if len(ls) else ordem
+    return ultima[~removido[ultima]]
+
+
+class CarteiraStore:
+    def __init__(self, base_dir: str | Path = CARTEIRAS_DIR):
+        self.base_dir = Path(base_dir)
+        self._lock = threading.RLock()
+
+    @property
+    def indice_path(self) -> Path:
+        return self.base_dir / INDICE
+
+    def _indice(self) -> dict:
+        if not self.indice_path.exists():
+            return {}
+        return json.loads(self.indice_path.read_text(encoding="utf-8"))
+
+    def _arquivo(self, nome: str) -> Path | None:
+        info = self._indice().get(nome)
+        return self.base_dir / info["arquivo"] if info else None
+
+    def _ler(self, nome: str, titulos=None):
+        path = self._arquivo(nome)
+        if path is None or not path.exists():
+            raise KeyError(f"Carteira não encontrada: {nome}")
+        filtro = row_filter(isin={"titulo": titulos}) if titulos is not None else None
+        return pq.read_table(path, filters=filtro, memory_map=True)
+
+    # ---------- leitura ----------
+
+    def listar(self) -> pd.DataFrame:
+        idx = self._indice()
+        linhas = [{"nome": n, **{k: v for k, v in info.items() if k != "arquivo"}} for n, info in idx.items()]
+        return pd.DataFrame(linhas, columns=["nome", "lotes", "revisoes", "atualizado_em"])
+
+    def carregar(self, nome: str, titulos=None) -> Portfolio:
+        """Lotes vigentes da carteira (opcional: só os títulos pedidos, com pushdown)."""
+        table = self._ler(nome, titulos)
+        # números de lote nunca reaproveitados (nem os de lotes removidos)
+        proximo = int(self._indice()[nome].get("proximo_lote", 0)) or None
+        return Portfolio.from_arrow(table.take(_vigentes(table)), proximo_lote=proximo)
+
+    def historico(self, nome: str, titulos=None) -> pd.DataFrame:
+        """Todas as revisões dos lotes (inclusive removidos), em ordem de lote/versão."""
+        from core.schemas import to_frame
+
+        df = to_frame(self._ler(nome, titulos))
+        return df.sort_values(["lote", "versao"], kind="stable").reset_index(drop=True)
+
+    # ---------- escrita ----------
+
+    def salvar(self, nome: str, carteira: Portfolio) -> Portfolio:
+        """
+        Grava as diferenças da carteira em relação ao que está salvo (novos lotes,
+        edições, remoções) como novas revisões. Devolve a carteira como ficou
+        salva: lote novo cujo número já existiu no histórico ganha número novo.
+        """
+        agora = pd.Timestamp(datetime.now()).floor("ms")
+        with self._lock, FileLock(self.base_dir / ".carteiras.lock"):
+            indice = self._indice()
+            info = indice.get(nome) or {"arquivo": f"{_slug(nome)}.parquet"}
+            path = self.base_dir / info["arquivo"]
+            antigo = pq.read_table(path) if path.exists() else None
+
+            if antigo is not None and antigo.num_rows:
+                hist = antigo.to_pandas(date_as_object=False)
+                atual = Portfolio.from_arrow(antigo.take(_vigentes(antigo))).to_frame()
+                versao_max = hist.groupby("lote")["versao"].max()
+            else:
+                hist = None
+                atual = Portfolio.vazio().to_frame()
+                versao_max = pd.Series(dtype="int64")
+
+            # lotes novos que colidem com números já usados (ex: removidos) são renumerados
+            novo = carteira.to_frame()
+            ja_vigente = novo["lote"].isin(atual["lote"])
+            colide = ~ja_vigente & novo["lote"].isin(versao_max.index)
+            if colide.any():
+                base = int(max(versao_max.index.max(), novo["lote"].max()))
+                novo.loc[colide, "lote"] = np.arange(base + 1, base + 1 + int(colide.sum()))
+
+            # editados: mesmo lote, algum campo diferente
+            comp = novo.merge(atual, on="lote", how="left", suffixes=("", "_ant"), indicator=True)
+            existe = (comp["_merge"] == "both").to_numpy()
+            mudou = np.zeros(len(comp), dtype=bool)
+            for c in _CAMPOS:
+                # NaN dos dois lados (ex: data_compra ausente) não conta como edição
+                a, b = comp[c], comp[f"{c}_ant"]
+                igual = (a == b).fillna(False).to_numpy(dtype=bool) | (a.isna() & b.isna()).to_numpy()
+                mudou |= existe & ~igual
+            gravar = novo[~existe | mudou].copy()
+            gravar["removido"] = False
+
+            removidos = atual[~atual["lote"].isin(novo["lote"])].copy()
+            removidos["removido"] = True
+
+            revisoes = pd.concat([gravar, removidos], ignore_index=True)
+            if not revisoes.empty:
+                revisoes["versao"] = revisoes["lote"].map(versao_max).fillna(0).astype("int64") + 1
+                revisoes["registrado_em"] = agora
+                revisoes = revisoes[list(CARTEIRA_LOTES.names)]
+                tudo = revisoes if hist is None else pd.concat([hist, revisoes], ignore_index=True)
+                tudo = tudo.sort_values(["titulo", "lote", "versao"], kind="stable")
+                atomic_write_parquet(
+                    tudo, path, schema=CARTEIRA_LOTES,
+                    compression="zstd", row_group_size=ROW_GROUP_LOTES, write_statistics=True,
+                )
+                info.update(revisoes=int(len(tudo)), atualizado_em=agora.isoformat(timespec="seconds"))
+            elif hist is None:
+                # carteira nova e vazia: arquivo vazio para existir no índice
+                atomic_write_parquet(revisoes.reindex(columns=CARTEIRA_LOTES.names), path, schema=CARTEIRA_LOTES)
+                info.update(revisoes=0, atualizado_em=agora.isoformat(timespec="seconds"))
+
+            info["lotes"] = int(len(novo))
+            usados = [int(novo["lote"].max()) if len(novo) else 0, int(versao_max.index.max()) if len(versao_max) else 0]
+            info["proximo_lote"] = max(max(usados) + 1, carteira.proximo_lote)
+            indice[nome] = info
+            atomic_write_text(self.indice_path, json.dumps(indice, indent=2, ensure_ascii=False))
+        salva = Portfolio.from_frame(novo)
+        return replace(salva, proximo_lote=max(salva.proximo_lote, carteira.proximo_lote))
+
+    def excluir(self, nome: str) -> None:
+        with self._lock, FileLock(self.base_dir / ".carteiras.lock"):
+            indice = self._indice()
+            info = indice.pop(nome, None)
+            if info is None:
+                return
+            atomic_write_text(self.indice_path, json.dumps(indice, indent=2, ensure_ascii=False))
+            (self.base_dir / info["arquivo"]).unlink(missing_ok=True)
+
+
+_store: CarteiraStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_carteiras() -> CarteiraStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CarteiraStore()
+        return _store
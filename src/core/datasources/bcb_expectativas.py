@@ -1,10 +1,21 @@
 from __future__ import annotations
 
 from pathlib import Path
+from urllib.parse import quote
 import pandas as pd
-from bcb import Expectativas
+import requests
 
 from core.config import PROCESSED_DIR
+from core.manifest import dataset_path
+from core.schemas import read_parquet, row_filter
+from core.storage import atomic_write_parquet
+
+# API Olinda (OData) do Focus — usada diretamente no modo incremental
+OLINDA_EXPECTATIVAS_URL = "https://olinda.bcb.gov.br/olinda/servico/Expectativas/versao/v1/odata"
+ENDPOINT_ANUAIS = "ExpectativasMercadoAnuais"
+ODATA_PAGE_SIZE = 1000
+_ODATA_SAFE = "$',()"
+FOCUS_IPCA_FILE = "focus_ipca.parquet"
 
 
 def fetch_expectativas_anuais(
@@ -25,6 +36,8 @@ def fetch_expectativas_anuais(
         ano_atual = pd.Timestamp.today().year
         anos = list(range(ano_atual, ano_atual + 11))
 
+    from bcb import Expectativas
+
     em = Expectativas()
     ep = em.get_endpoint("ExpectativasMercadoAnuais")
 
@@ -66,6 +79,10 @@ def fetch_expectativas_anuais(
             df["ano"] = int(ano)
             parts.append(df[["data", "mediana", "indicador", "ano"]])
 
+    return _consolidar_expectativas(parts)
+
+
+def _consolidar_expectativas(parts: list[pd.DataFrame]) -> pd.DataFrame:
     if not parts:
         return pd.DataFrame(columns=["data", "mediana", "indicador", "ano"])
 
@@ -85,6 +102,189 @@ def fetch_expectativas_anuais(
     return out
 
 
+def _odata_url(base_url: str, endpoint: str, params: dict) -> str:
+    # Olinda não aceita "+" como espaço: montamos a query com %20 explicitamente
+    query = "&".join(f"{k}={quote(str(v), safe=_ODATA_SAFE)}" for k, v in params.items())
+    return f"{base_url.rstrip('/')}/{endpoint}?{query}"
+
+
+def fetch_odata(
+    filtro: str,
+    endpoint: str = ENDPOINT_ANUAIS,
+    select: list[str] | None = None,
+    orderby: str | None = None,
+    top: int | None = None,
+    page_size: int = ODATA_PAGE_SIZE,
+    base_url: str = OLINDA_EXPECTATIVAS_URL,
+    timeout: int = 60,
+    session: requests.Session | None = None,
+) -> pd.DataFrame:
+    """
+    Consulta genérica ao OData do Focus.
+    - top: busca uma única página com esse tamanho (sem paginação)
+    - sem top: pagina com $top/$skip até a API devolver uma página incompleta
+    base_url pode apontar para um servidor substituto (ex: respostas gravadas).
+    """
+    http = session or requests.Session()
+    params: dict = {"$filter": filtro, "$format": "json"}
+    if select:
+        params["$select"] = ",".join(select)
+    if orderby:
+        params["$orderby"] = orderby
+
+    rows: list[dict] = []
+    skip = 0
+    while True:
+        size = top if top is not None else page_size
+        page_params = {**params, "$top": size}
+        if top is None and skip:
+            page_params["$skip"] = skip
+
+        r = http.get(_odata_url(base_url, endpoint, page_params), timeout=timeout)
+        r.raise_for_status()
+        page = r.json().get("value", [])
+        rows.extend(page)
+
+        if top is not None or len(page) < size:
+            break
+        skip += size
+
+    return pd.DataFrame(rows)
+
+
+def last_dates_by_series(historico: pd.DataFrame | None) -> dict[tuple[str, int], pd.Timestamp]:
+    """
+    Maior 'data' já armazenada por série (indicador, ano).
+    """
+    if historico is None or historico.empty:
+        return {}
+    df = historico[["indicador", "ano", "data"]].copy()
+    df["data"] = pd.to_datetime(df["data"], errors="coerce")
+    last = df.dropna().groupby(["indicador", "ano"], observed=True)["data"].max()
+    return {(str(ind), int(ano)): d for (ind, ano), d in last.items()}
+
+
+def fetch_expectativas_incremental(
+    indicadores: list[str] | None = None,
+    anos: list[int] | None = None,
+    historico: pd.DataFrame | None = None,
+    base_url: str = OLINDA_EXPECTATIVAS_URL,
+    timeout: int = 60,
+    page_size: int = ODATA_PAGE_SIZE,
+) -> pd.DataFrame:
+    """
+    Igual a fetch_expectativas_anuais, mas traz só as linhas novas de cada série:
+    a maior 'data' do histórico vira um filtro "Data gt <data>" na própria query OData.
+    Séries sem histórico são baixadas por completo (paginadas).
+    Retorna: data, mediana, indicador, ano (apenas linhas novas)
+
+    Resposta vazia = série sem dados novos. Erro de rede/HTTP em qualquer série
+    levanta RuntimeError no fim (com todas as falhas), para o refresh não
+    confundir uma queda do BCB com "sem dados novos".
+    """
+    if indicadores is None:
+        indicadores = ["Selic", "IPCA"]
+
+    if anos is None:
+        ano_atual = pd.Timestamp.today().year
+        anos = list(range(ano_atual, ano_atual + 11))
+
+    ultimas = last_dates_by_series(historico)
+    parts: list[pd.DataFrame] = []
+    falhas: list[str] = []
+
+    with requests.Session() as session:
+        for ind in indicadores:
+            for ano in anos:
+                filtro = f"Indicador eq '{ind}' and DataReferencia eq '{int(ano)}'"
+                ultima = ultimas.get((ind, int(ano)))
+                if ultima is not None:
+                    filtro += f" and Data gt '{ultima.date().isoformat()}'"
+
+                try:
+                    df = fetch_odata(
+                        filtro,
+                        select=["Data", "Mediana"],
+                        orderby="Data asc",
+                        page_size=page_size,
+                        base_url=base_url,
+                        timeout=timeout,
+                        session=session,
+                    )
+                except (requests.RequestException, ValueError) as e:
+                    falhas.append(f"{ind} {int(ano)}: {e}")
+                    continue
+
+                if df.empty:
+                    continue
+
+                df = df.rename(columns={"Data": "data", "Mediana": "mediana"})
+                df["indicador"] = ind
+                df["ano"] = int(ano)
+                parts.append(df[["data", "mediana", "indicador", "ano"]])
+
+    if falhas:
+        raise RuntimeError(f"Falha ao buscar {len(falhas)} série(s) do Focus: " + "; ".join(falhas))
+    return _consolidar_expectativas(parts)
+
+
+def fetch_focus_anuais_raw(
+    indicadores: list[str] | None = None,
+    desde: pd.Timestamp | None = None,
+    top: int = 500,
+    base_url: str = OLINDA_EXPECTATIVAS_URL,
+    timeout: int = 60,
+) -> pd.DataFrame:
+    """
+    Linhas brutas do endpoint anual (todas as colunas da API).
+    - desde=None: só a página mais recente ($orderby=Data desc, $top=top)
+    - desde informado: tudo com Data > desde, paginado
+    """
+    if indicadores is None:
+        indicadores = ["IPCA", "Selic"]
+
+    filtro = "(" + " or ".join(f"Indicador eq '{i}'" for i in indicadores) + ")"
+    if desde is None or pd.isna(desde):
+        return fetch_odata(filtro, orderby="Data desc", top=top, base_url=base_url, timeout=timeout)
+
+    filtro += f" and Data gt '{pd.Timestamp(desde).date().isoformat()}'"
+    return fetch_odata(filtro, orderby="Data desc", base_url=base_url, timeout=timeout)
+
+
+def update_focus_ipca(
+    processed_dir: str | Path = PROCESSED_DIR,
+    full: bool = False,
+    timeout: int = 15,
+) -> pd.DataFrame | None:
+    """
+    Atualiza focus_ipca.parquet (último relatório Focus de IPCA e Selic).
+    Incremental: pergunta à API só por relatórios posteriores ao já salvo.
+    Retorna o relatório gravado, ou None se o arquivo já estava atualizado.
+    """
+    out = Path(processed_dir) / FOCUS_IPCA_FILE
+    desde = None
+    if out.exists() and not full:
+        try:
+            desde = pd.to_datetime(read_parquet(out, "focus_ipca", columns=["Data"])["Data"]).max()
+        except Exception:
+            desde = None
+
+    df = fetch_focus_anuais_raw(indicadores=["IPCA", "Selic"], desde=desde, timeout=timeout)
+    if df.empty:
+        if desde is not None:
+            return None
+        raise ValueError("Lista vazia do Focus.")
+
+    df["Data"] = pd.to_datetime(df["Data"])
+    df["DataReferencia"] = pd.to_numeric(df["DataReferencia"], errors="coerce")
+
+    # só o relatório mais recente (IPCA e Selic)
+    recente = df[df["Data"] == df["Data"].max()].copy().reset_index(drop=True)
+
+    atomic_write_parquet(recente, out, dataset="focus_ipca")
+    return recente
+
+
 def latest_expectativas_snapshot(df: pd.DataFrame) -> tuple[pd.Timestamp, pd.DataFrame]:
     if df is None or df.empty:
         return pd.NaT, pd.DataFrame(columns=["data", "mediana", "indicador", "ano"])
@@ -100,14 +300,10 @@ def latest_expectativas_snapshot(df: pd.DataFrame) -> tuple[pd.Timestamp, pd.Dat
 
 def latest_snapshot_path() -> Path | None:
     """
-    Procura o arquivo mais recente do tipo:
+    Snapshot atual segundo o manifest:
     data/processed/expectativas_snapshot_YYYY-MM-DD.parquet
     """
-    pattern = "expectativas_snapshot_*.parquet"
-    files = sorted(PROCESSED_DIR.glob(pattern))
-    if not files:
-        return None
-    return files[-1]
+    return dataset_path("expectativas_snapshot")
 
 
 def load_latest_snapshot() -> pd.DataFrame:
@@ -119,7 +315,7 @@ def load_latest_snapshot() -> pd.DataFrame:
     if p is None or not p.exists():
         return pd.DataFrame(columns=["data", "indicador", "ano", "mediana"])
 
-    df = pd.read_parquet(p)
+    df = read_parquet(p, "expectativas_snapshot")
     # normaliza
     if "data" in df.columns:
         df["data"] = pd.to_datetime(df["data"], errors="coerce")
@@ -135,20 +331,33 @@ def load_latest_snapshot() -> pd.DataFrame:
     return df
 
 
-def load_historico() -> pd.DataFrame:
+def load_historico(
+    indicadores: str | list[str] | None = None,
+    anos: int | list[int] | None = None,
+    start=None,
+    end=None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
     """
     Carrega o histórico consolidado:
     data/processed/expectativas_historico.parquet
+    Filtros (indicador, ano de referência, período em data) e projeção de colunas
+    vão direto para o leitor parquet.
     """
     p = PROCESSED_DIR / "expectativas_historico.parquet"
     if not p.exists():
-        return pd.DataFrame(columns=["data", "indicador", "ano", "mediana"])
+        return pd.DataFrame(columns=columns or ["data", "indicador", "ano", "mediana"])
 
-    df = pd.read_parquet(p)
+    filters = row_filter(
+        isin={"indicador": indicadores, "ano": anos},
+        between={"data": (start, end)},
+    )
+    df = read_parquet(p, "expectativas_historico", columns=columns, filters=filters)
     if "data" in df.columns:
         df["data"] = pd.to_datetime(df["data"], errors="coerce")
     if "ano" in df.columns:
         df["ano"] = pd.to_numeric(df["ano"], errors="coerce")
     if "mediana" in df.columns:
         df["mediana"] = pd.to_numeric(df["mediana"], errors="coerce")
-    return df.dropna(subset=["data", "indicador", "ano", "mediana"]).copy()
+    obrigatorias = [c for c in ["data", "indicador", "ano", "mediana"] if c in df.columns]
+    return df.dropna(subset=obrigatorias).copy()
@@ -1,14 +1,37 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
-import requests
+
+from core.config import PROCESSED_DIR
+from core.schemas import SGS, read_parquet
+from core.storage import atomic_write_parquet
 
 # Selic Meta (BCB/SGS) — série 432
 # (Se quiser mudar depois, é só trocar o código.)
 SGS_SERIE_SELIC_META = 432
+SGS_SERIE_SELIC_DIARIA = 11
+SGS_SERIE_CDI = 12
+SGS_SERIE_IPCA = 433
+SGS_SERIE_IPCA15 = 7478
 SGS_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{codigo}/dados?formato=json"
 
+# séries usadas pelo app (VNA, benchmark CDI, inflação)
+SGS_SERIES_PADRAO = {
+    "selic_meta": SGS_SERIE_SELIC_META,
+    "selic_diaria": SGS_SERIE_SELIC_DIARIA,
+    "cdi": SGS_SERIE_CDI,
+    "ipca": SGS_SERIE_IPCA,
+    "ipca15": SGS_SERIE_IPCA15,
+}
+
+# cache local: uma parquet por série em data/processed/sgs/
+SGS_CACHE_DIR = PROCESSED_DIR / "sgs"
+SGS_INICIO_PADRAO = pd.Timestamp("2000-01-01")
+# a API do SGS limita consultas de séries diárias a janelas de 10 anos
+SGS_JANELA_ANOS = 10
+
 
 def fetch_sgs_serie(
     codigo: int,
@@ -29,6 +52,8 @@ def fetch_sgs_serie(
     if end:
         params["dataFinal"] = end
 
+    import requests  # só quem baixa paga o import (Home só lê o cache)
+
     r = requests.get(url, params=params, timeout=timeout)
     r.raise_for_status()
 
@@ -49,6 +74,111 @@ def fetch_sgs_serie(
     return df
 
 
+def _sgs_date(d: pd.Timestamp) -> str:
+    return pd.Timestamp(d).strftime("%d/%m/%Y")
+
+
+def split_date_range(
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    janela_anos: int = SGS_JANELA_ANOS,
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Quebra [start, end] em janelas consecutivas de no máximo janela_anos.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    chunks: list[tuple[pd.Timestamp, pd.Timestamp]] = []
+    ini = start
+    while ini <= end:
+        fim = min(ini + pd.DateOffset(years=janela_anos) - pd.Timedelta(days=1), end)
+        chunks.append((ini, fim))
+        ini = fim + pd.Timedelta(days=1)
+    return chunks
+
+
+def _fetch_chunk(codigo: int, ini: pd.Timestamp, fim: pd.Timestamp, timeout: int) -> pd.DataFrame:
+    import requests
+
+    try:
+        return fetch_sgs_serie(codigo, start=_sgs_date(ini), end=_sgs_date(fim), timeout=timeout)
+    except requests.HTTPError as e:
+        # SGS responde 404 quando não há observações na janela (ex: cauda ainda sem dado novo)
+        if e.response is not None and e.response.status_code == 404:
+            return pd.DataFrame(columns=["data", "valor"])
+        raise
+
+
+def sgs_cache_path(codigo: int, cache_dir: str | Path = SGS_CACHE_DIR) -> Path:
+    return Path(cache_dir) / f"sgs_{int(codigo)}.parquet"
+
+
+def load_sgs_cache(codigo: int, cache_dir: str | Path = SGS_CACHE_DIR) -> pd.DataFrame:
+    f = sgs_cache_path(codigo, cache_dir)
+    if not f.exists():
+        return pd.DataFrame(columns=["data", "valor"])
+    return read_parquet(f, f"sgs_{int(codigo)}")
+
+
+def refresh_sgs_cache(
+    codigos: list[int] | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+    cache_dir: str | Path = SGS_CACHE_DIR,
+    max_workers: int = 8,
+    timeout: int = 60,
+) -> dict[int, pd.DataFrame]:
+    """
+    Atualiza o cache local de várias séries SGS de uma vez.
+    - cada série só baixa a cauda que falta (último dia em cache + 1 até end)
+    - intervalos longos viram janelas de SGS_JANELA_ANOS
+    - todas as janelas de todas as séries rodam em paralelo (threads, I/O bound)
+    Retorna {codigo: DataFrame(data, valor)} já consolidado.
+    """
+    if codigos is None:
+        codigos = list(SGS_SERIES_PADRAO.values())
+    start = pd.Timestamp(start) if start is not None else SGS_INICIO_PADRAO
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    cached = {int(c): load_sgs_cache(c, cache_dir) for c in codigos}
+
+    tasks: list[tuple[int, pd.Timestamp, pd.Timestamp]] = []
+    for codigo, df in cached.items():
+        ini = start
+        if not df.empty:
+            ini = max(start, pd.to_datetime(df["data"]).max() + pd.Timedelta(days=1))
+        tasks.extend((codigo, a, b) for a, b in split_date_range(ini, end))
+
+    novos: dict[int, list[pd.DataFrame]] = {c: [] for c in cached}
+    if tasks:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(lambda t: _fetch_chunk(t[0], t[1], t[2], timeout), tasks)
+            for (codigo, _, _), df in zip(tasks, results):
+                if not df.empty:
+                    novos[codigo].append(df)
+
+    out: dict[int, pd.DataFrame] = {}
+    for codigo, df_old in cached.items():
+        if not novos[codigo]:
+            out[codigo] = df_old
+            continue
+        df_all = pd.concat([df_old, *novos[codigo]], ignore_index=True)
+        df_all["data"] = pd.to_datetime(df_all["data"])
+        df_all = (
+            df_all.drop_duplicates(subset=["data"], keep="last")
+            .sort_values("data")
+            .reset_index(drop=True)
+        )
+        # só o cache oficial entra no manifest (diretórios avulsos não)
+        dataset = f"sgs_{codigo}" if cache_dir == Path(SGS_CACHE_DIR) else None
+        atomic_write_parquet(df_all, sgs_cache_path(codigo, cache_dir), dataset=dataset, schema=SGS)
+        out[codigo] = df_all
+
+    return out
+
+
 def fetch_selic_meta(
     start: str | None = None,
     end: str | None = None,
@@ -69,11 +199,8 @@ def latest_value(df: pd.DataFrame) -> tuple[pd.Timestamp, float]:
 
 
 def save_selic_meta(df: pd.DataFrame, processed_dir: str | Path) -> Path:
-    processed_dir = Path(processed_dir)
-    processed_dir.mkdir(parents=True, exist_ok=True)
-    out = processed_dir / "selic_meta_sgs.parquet"
-    df.to_parquet(out, index=False)
-    return out
+    out = Path(processed_dir) / "selic_meta_sgs.parquet"
+    return atomic_write_parquet(df, out, dataset="selic_meta_sgs")
 
 
 def load_selic_meta(processed_dir: str | Path) -> pd.DataFrame:
@@ -81,4 +208,4 @@ def load_selic_meta(processed_dir: str | Path) -> pd.DataFrame:
     f = processed_dir / "selic_meta_sgs.parquet"
     if not f.exists():
         return pd.DataFrame(columns=["data", "valor"])
-    return pd.read_parquet(f)
+    return read_parquet(f, "selic_meta_sgs")
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+import re
+import pandas as pd
+import requests
+
+from core.config import PROCESSED_DIR
+from core.storage import atomic_write_parquet
+
+# snapshots diários mantidos em disco (o manifest aponta para o atual)
+CATALOGO_SNAPSHOTS_MANTIDOS = 7
+
+URL_INVESTIDOR10 = "https://investidor10.com.br/tesouro-direto/"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+}
+
+
+# --- FUNÇÕES DE LIMPEZA ---
+def clean_money(text):
+    """Transforma 'R$ 1.234,56' em float 1234.56"""
+    if not text: return 0.0
+    clean = text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+    try: return float(clean)
+    except: return 0.0
+
+
+def clean_rate(text):
+    """Transforma 'IPCA + 6,50%' em float 6.50"""
+    if not text: return 0.0
+    match = re.search(r'([\d,]+)%', text)
+    if match:
+        clean = match.group(1).replace(',', '.')
+        return float(clean)
+    clean = text.replace('%', '').replace(',', '.').strip()
+    try: return float(clean)
+    except: return 0.0
+
+
+def classificar_indexador(nome: str) -> str:
+    nome_upper = str(nome).upper()
+    if "IPCA" in nome_upper or "RENDA+" in nome_upper or "EDUCA+" in nome_upper:
+        return "IPCA"
+    if "SELIC" in nome_upper:
+        return "SELIC"
+    if "PREFIXADO" in nome_upper:
+        return "PREFIXADO"
+    return "OUTROS"
+
+
+def fetch_catalogo(timeout: int = 20) -> pd.DataFrame:
+    """
+    Raspa a tabela de títulos do Investidor10.
+    Retorna o catálogo no formato de tesouro_catalogo_*.parquet.
+    Levanta ValueError se a tabela não vier ou vier vazia.
+    """
+    from bs4 import BeautifulSoup
+
+    response = requests.get(URL_INVESTIDOR10, headers=HEADERS, timeout=timeout)
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.content, 'html.parser')
+
+    # Tenta achar a tabela (id com erro de digitação do site ou classe genérica)
+    table = soup.find('table', {'id': 'rankigns'})
+    if not table:
+        table = soup.find('table', {'class': 'table'})
+    if not table:
+        raise ValueError("Tabela não encontrada no HTML.")
+
+    rows = table.find('tbody').find_all('tr')
+    agora = datetime.now()
+    dados = []
+
+    for tr in rows:
+        cols = tr.find_all('td')
+        if len(cols) < 6: continue
+
+        # Mapeamento Investidor10:
+        # 1: Nome | 2: Rentabilidade | 3: Mínimo | 4: Preço | 5: Vencimento
+        nome = cols[1].get_text().strip()
+        rentabilidade = cols[2].get_text().strip()
+        minimo = cols[3].get_text().strip()
+        preco = cols[4].get_text().strip()
+        vencimento = cols[5].get_text().strip()
+
+        if not nome or "Título" in nome: continue
+
+        try:
+            dt_venc = pd.to_datetime(vencimento, dayfirst=True)
+        except:
+            continue
+
+        dados.append({
+            "tipo_titulo": nome,
+            "vencimento": dt_venc,
+            "data_base": agora,
+            "taxa_compra": clean_rate(rentabilidade),
+            "pu_compra": clean_money(preco),
+            "minimo_compra": clean_money(minimo),
+            "taxa_venda": 0.0,  # Site não fornece fácil
+            "pu_venda": 0.0,    # Site não fornece fácil
+            "indexador": classificar_indexador(nome),
+            "ano_vencimento": dt_venc.year,
+        })
+
+    if not dados:
+        raise ValueError("Nenhum dado extraído.")
+
+    return pd.DataFrame(dados)
+
+
+def save_catalogo(df: pd.DataFrame, processed_dir: str | Path = PROCESSED_DIR) -> Path:
+    """
+    Salva o snapshot do dia e o registra como versão atual no manifest.
+    Mantém os últimos CATALOGO_SNAPSHOTS_MANTIDOS arquivos; os leitores
+    resolvem o atual pelo manifest, então snapshots antigos não atrapalham.
+    """
+    processed_dir = Path(processed_dir)
+    out = processed_dir / f"tesouro_catalogo_{datetime.now().date().isoformat()}.parquet"
+    atomic_write_parquet(df, out, dataset="tesouro_catalogo")
+
+    antigos = sorted(processed_dir.glob("tesouro_catalogo_*.parquet"))[:-CATALOGO_SNAPSHOTS_MANTIDOS]
+    for f in antigos:
+        if f == out: continue
+        try: f.unlink()
+        except OSError: pass
+
+    return out
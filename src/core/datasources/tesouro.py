@@ -2,10 +2,14 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from io import BytesIO
+from pathlib import Path
 import pandas as pd
 import requests
 
 from core.config import RAW_DIR
+from core.schemas import OFERTA_RAW, read_parquet, row_filter
+from core.storage import atomic_write_parquet
+from core.transforms.normalize import parse_datas
 
 TESOURO_PRECO_TAXA_URL = (
     "https://www.tesourotransparente.gov.br/ckan/dataset/"
@@ -13,6 +17,14 @@ TESOURO_PRECO_TAXA_URL = (
     "796d2059-14e9-44e3-80c9-2d9e30b405c1/download/precotaxatesourodireto.csv"
 )
 
+# Arquivo bruto completo (todas as datas), para reprocessar sem baixar de novo.
+# Ordenado por Data Base: cada row group cobre um intervalo de datas e as
+# estatísticas (min/max) deixam o leitor pular o que está fora do filtro.
+RAW_ARCHIVE_PATH = RAW_DIR / "tesouro_oferta_arquivo.parquet"
+RAW_ARCHIVE_ROW_GROUP = 32_768
+RAW_ARCHIVE_KEYS = ["Data Base", "Tipo Titulo", "Data Vencimento"]
+
+
 @dataclass(frozen=True)
 class TesouroOferta:
     data_base: pd.Timestamp
@@ -42,12 +54,59 @@ def latest_offer_raw(cache: bool = True) -> TesouroOferta:
     if "Data Base" not in df.columns:
         raise ValueError(f"Coluna 'Data Base' não encontrada. Colunas: {df.columns.tolist()}")
 
-    df["Data Base"] = pd.to_datetime(df["Data Base"], dayfirst=True, errors="coerce")
+    df["Data Base"] = parse_datas(df["Data Base"])
     data_base = df["Data Base"].max()
     df_hoje = df[df["Data Base"] == data_base].copy()
 
     if cache:
         out = RAW_DIR / f"tesouro_oferta_raw_{data_base.date().isoformat()}.parquet"
-        df_hoje.to_parquet(out, index=False)
+        atomic_write_parquet(df_hoje, out)
+        # o CSV já vem com todas as datas: guarda tudo no arquivo comprimido
+        archive_raw(df)
 
     return TesouroOferta(data_base=data_base, df_raw=df_hoje)
+
+
+def archive_raw(df_raw: pd.DataFrame, path: Path = RAW_ARCHIVE_PATH) -> Path:
+    """
+    Junta as linhas brutas no arquivo (parquet zstd, ordenado por Data Base).
+    Linha repetida (mesma data, tipo e vencimento) fica com a versão mais nova.
+    """
+    df = df_raw[[c for c in OFERTA_RAW.names if c in df_raw.columns]].copy()
+    df["Data Base"] = parse_datas(df["Data Base"])
+    df["Data Vencimento"] = parse_datas(df["Data Vencimento"])
+    df = df.dropna(subset=["Data Base"])
+
+    if path.exists():
+        df = pd.concat([read_parquet(path, "tesouro_oferta_arquivo"), df], ignore_index=True)
+        # categorias diferentes nos dois lados viram object no concat;
+        # "string" mantém o tipo ausente como NA (astype(str) viraria "nan")
+        df["Tipo Titulo"] = df["Tipo Titulo"].astype("string")
+
+    df = (
+        df.drop_duplicates(subset=RAW_ARCHIVE_KEYS, keep="last")
+        .sort_values(RAW_ARCHIVE_KEYS, kind="stable")
+        .reset_index(drop=True)
+    )
+    dataset = "tesouro_oferta_arquivo" if path == RAW_ARCHIVE_PATH else None
+    return atomic_write_parquet(
+        df, path, dataset=dataset, schema=OFERTA_RAW,
+        compression="zstd", row_group_size=RAW_ARCHIVE_ROW_GROUP, write_statistics=True,
+    )
+
+
+def scan_raw_archive(
+    start=None,
+    end=None,
+    tipos: str | list[str] | None = None,
+    columns: list[str] | None = None,
+    path: Path = RAW_ARCHIVE_PATH,
+) -> pd.DataFrame:
+    """
+    Lê o arquivo bruto local por período/tipo (pushdown no leitor parquet).
+    Mesmo formato de colunas do CSV, pronto para normalize_oferta.
+    """
+    if not path.exists():
+        raise FileNotFoundError("Arquivo bruto ainda não existe. Rode: python scripts/run_fetch_tesouro.py")
+    filters = row_filter(isin={"Tipo Titulo": tipos}, between={"Data Base": (start, end)})
+    return read_parquet(path, "tesouro_oferta_arquivo", columns=columns, filters=filters)
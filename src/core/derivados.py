@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.config import PROCESSED_DIR
+from core.storage import FileLock, atomic_write_parquet, atomic_write_text, file_digest
+
+# Datasets derivados (métricas, curvas, telas) gravados em disco junto com os
+# hashes das entradas usadas. Só recalcula quando alguma entrada mudou;
+# cold start reaproveita o que já está em disco.
+DERIVADOS_DIR = PROCESSED_DIR / "derivados"
+DERIVADOS_ESTADO = "estado.json"
+
+
+@dataclass(frozen=True)
+class Derivado:
+    """
+    Dataset derivado. inputs: datasets do manifest ou outros derivados.
+    build recebe {input: DataFrame} e devolve o DataFrame derivado.
+    versao: subir quando build mudar (o que está em disco fica sujo).
+    """
+    name: str
+    inputs: tuple[str, ...]
+    build: Callable[[dict[str, pd.DataFrame]], pd.DataFrame]
+    versao: int = 1
+
+
+# =========================
+# DERIVADOS PADRÃO
+# =========================
+
+def _catalogo_preparado(df: pd.DataFrame) -> pd.DataFrame:
+    """Catálogo com as colunas que precificacao espera (data_vencimento, cupom_txt)."""
+    df = df.copy()
+    if "data_vencimento" not in df.columns and "vencimento" in df.columns:
+        df["data_vencimento"] = pd.to_datetime(df["vencimento"])
+    if "cupom_txt" not in df.columns:
+        juros = df["tipo_titulo"].astype(str).str.contains("Juros Semestrais", case=False)
+        df["cupom_txt"] = np.where(juros, "COM CUPOM", "SEM CUPOM")
+    df["data_base"] = pd.to_datetime(df["data_base"]).dt.normalize()
+    return df
+
+
+def _build_metricas_risco(inp: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    from core.precificacao import compute_duration_metrics
+    from core.transforms.normalize import id_titulo_de
+
+    cat = _catalogo_preparado(inp["tesouro_catalogo"])
+    if cat.empty:
+        return pd.DataFrame()
+    linhas = [compute_duration_metrics(row, modo="Compra") for _, row in cat.iterrows()]
+    out = pd.DataFrame(linhas)
+    out["tipo_titulo"] = cat["tipo_titulo"].astype(str).to_numpy()
+    # catálogo não traz id_titulo: mesma regra do histórico (família + ano de vencimento)
+    out["id_titulo"] = id_titulo_de(cat["tipo_titulo"], cat["data_vencimento"])
+    out["indexador"] = cat["indexador"].astype(str).to_numpy()
+    out["prazo_anos"] = (out["data_vencimento"] - out["data_base"]).dt.days / 365.25
+    return out
+
+
+def _build_ettj(inp: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    from core.ettj import build_ettj
+
+    met = inp["metricas_risco"]
+    partes = []
+    for curva, indexador in (("real", "IPCA"), ("prefixada", "PREFIXADO")):
+        sub = met[(met["indexador"] == indexador) & (met["cupom"] == "SEM CUPOM")]
+        sub = sub.rename(columns={"taxa_%": "taxa_compra"})
+        if sub.empty:
+            continue
+        curve = build_ettj(sub, modo="Compra")["curve"]
+        partes.append(curve.assign(curva=curva))
+    if not partes:
+        return pd.DataFrame(columns=["prazo_anos", "taxa_interp", "curva"])
+    return pd.concat(partes, ignore_index=True)
+
+
+def _focus_ipca_por_ano(focus: pd.DataFrame) -> pd.Series:
+    """Mediana Focus IPCA mais recente por ano de referência."""
+    if focus.empty:
+        return pd.Series(dtype=float)
+    f = focus[focus["Indicador"].astype(str) == "IPCA"]
+    f = f.sort_values("Data").drop_duplicates("DataReferencia", keep="last")
+    return f.set_index(f["DataReferencia"].astype(int))["Mediana"].astype(float).sort_index()
+
+
+def _build_curva_nominal_focus(inp: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Curva real (IPCA+) convertida em nominal com o IPCA do Focus (Fisher),
+    lado a lado com a prefixada e a inflação implícita.
+    IPCA médio até o prazo = média geométrica das medianas anuais (último ano repete).
+    """
+    ettj = inp["ettj"]
+    real = ettj[ettj["curva"] == "real"].set_index("prazo_anos")["taxa_interp"]
+    pre = ettj[ettj["curva"] == "prefixada"].set_index("prazo_anos")["taxa_interp"]
+    if real.empty:
+        return pd.DataFrame()
+
+    ipca = _focus_ipca_por_ano(inp["focus_ipca"])
+    prazos = real.index.to_numpy(dtype=float)
+    if ipca.empty:
+        ipca_medio = np.full(len(prazos), np.nan)
+    else:
+        fatores = np.log1p(ipca.to_numpy() / 100.0)
+        n_anos = int(np.ceil(prazos.max()))
+        por_ano = np.concatenate([fatores, np.repeat(fatores[-1], max(0, n_anos - len(fatores)))])
+        acum = np.concatenate([[0.0], np.cumsum(por_ano)])
+        inteiro = np.floor(prazos).astype(int)
+        frac = prazos - inteiro
+        log_acum = acum[inteiro] + frac * por_ano[np.minimum(inteiro, len(por_ano) - 1)]
+        ipca_medio = np.expm1(log_acum / prazos) * 100.0
+
+    out = pd.DataFrame({"prazo_anos": prazos, "taxa_real": real.to_numpy(), "ipca_focus": ipca_medio})
+    out["taxa_nominal_focus"] = ((1 + out["taxa_real"] / 100) * (1 + out["ipca_focus"] / 100) - 1) * 100
+    out["taxa_pre"] = pre.reindex(prazos).to_numpy() if not pre.empty else np.nan
+    out["inflacao_implicita"] = ((1 + out["taxa_pre"] / 100) / (1 + out["taxa_real"] / 100) - 1) * 100
+    return out
+
+
+def _build_screens(inp: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Tela de oportunidades: taxa por unidade de duration e prêmio sobre a curva
+    do próprio indexador; rank dentro do indexador.
+    """
+    met = inp["metricas_risco"]
+    ettj = inp["ettj"]
+    if met.empty:
+        return pd.DataFrame()
+    out = met[["id_titulo", "tipo_titulo", "indexador", "data_vencimento", "prazo_anos",
+               "taxa_%", "pu", "duration_modified_anos", "dv01"]].copy()
+    out["taxa_por_duration"] = out["taxa_%"] / out["duration_modified_anos"]
+
+    out["taxa_curva"] = np.nan
+    for curva, indexador in (("real", "IPCA"), ("prefixada", "PREFIXADO")):
+        c = ettj[ettj["curva"] == curva]
+        sel = out["indexador"] == indexador
+        if c.empty or not sel.any():
+            continue
+        out.loc[sel, "taxa_curva"] = np.interp(out.loc[sel, "prazo_anos"], c["prazo_anos"], c["taxa_interp"])
+    out["premio_curva_bps"] = (out["taxa_%"] - out["taxa_curva"]) * 100
+    out["rank_indexador"] = out.groupby("indexador")["taxa_por_duration"].rank(ascending=False, method="min")
+    return out.sort_values(["indexador", "rank_indexador"]).reset_index(drop=True)
+
+
+def default_derivados() -> list[Derivado]:
+    """catálogo -> métricas -> ETTJ -> (curva nominal com Focus, telas)."""
+    return [
+        Derivado("metricas_risco", ("tesouro_catalogo",), _build_metricas_risco, versao=2),
+        Derivado("ettj", ("metricas_risco",), _build_ettj),
+        Derivado("curva_nominal_focus", ("ettj", "focus_ipca"), _build_curva_nominal_focus),
+        Derivado("screens", ("metricas_risco", "ettj"), _build_screens),
+    ]
+
+
+# =========================
+# GRAFO
+# =========================
+
+class DerivadosGraph:
+    """
+    Grafo de derivados com dirty-tracking por hash de conteúdo.
+    estado.json guarda, por derivado: hash de cada entrada usada, hash da saída e arquivo.
+    Um derivado está "sujo" se a saída sumiu, se algum hash de entrada mudou
+    ou se a versao do build não é a gravada.
+    """
+
+    def __init__(self, derivados: list[Derivado] | None = None, base_dir: str | Path = DERIVADOS_DIR):
+        derivados = derivados if derivados is not None else default_derivados()
+        self.by_name = {d.name: d for d in derivados}
+        if len(self.by_name) != len(derivados):
+            raise ValueError("Nomes de derivado repetidos.")
+        self.base_dir = Path(base_dir)
+        self.state_path = self.base_dir / DERIVADOS_ESTADO
+        self._lock = threading.RLock()
+        self._frames: dict[str, tuple[str, pd.DataFrame]] = {}
+        self._ordem = self._topo()
+
+    def _topo(self) -> list[str]:
+        ordem: list[str] = []
+        visitando: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in ordem or name not in self.by_name:
+                return
+            if name in visitando:
+                raise ValueError(f"Ciclo de dependências envolvendo '{name}'.")
+            visitando.add(name)
+            for i in self.by_name[name].inputs:
+                visit(i)
+            visitando.discard(name)
+            ordem.append(name)
+
+        for name in self.by_name:
+            visit(name)
+        return ordem
+
+    def _read_state(self) -> dict:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def path(self, name: str) -> Path:
+        return self.base_dir / f"{name}.parquet"
+
+    def _input_hash(self, name: str, state: dict) -> str:
+        """Hash da entrada: content_hash do manifest ou hash da saída do derivado."""
+        if name in self.by_name:
+            return state.get(name, {}).get("output_hash", "")
+        from core.manifest import resolve
+
+        entry = resolve(name)
+        return entry.content_hash if entry is not None else ""
+
+    def _input_frame(self, name: str) -> pd.DataFrame:
+        if name in self.by_name:
+            return self._load(name)
+        from core.store import get_store
+
+        return get_store().frame(name)
+
+    def _load(self, name: str) -> pd.DataFrame:
+        from core.schemas import read_parquet
+
+        state = self._read_state().get(name, {})
+        h = state.get("output_hash", "")
+        cached = self._frames.get(name)
+        if cached is not None and cached[0] == h:
+            return cached[1].copy(deep=False)
+        p = self.path(name)
+        df = read_parquet(p) if p.exists() else pd.DataFrame()
+        self._frames[name] = (h, df)
+        return df.copy(deep=False)
+
+    def _em_dia(self, d: Derivado, st: dict | None, atual: dict) -> bool:
+        return (
+            st is not None
+            and st.get("inputs") == atual
+            and st.get("versao", 1) == d.versao
+            and self.path(d.name).exists()
+        )
+
+    def dirty(self, state: dict | None = None) -> list[str]:
+        """Derivados que precisam ser recalculados (em ordem topológica)."""
+        state = dict(self._read_state() if state is None else state)
+        sujos = []
+        for name in self._ordem:
+            d = self.by_name[name]
+            atual = {i: self._input_hash(i, state) for i in d.inputs}
+            st = state.get(name)
+            if not self._em_dia(d, st, atual):
+                sujos.append(name)
+                # saída vai mudar: os filhos também ficam sujos
+                state[name] = {**(st or {}), "output_hash": f"pendente:{name}"}
+        return sujos
+
+    def update(self, names: list[str] | None = None) -> list[str]:
+        """
+        Recalcula só o que está sujo (e só os pedidos + seus ancestrais, se names).
+        Devolve a lista dos derivados reconstruídos.
+        """
+        alvo = set(self._ordem)
+        if names is not None:
+            alvo = set()
+            pilha = list(names)
+            while pilha:
+                n = pilha.pop()
+                if n in self.by_name and n not in alvo:
+                    alvo.add(n)
+                    pilha.extend(self.by_name[n].inputs)
+
+        refeitos = []
+        with self._lock, FileLock(self.base_dir / ".derivados.lock"):
+            state = self._read_state()
+            for name in self._ordem:
+                if name not in alvo:
+                    continue
+                d = self.by_name[name]
+                atual = {i: self._input_hash(i, state) for i in d.inputs}
+                st = state.get(name)
+                if self._em_dia(d, st, atual):
+                    continue
+
+                df = d.build({i: self._input_frame(i) for i in d.inputs})
+                atomic_write_parquet(df, self.path(name))
+                state[name] = {
+                    "inputs": atual,
+                    "versao": d.versao,
+                    "output_hash": file_digest(self.path(name)),
+                    "rows": int(len(df)),
+                    "built_at": datetime.now().isoformat(timespec="seconds"),
+                }
+                # o filho lê o estado atualizado deste derivado
+                atomic_write_text(self.state_path, json.dumps(state, indent=2, ensure_ascii=False))
+                refeitos.append(name)
+        return refeitos
+
+    def get(self, name: str) -> pd.DataFrame:
+        """DataFrame atualizado do derivado (recalcula antes, se preciso)."""
+        if name not in self.by_name:
+            raise KeyError(f"Derivado desconhecido: {name}")
+        if name in self.dirty():
+            self.update([name])
+        with self._lock:
+            return self._load(name)
+
+    def status(self) -> pd.DataFrame:
+        state = self._read_state()
+        sujos = set(self.dirty(state))
+        linhas = [
+            {
+                "derivado": n,
+                "entradas": ", ".join(self.by_name[n].inputs),
+                "linhas": state.get(n, {}).get("rows"),
+                "gerado_em": state.get(n, {}).get("built_at"),
+                "sujo": n in sujos,
+            }
+            for n in self._ordem
+        ]
+        return pd.DataFrame(linhas)
+
+
+_graph: DerivadosGraph | None = None
+_graph_lock = threading.Lock()
+
+
+def get_derivados() -> DerivadosGraph:
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = DerivadosGraph()
+        return _graph
+
+
+def load_derivado(name: str) -> pd.DataFrame:
+    """
+    Derivado atual. O refresh (estágio "derivados") já recalcula o que mudou;
+    se uma entrada mudou depois disso (ou o derivado nunca foi gerado), esta
+    leitura recalcula e grava no disco antes de devolver.
+    """
+    return get_derivados().get(name)
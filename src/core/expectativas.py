@@ -3,6 +3,8 @@ from pathlib import Path
 import pandas as pd
 
 from core.config import PROCESSED_DIR
+from core.schemas import read_parquet
+from core.storage import atomic_write_parquet
 
 HIST_PATH = PROCESSED_DIR / "expectativas_historico.parquet"
 
@@ -18,7 +20,7 @@ def append_expectativas_history(df_new: pd.DataFrame) -> Path:
     df_new["data"] = pd.to_datetime(df_new["data"])
 
     if HIST_PATH.exists():
-        df_old = pd.read_parquet(HIST_PATH)
+        df_old = read_parquet(HIST_PATH, "expectativas_historico")
         df_old["data"] = pd.to_datetime(df_old["data"])
         df_all = pd.concat([df_old, df_new], ignore_index=True)
     else:
@@ -30,14 +32,14 @@ def append_expectativas_history(df_new: pd.DataFrame) -> Path:
         .reset_index(drop=True)
     )
 
-    df_all.to_parquet(HIST_PATH, index=False)
+    atomic_write_parquet(df_all, HIST_PATH, dataset="expectativas_historico")
     return HIST_PATH
 
 
 def load_expectativas_history() -> pd.DataFrame:
     if not HIST_PATH.exists():
         raise FileNotFoundError("Histórico de expectativas não existe. Rode: python scripts/run_fetch_expectativas.py")
-    df = pd.read_parquet(HIST_PATH)
+    df = read_parquet(HIST_PATH, "expectativas_historico")
     df["data"] = pd.to_datetime(df["data"])
     return df
 
@@ -1,12 +1,21 @@
 from __future__ import annotations
 from pathlib import Path
+from typing import Iterable
 import pandas as pd
 
 from core.config import PROCESSED_DIR
+from core.manifest import dataset_version
+from core.schemas import read_parquet, row_filter
+from core.serie_index import notify_append
+from core.storage import atomic_write_parquet
 
 
 HIST_PATH = PROCESSED_DIR / "tesouro_historico.parquet"
 
+# histórico gravado em ordem de data_base: row groups menores deixam o filtro
+# por período pular o resto do arquivo pelas estatísticas (min/max) do footer
+HIST_ROW_GROUP_SIZE = 16_384
+
 
 def append_to_history(df_catalogo: pd.DataFrame) -> Path:
     """
@@ -18,7 +27,7 @@ def append_to_history(df_catalogo: pd.DataFrame) -> Path:
     df_new["data_vencimento"] = pd.to_datetime(df_new["data_vencimento"])
 
     if HIST_PATH.exists():
-        df_old = pd.read_parquet(HIST_PATH)
+        df_old = read_parquet(HIST_PATH, "tesouro_historico")
         df_old["data_base"] = pd.to_datetime(df_old["data_base"])
         df_old["data_vencimento"] = pd.to_datetime(df_old["data_vencimento"])
         df_all = pd.concat([df_old, df_new], ignore_index=True)
@@ -30,11 +39,63 @@ def append_to_history(df_catalogo: pd.DataFrame) -> Path:
         ["data_base", "indexador", "cupom_txt", "data_vencimento"]
     )
 
-    df_all.to_parquet(HIST_PATH, index=False)
+    versao_anterior = dataset_version("tesouro_historico")
+    atomic_write_parquet(df_all, HIST_PATH, dataset="tesouro_historico", row_group_size=HIST_ROW_GROUP_SIZE)
+    # índice as-of em memória: acrescenta só as linhas novas
+    versao_nova = dataset_version("tesouro_historico")
+    notify_append(df_new, versao_anterior, versao_nova)
+    # import tardio: core.mtm puxa portfolio/precificacao, que o fetch não usa
+    from core import mtm
+
+    mtm.notify_append(df_new, versao_anterior, versao_nova)
+    return HIST_PATH
+
+
+def rebuild_history_from_archive(start=None, end=None) -> Path:
+    """
+    Renormaliza o período [start, end] a partir do arquivo bruto local
+    (core.datasources.tesouro.scan_raw_archive), sem rede. As linhas
+    reprocessadas substituem as do histórico nesse período; o resto fica igual.
+    """
+    from core.datasources.tesouro import scan_raw_archive
+    from core.transforms.normalize import normalize_oferta
+
+    df_new = normalize_oferta(scan_raw_archive(start=start, end=end))
+    if HIST_PATH.exists() and (start is not None or end is not None):
+        df_old = read_parquet(HIST_PATH, "tesouro_historico")
+        dentro = pd.Series(True, index=df_old.index)
+        if start is not None:
+            dentro &= df_old["data_base"] >= pd.Timestamp(start)
+        if end is not None:
+            dentro &= df_old["data_base"] <= pd.Timestamp(end)
+        df_new = pd.concat([df_old[~dentro], df_new], ignore_index=True)
+        for c in ("id_titulo", "indexador", "cupom_txt", "tipo_titulo"):
+            df_new[c] = df_new[c].astype(str)
+
+    df_all = df_new.drop_duplicates(subset=["data_base", "id_titulo"]).sort_values(
+        ["data_base", "indexador", "cupom_txt", "data_vencimento"]
+    )
+    atomic_write_parquet(df_all, HIST_PATH, dataset="tesouro_historico", row_group_size=HIST_ROW_GROUP_SIZE)
     return HIST_PATH
 
 
-def load_history() -> pd.DataFrame:
+def load_history(
+    ids: str | Iterable[str] | None = None,
+    start=None,
+    end=None,
+    indexador: str | Iterable[str] | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Lê o histórico já filtrado no leitor parquet (sem carregar o arquivo inteiro).
+    ids / indexador: um valor ou lista; start / end: limites inclusivos em data_base;
+    columns: projeção (as colunas do filtro não precisam estar nela).
+    Sem argumentos devolve o histórico completo.
+    """
     if not HIST_PATH.exists():
         raise FileNotFoundError("Histórico ainda não existe. Rode: python scripts/run_fetch.py")
-    return pd.read_parquet(HIST_PATH)
+    filters = row_filter(
+        isin={"id_titulo": ids, "indexador": indexador},
+        between={"data_base": (start, end)},
+    )
+    return read_parquet(HIST_PATH, "tesouro_historico", columns=columns, filters=filters)
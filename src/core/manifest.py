@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import threading
+
+from core.config import PROCESSED_DIR, PROJECT_ROOT, RAW_DIR
+from core.storage import FileLock, atomic_write_text, file_digest
+
+# Manifesto único dos datasets processados: nome -> versão atual, arquivo, linhas e hashes
+MANIFEST_PATH = PROCESSED_DIR / "manifest.json"
+
+# Só usados para "adotar" arquivos que ainda não estão no manifest (bootstrap).
+# Depois do primeiro registro, ninguém mais faz glob.
+BOOTSTRAP_PATTERNS = {
+    "tesouro_catalogo": "tesouro_catalogo_*.parquet",
+    "tesouro_historico": "tesouro_historico.parquet",
+    "expectativas_historico": "expectativas_historico.parquet",
+    "expectativas_snapshot": "expectativas_snapshot_*.parquet",
+    "focus_ipca": "focus_ipca.parquet",
+    "selic_meta_sgs": "selic_meta_sgs.parquet",
+    "tesouro_oferta_arquivo": "tesouro_oferta_arquivo.parquet",
+}
+
+# datasets fora de data/processed
+BOOTSTRAP_DIRS = {
+    "tesouro_oferta_arquivo": RAW_DIR,
+}
+
+
+@dataclass(frozen=True)
+class DatasetEntry:
+    name: str
+    version: int
+    path: str           # relativo à raiz do projeto
+    rows: int
+    schema_hash: str
+    content_hash: str
+    size: int
+    mtime_ns: int
+    updated_at: str
+
+    @property
+    def abs_path(self) -> Path:
+        return PROJECT_ROOT / self.path
+
+
+_cache_lock = threading.Lock()
+_cache: tuple[tuple[int, int] | None, dict[str, DatasetEntry]] = (None, {})
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _rel(path: Path) -> str:
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _read(path: Path) -> dict[str, DatasetEntry]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {name: DatasetEntry(**e) for name, e in raw.get("datasets", {}).items()}
+
+
+def load_manifest(path: str | Path = MANIFEST_PATH) -> dict[str, DatasetEntry]:
+    """
+    Manifesto inteiro. Relê o JSON só quando o arquivo muda (1 stat por chamada).
+    """
+    global _cache
+    path = Path(path)
+    key = _stat_key(path)
+    with _cache_lock:
+        if path == MANIFEST_PATH and key is not None and _cache[0] == key:
+            return _cache[1]
+    entries = _read(path)
+    if path == MANIFEST_PATH:
+        with _cache_lock:
+            _cache = (key, entries)
+    return entries
+
+
+def _parquet_info(path: Path) -> tuple[int, str]:
+    """(linhas, hash do schema) lidos só do footer do parquet."""
+    try:
+        import pyarrow.parquet as pq
+
+        meta = pq.ParquetFile(path).metadata
+        schema = meta.schema.to_arrow_schema().remove_metadata()
+        return meta.num_rows, hashlib.sha256(str(schema).encode()).hexdigest()[:16]
+    except Exception:
+        return -1, ""
+
+
+def register_dataset(name: str, path: str | Path, manifest_path: str | Path = MANIFEST_PATH) -> DatasetEntry:
+    """
+    Registra (ou confirma) o arquivo atual de um dataset.
+    A versão só sobe quando o conteúdo (sha256) ou o caminho muda.
+    """
+    path = Path(path)
+    manifest_path = Path(manifest_path)
+    content_hash = file_digest(path)
+    if content_hash is None:
+        raise FileNotFoundError(path)
+    rows, schema_hash = _parquet_info(path)
+    st = path.stat()
+
+    with FileLock(manifest_path.with_name(f".{manifest_path.stem}.lock")):
+        entries = dict(_read(manifest_path))
+        old = entries.get(name)
+        rel = _rel(path)
+        same = old is not None and old.content_hash == content_hash and old.path == rel
+        entry = DatasetEntry(
+            name=name,
+            version=old.version if same else (old.version + 1 if old else 1),
+            path=rel,
+            rows=rows,
+            schema_hash=schema_hash,
+            content_hash=content_hash,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            updated_at=old.updated_at if same else datetime.now().isoformat(timespec="seconds"),
+        )
+        if entry != old:
+            entries[name] = entry
+            payload = {"datasets": {k: asdict(v) for k, v in sorted(entries.items())}}
+            atomic_write_text(manifest_path, json.dumps(payload, indent=2, ensure_ascii=False))
+    return entry
+
+
+def _bootstrap(name: str) -> DatasetEntry | None:
+    pattern = BOOTSTRAP_PATTERNS.get(name)
+    if pattern is None:
+        return None
+    files = sorted(BOOTSTRAP_DIRS.get(name, PROCESSED_DIR).glob(pattern))
+    if not files:
+        return None
+    try:
+        return register_dataset(name, files[-1])
+    except OSError:
+        # pasta só-leitura: usa o arquivo sem persistir o registro
+        st = files[-1].stat()
+        rows, schema_hash = _parquet_info(files[-1])
+        return DatasetEntry(name, 1, _rel(files[-1]), rows, schema_hash, "", st.st_size, st.st_mtime_ns, "")
+
+
+def resolve(name: str) -> DatasetEntry | None:
+    """
+    Entrada atual do dataset (O(1)). Se o arquivo foi trocado por fora
+    (ex: git pull), re-registra; se ainda não existe no manifest, tenta o bootstrap.
+    """
+    entry = load_manifest().get(name)
+    if entry is None:
+        return _bootstrap(name)
+
+    key = _stat_key(entry.abs_path)
+    if key is None:
+        return _bootstrap(name)
+    if key != (entry.mtime_ns, entry.size):
+        try:
+            return register_dataset(name, entry.abs_path)
+        except OSError:
+            return entry
+    return entry
+
+
+def dataset_path(name: str) -> Path | None:
+    entry = resolve(name)
+    return entry.abs_path if entry is not None else None
+
+
+def dataset_version(name: str) -> int:
+    """Versão atual (0 = inexistente). Use como chave de cache no lugar de limpar tudo."""
+    entry = resolve(name)
+    return entry.version if entry is not None else 0
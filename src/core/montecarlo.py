@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.simulador import aliquota_ir, liquido_de_bruto, titulos_vivos
+
+# Modo estocástico do Simulador: milhares de caminhos mensais de Selic e IPCA
+# (taxas anuais em %) e a distribuição do valor líquido no vencimento de cada título.
+# - "ou": Ornstein-Uhlenbeck discreto (AR(1) mensal), choques correlacionados;
+#   velocidade/vol calibradas no histórico (SGS 432 e Focus), média de longo prazo
+#   ancorada na mediana Focus mais distante.
+# - "bootstrap": blocos de variações mensais históricas (Selic e IPCA juntas),
+#   sem a média (a tendência da amostra não vira deriva de todos os caminhos).
+# Vetorizado em caminhos; caminhos em blocos (memória limitada); blocos
+# opcionalmente num ProcessPoolExecutor. Sementes por bloco (SeedSequence.spawn):
+# o resultado não depende do número de processos.
+
+PERCENTIS = (5, 25, 50, 75, 95)
+CHUNK_PADRAO = 5_000
+
+_memo_lock = threading.Lock()
+_memo: dict[tuple, "Calibracao"] = {}
+
+
+@dataclass
+class ModeloOU:
+    mu: float       # média de longo prazo (% a.a.)
+    b: float        # persistência mensal (kappa = -ln b)
+    sigma: float    # desvio do choque mensal (p.p.)
+
+
+@dataclass
+class Calibracao:
+    selic0: float
+    ipca0: float
+    selic: ModeloOU
+    ipca: ModeloOU
+    rho: float                  # correlação dos choques
+    variacoes: np.ndarray       # (T, 2) variações mensais históricas [selic, ipca] (bootstrap)
+
+
+def serie_mensal(datas: pd.Series, valores: pd.Series) -> pd.Series:
+    """Último valor de cada mês."""
+    s = pd.Series(np.asarray(valores, dtype=float), index=pd.to_datetime(datas)).sort_index()
+    return s.resample("ME").last().dropna()
+
+
+def calibrar_ou(serie: pd.Series, mu: float | None = None) -> tuple[ModeloOU, np.ndarray]:
+    """
+    AR(1) mensal x[t+1] = mu + b (x[t] - mu) + e. Com mu dado, só b e sigma são
+    estimados. b fica em [0, 0.995] (série curta/tendência não vira passeio aleatório).
+    Devolve (modelo, resíduos).
+    """
+    x = serie.to_numpy(dtype=float)
+    if len(x) < 3:
+        return ModeloOU(float(x[-1]) if len(x) else 0.0, 0.0, 0.0), np.zeros(0)
+    x0, x1 = x[:-1], x[1:]
+    if mu is None:
+        b, a = np.polyfit(x0, x1, 1)
+        b = float(np.clip(b, 0.0, 0.995))
+        mu = float(a / (1 - b)) if b < 0.995 else float(x.mean())
+    else:
+        d0 = x0 - mu
+        b = float(np.clip((d0 @ (x1 - mu)) / max(d0 @ d0, 1e-12), 0.0, 0.995))
+    resid = x1 - (mu + b * (x0 - mu))
+    return ModeloOU(float(mu), b, float(resid.std(ddof=1))), resid
+
+
+def calibrar(selic_meta: pd.DataFrame, expectativas: pd.DataFrame) -> Calibracao:
+    """
+    Selic: Meta Selic (SGS 432) mensal. IPCA: mediana Focus para o ano seguinte
+    à data (expectativa ~12 meses), mensal. mu de cada um = mediana Focus do
+    ano mais distante do snapshot mais recente (se existir).
+    """
+    selic = serie_mensal(selic_meta["data"], selic_meta["valor"])
+    ind = expectativas["indicador"].astype(str)
+    datas = pd.to_datetime(expectativas["data"])
+    prox = expectativas["ano"].astype(int) == datas.dt.year + 1
+    exp_ipca = expectativas[(ind == "IPCA") & prox]
+    ipca = serie_mensal(exp_ipca["data"], exp_ipca["mediana"])
+
+    def longo_prazo(nome):
+        sub = expectativas[ind == nome]
+        if sub.empty:
+            return None
+        ult = sub[pd.to_datetime(sub["data"]) == pd.to_datetime(sub["data"]).max()]
+        return float(ult.loc[ult["ano"].idxmax(), "mediana"])
+
+    m_selic, r_selic = calibrar_ou(selic, longo_prazo("Selic"))
+    m_ipca, r_ipca = calibrar_ou(ipca, longo_prazo("IPCA"))
+
+    juntos = pd.concat({"selic": selic, "ipca": ipca}, axis=1).dropna()
+    variacoes = juntos.diff().dropna().to_numpy()
+    variacoes = variacoes - variacoes.mean(axis=0) if len(variacoes) else variacoes
+    n = min(len(r_selic), len(r_ipca))
+    rho = float(np.corrcoef(r_selic[-n:], r_ipca[-n:])[0, 1]) if n > 2 else 0.0
+    return Calibracao(
+        selic0=float(selic.iloc[-1]), ipca0=float(ipca.iloc[-1]),
+        selic=m_selic, ipca=m_ipca, rho=0.0 if np.isnan(rho) else rho,
+        variacoes=variacoes,
+    )
+
+
+def calibracao() -> Calibracao:
+    """calibrar() sobre selic_meta_sgs + expectativas_historico do store, memoizado pelas versões."""
+    from core.store import get_store
+
+    store = get_store()
+    nomes = ("selic_meta_sgs", "expectativas_historico")
+    chave = tuple(store.version(n) for n in nomes)
+    with _memo_lock:
+        hit = _memo.get(chave)
+    if hit is None:
+        hit = calibrar(*(store.frame(n) for n in nomes))
+        with _memo_lock:
+            _memo.clear()
+            _memo[chave] = hit
+    return hit
+
+
+def simular_caminhos(cal: Calibracao, n: int, meses: int, rng: np.random.Generator,
+                     metodo: str = "ou", bloco: int = 6) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (selic, ipca): arrays (meses, n) de taxas anuais (%) vigentes em cada mês.
+    Tempo no eixo 0: cada passo da recursão lê/escreve memória contígua.
+    """
+    if metodo == "bootstrap":
+        T = len(cal.variacoes)
+        if T == 0:
+            raise ValueError("Sem histórico para o bootstrap.")
+        bloco = max(1, min(bloco, T))
+        n_blocos = -(-meses // bloco)
+        ini = rng.integers(0, T - bloco + 1, size=(n_blocos, n))
+        pos = (ini[:, None, :] + np.arange(bloco)[None, :, None]).reshape(-1, n)[:meses]
+        dx = cal.variacoes[pos]                                             # (meses, n, 2)
+        nivel = np.array([cal.selic0, cal.ipca0]) + np.cumsum(dx, axis=0)
+        nivel = np.maximum(nivel, 0.0)
+        return nivel[..., 0], nivel[..., 1]
+
+    z = rng.standard_normal((2, meses, n))
+    z[1] = cal.rho * z[0] + np.sqrt(1 - cal.rho ** 2) * z[1]
+    out = []
+    for k, (m, x0) in enumerate(((cal.selic, cal.selic0), (cal.ipca, cal.ipca0))):
+        # desvio da média: d[t] = b d[t-1] + sigma z[t]; recursão em t, vetor em caminhos (in-place em z)
+        d = z[k]
+        d *= m.sigma
+        d[0] += m.b * (x0 - m.mu)
+        for t in range(1, meses):
+            d[t] += m.b * d[t - 1]
+        d += m.mu
+        out.append(np.maximum(d, 0.0, out=d))
+    return out[0], out[1]
+
+
+def _log_acumulado(taxa_pct: np.ndarray) -> np.ndarray:
+    """(meses, n) taxas a.a. em % -> (meses+1, n) log do fator acumulado (mês 0 = 0)."""
+    acum = np.zeros((taxa_pct.shape[0] + 1, taxa_pct.shape[1]))
+    np.cumsum(np.log1p(taxa_pct / 100.0), axis=0, out=acum[1:])
+    acum[1:] /= 12.0
+    return acum
+
+
+def _no_prazo(acum: np.ndarray, meses_frac: np.ndarray) -> np.ndarray:
+    """Interpola o log acumulado em meses fracionários: (meses+1, n), (N,) -> (n, N)."""
+    i = np.minimum(np.floor(meses_frac).astype(int), acum.shape[0] - 2)
+    f = meses_frac - i
+    return (acum[i] + f[:, None] * (acum[i + 1] - acum[i])).T
+
+
+def _bloco(args) -> np.ndarray:
+    """Um bloco de caminhos -> (n, N) valores líquidos (float32). Top-level: vai para o pool."""
+    cal, semente, n, meses, metodo, bloco, tit, valor, calc_ir, calc_b3 = args
+    rng = np.random.default_rng(semente)
+    selic, ipca = simular_caminhos(cal, n, meses, rng, metodo=metodo, bloco=bloco)
+
+    anos, taxa, e_ipca, e_selic = tit["anos"], tit["taxa"] / 100.0, tit["e_ipca"], tit["e_selic"]
+    meses_frac = anos * 12.0
+    log_fator = np.broadcast_to(np.log1p(taxa) * anos, (n, len(anos))).copy()   # prefixado / juro real
+    if e_ipca.any():
+        log_fator[:, e_ipca] += _no_prazo(_log_acumulado(ipca), meses_frac[e_ipca])
+    for j in np.flatnonzero(e_selic):
+        # Selic + spread: taxa do mês = selic + t (mesma convenção do simulador); só até o vencimento
+        ate = min(int(np.ceil(meses_frac[j])) + 1, meses)
+        acum = _log_acumulado(selic[:ate] + taxa[j] * 100.0)
+        log_fator[:, j] = _no_prazo(acum, meses_frac[j:j + 1])[:, 0]
+
+    bruto = valor * np.exp(log_fator)
+    *_, liquido = liquido_de_bruto(valor, bruto, anos, tit["aliq"], calc_ir, calc_b3)
+    return liquido.astype(np.float32)
+
+
+def monte_carlo(
+    df: pd.DataFrame,
+    valor: float,
+    cal: Calibracao,
+    n_caminhos: int = 10_000,
+    metodo: str = "ou",
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+    semente: int = 0,
+    chunk: int = CHUNK_PADRAO,
+    processos: int = 1,
+    bloco_bootstrap: int = 6,
+) -> pd.DataFrame:
+    """
+    Distribuição do valor líquido no vencimento de cada título (vivo) do df.
+    Devolve uma linha por título: p5..p95, média, prob_perda (líquido < valor).
+    processos > 1 espalha os blocos num ProcessPoolExecutor.
+    """
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    out, dias = titulos_vivos(df, col_taxa, hoje)
+    if out.empty:
+        return out
+
+    idx = out["indexador"].astype(str).str.upper()
+    tit = {
+        "anos": dias / 365.25,
+        "taxa": out[col_taxa].to_numpy(dtype=float),
+        "e_ipca": idx.str.contains("IPCA", regex=False).to_numpy(),
+        "e_selic": idx.str.contains("SELIC", regex=False).to_numpy(),
+        "aliq": aliquota_ir(dias),
+    }
+    meses = int(np.ceil(tit["anos"].max() * 12.0)) + 1
+
+    tamanhos = [min(chunk, n_caminhos - i) for i in range(0, n_caminhos, chunk)]
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    tarefas = [
+        (cal, s, n, meses, metodo, bloco_bootstrap, tit, valor, calc_ir, calc_b3)
+        for s, n in zip(sementes, tamanhos)
+    ]
+    if processos > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            partes = list(pool.map(_bloco, tarefas))
+    else:
+        partes = [_bloco(t) for t in tarefas]
+    liquido = np.concatenate(partes, axis=0)                                # (n_caminhos, N)
+
+    q = np.percentile(liquido, PERCENTIS, axis=0)
+    for p, linha in zip(PERCENTIS, q):
+        out[f"p{p}"] = linha
+    out["media"] = liquido.mean(axis=0, dtype=np.float64)
+    out["prob_perda"] = (liquido < valor).mean(axis=0)
+    return out
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.portfolio import Portfolio
+from core.precificacao import modified_duration_vec
+
+# Marcação a mercado histórica de uma carteira: o histórico vira um painel denso
+# dia x título (PU, taxa, duration), montado uma vez por versão do dataset; a
+# carteira vira uma matriz de quantidades dia x título (compras somadas no dia
+# da compra + cumsum no tempo). Valor, custo e duration de todos os dias saem
+# de operações sobre essas matrizes, sem loop por dia nem por lote.
+
+COLS_PU = ("pu_venda", "pu_compra", "pu_base")
+COLS_TAXA = ("taxa_compra", "taxa_venda")
+
+_memo_lock = threading.Lock()
+_memo: dict[int, "PainelPrecos"] = {}
+
+_ANO_FINAL = re.compile(r"\s+\d{4}$")
+
+
+@dataclass
+class PainelPrecos:
+    dias: np.ndarray        # (D,) datetime64[D], dias do histórico
+    series: pd.DataFrame    # (S,) id_titulo, tipo_titulo (família), indexador, cupom_txt, data_vencimento
+    pu: np.ndarray          # (D, S) PU (ffill; antes da 1ª cotação = 1ª cotação; depois do vencimento = último PU)
+    taxa: np.ndarray        # (D, S) taxa % a.a., preenchida como o PU
+    observado: np.ndarray   # (D, S) bool, série cotada no dia (antes do preenchimento)
+    dmod: np.ndarray        # (D, S) duration modificada (0 a partir do vencimento)
+
+    def colunas(self, titulo, vencimento) -> np.ndarray:
+        """
+        Coluna do painel de cada lote (-1 = fora do histórico). titulo pode ser
+        o id_titulo (ex: "IPCA_JS_2032") ou o nome do catálogo (família + ano,
+        ex: "Tesouro IPCA+ 2035"), casado por família + data de vencimento.
+        """
+        titulo = pd.Series(np.asarray(titulo, dtype=object)).astype(str)
+        venc = pd.to_datetime(pd.Series(vencimento)).dt.strftime("%Y-%m-%d")
+        por_id = pd.Index(self.series["id_titulo"].astype(str)).get_indexer(titulo)
+        chave = self.series["tipo_titulo"].astype(str) + "|" + self.series["data_vencimento"].dt.strftime("%Y-%m-%d")
+        lote = titulo.str.replace(_ANO_FINAL, "", regex=True) + "|" + venc
+        por_nome = pd.Index(chave).get_indexer(lote.to_numpy())
+        return np.where(por_id >= 0, por_id, por_nome)
+
+    def estender(self, df_novo: pd.DataFrame) -> PainelPrecos:
+        """
+        Painel com os dias de df_novo posteriores ao último dia (dias já
+        presentes ficam como estão, mesma regra do drop_duplicates do histórico).
+        Só as linhas novas são pivotadas; a duration é calculada só para os
+        dias novos e para as séries novas.
+        """
+        if df_novo is None or df_novo.empty:
+            return self
+        if len(self.dias) == 0:
+            return montar_painel(df_novo)
+        novos = df_novo[pd.to_datetime(df_novo["data_base"]).to_numpy(dtype="datetime64[D]") > self.dias[-1]]
+        if novos.empty:
+            return self
+        extra = montar_painel(novos)
+
+        D0, S0 = self.pu.shape
+        series = pd.concat(
+            [self.series, extra.series[~extra.series["id_titulo"].isin(self.series["id_titulo"])]],
+            ignore_index=True,
+        )
+        cols = pd.Index(series["id_titulo"]).get_indexer(extra.series["id_titulo"])
+        D, S = D0 + len(extra.dias), len(series)
+
+        def juntar(velho, novo, vazio):
+            m = np.full((D, S), vazio, dtype=velho.dtype)
+            m[:D0, :S0] = velho
+            m[D0:, cols] = np.where(extra.observado, novo, vazio)
+            return m
+
+        observado = juntar(self.observado, extra.observado, False)
+        pu = _preencher(juntar(self.pu, extra.pu, np.nan))
+        taxa = _preencher(juntar(self.taxa, extra.taxa, np.nan))
+        dias = np.concatenate([self.dias, extra.dias])
+
+        dmod = np.zeros((D, S))
+        dmod[:D0, :S0] = self.dmod
+        dmod[D0:] = _duration(dias[D0:], series, taxa[D0:])
+        if S > S0:
+            dmod[:D0, S0:] = _duration(dias[:D0], series.iloc[S0:], taxa[:D0, S0:])
+        return PainelPrecos(dias, series, pu, taxa, observado, dmod)
+
+
+def _primeiro_positivo(df: pd.DataFrame, cols: tuple[str, ...]) -> np.ndarray:
+    out = np.full(len(df), np.nan)
+    for c in cols:
+        if c in df.columns:
+            v = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+            out = np.where(np.isnan(out) & (v > 0), v, out)
+    return out
+
+
+def _ffill(m: np.ndarray) -> np.ndarray:
+    """Forward-fill por coluna (eixo 0) sem pandas: índice da última linha válida."""
+    linha = np.where(~np.isnan(m), np.arange(m.shape[0])[:, None], 0)
+    np.maximum.accumulate(linha, axis=0, out=linha)
+    return m[linha, np.arange(m.shape[1])[None, :]]
+
+
+def _preencher(m: np.ndarray) -> np.ndarray:
+    """ffill; antes da primeira cotação (lote comprado antes do início do histórico): 1ª cotação."""
+    return _ffill(_ffill(m)[::-1])[::-1]
+
+
+def _duration(dias: np.ndarray, series: pd.DataFrame, taxa: np.ndarray) -> np.ndarray:
+    venc = series["data_vencimento"].to_numpy(dtype="datetime64[D]")
+    prazo = (venc[None, :] - np.asarray(dias, dtype="datetime64[D]")[:, None]).astype(float) / 365.25
+    com_cupom = (series["cupom_txt"].astype(str).str.upper().str.strip() == "COM CUPOM").to_numpy()
+    return modified_duration_vec(prazo, np.nan_to_num(taxa) / 100.0, com_cupom[None, :])
+
+
+def montar_painel(hist: pd.DataFrame) -> PainelPrecos:
+    """Histórico longo (data_base, id_titulo, ...) -> painel denso dia x título."""
+    if hist is None or hist.empty:
+        vazio = np.empty((0, 0))
+        return PainelPrecos(
+            np.empty(0, dtype="datetime64[D]"), pd.DataFrame(columns=["id_titulo"]),
+            vazio, vazio, np.empty((0, 0), dtype=bool), vazio,
+        )
+
+    dias_linha = pd.to_datetime(hist["data_base"]).to_numpy(dtype="datetime64[D]")
+    i, dias = pd.factorize(dias_linha, sort=True)
+    j, ids = pd.factorize(hist["id_titulo"].astype(str), sort=True)
+    D, S = len(dias), len(ids)
+
+    pu = np.full((D, S), np.nan)
+    taxa = np.full((D, S), np.nan)
+    pu[i, j] = _primeiro_positivo(hist, COLS_PU)
+    taxa[i, j] = _primeiro_positivo(hist, COLS_TAXA)
+    observado = ~np.isnan(pu)
+
+    # atributos de cada série: linha mais recente dela
+    ordem = np.lexsort((i, j))
+    js = j[ordem]
+    linhas = ordem[np.r_[js[1:] != js[:-1], True]]
+    series = pd.DataFrame({
+        "id_titulo": np.asarray(ids, dtype=object),
+        "tipo_titulo": hist["tipo_titulo"].astype(str).to_numpy()[linhas],
+        "indexador": hist["indexador"].astype(str).to_numpy()[linhas],
+        "cupom_txt": hist["cupom_txt"].astype(str).to_numpy()[linhas],
+        "data_vencimento": pd.to_datetime(hist["data_vencimento"]).to_numpy()[linhas],
+    })
+
+    dias = np.asarray(dias, dtype="datetime64[D]")
+    taxa = _preencher(taxa)
+    return PainelPrecos(dias, series, _preencher(pu), taxa, observado, _duration(dias, series, taxa))
+
+
+def painel_precos() -> PainelPrecos:
+    """montar_painel() do tesouro_historico do store, memoizado pela versão do manifest."""
+    from core.manifest import dataset_version
+    from core.store import get_store
+
+    versao = dataset_version("tesouro_historico")
+    with _memo_lock:
+        hit = _memo.get(versao)
+    if hit is None:
+        hit = montar_painel(get_store().frame("tesouro_historico"))
+        with _memo_lock:
+            _memo.clear()
+            _memo[versao] = hit
+    return hit
+
+
+def notify_append(df_novo: pd.DataFrame, versao_anterior: int, versao_nova: int) -> None:
+    """
+    Chamado após gravar linhas novas no histórico: se o painel em memória
+    estava na versão anterior, só acrescenta os dias novos (sem reconstruir).
+    """
+    with _memo_lock:
+        painel = _memo.get(versao_anterior)
+        if painel is not None:
+            _memo.clear()
+            _memo[versao_nova] = painel.estender(df_novo)
+
+
+def mtm_historico(carteira: Portfolio, painel: PainelPrecos | None = None) -> pd.DataFrame:
+    """
+    Série diária da carteira no intervalo do histórico: data, valor (MTM),
+    custo (acumulado dos lotes já comprados), pnl, duration (modificada,
+    ponderada pelo valor). Cada lote entra no dia da compra (ou no 1º dia do
+    histórico, se anterior); vencido, fica pelo último PU (resgate em caixa).
+    Ficam de fora, listados em attrs: lotes sem série no histórico
+    ("sem_historico") e lotes comprados depois do último dia dele
+    ("apos_historico").
+    """
+    painel = painel_precos() if painel is None else painel
+    colunas = ["data", "valor", "custo", "pnl", "duration"]
+    D = len(painel.dias)
+    if carteira.vazia or D == 0:
+        out = pd.DataFrame(columns=colunas)
+        out.attrs["sem_historico"] = carteira.lote.tolist()
+        out.attrs["apos_historico"] = []
+        return out
+
+    col = painel.colunas(carteira.titulo, carteira.vencimento)
+    inicio = np.searchsorted(painel.dias, carteira.data_compra, side="left")
+    ok = (col >= 0) & (inicio < D)
+
+    # quantidade por dia x título: entra no dia da compra, acumula no tempo
+    qtd = np.zeros((D, painel.pu.shape[1]))
+    np.add.at(qtd, (inicio[ok], col[ok]), carteira.qtd[ok])
+    np.cumsum(qtd, axis=0, out=qtd)
+    custo = np.cumsum(np.bincount(inicio[ok], weights=carteira.custo[ok], minlength=D))
+
+    posicao = qtd * np.nan_to_num(painel.pu)
+    valor = posicao.sum(axis=1)
+    soma_dv = np.einsum("ds,ds->d", posicao, painel.dmod)
+    out = pd.DataFrame({
+        "data": pd.to_datetime(painel.dias),
+        "valor": valor,
+        "custo": custo,
+        "pnl": valor - custo,
+        "duration": np.divide(soma_dv, valor, out=np.zeros(D), where=valor > 0),
+    })
+    out.attrs["sem_historico"] = carteira.lote[col < 0].tolist()
+    out.attrs["apos_historico"] = carteira.lote[(col >= 0) & (inicio >= D)].tolist()
+    return out
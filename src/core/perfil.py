@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from pathlib import Path
+import json
+import subprocess
+import sys
+import time
+
+# Sem pandas/numpy no topo: este módulo é importado pelo app antes de tudo
+# (modo --profile-startup) e não pode pesar no próprio tempo que mede.
+
+PROFILE_FLAG = "--profile-startup"
+
+# roda o app headless (streamlit.testing) num processo novo, com -X importtime.
+# Páginas de pages/ só abrem a partir do entrypoint (st.page_link), então
+# a Home roda primeiro e a página é medida no switch_page seguinte.
+_RUNNER = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_st = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[3]))
+at.run()
+t_home = time.perf_counter()
+t_page = t_home
+if sys.argv[2]:
+    at.switch_page(sys.argv[2])
+    at.run()
+    t_page = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_s": t_st - t0,
+    "home_render_s": t_home - t_st,
+    "first_render_s": (t_page - t_home) if sys.argv[2] else (t_home - t_st),
+    "total_s": t_page - t0,
+    "exceptions": [str(e.value) for e in at.exception],
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def profile_enabled(argv: list[str] | None = None) -> bool:
+    """True quando o app foi iniciado com `streamlit run ... -- --profile-startup`."""
+    return PROFILE_FLAG in (sys.argv if argv is None else argv)
+
+
+class StartupTimer:
+    """Marcas de tempo desde o início do script (para o relatório na tela)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, label: str) -> None:
+        self.marks.append((label, time.perf_counter() - self.t0))
+
+    def report(self, heavy: tuple[str, ...] = ("plotly", "google.generativeai", "pyarrow", "duckdb")) -> dict:
+        return {
+            "marcas_s": {label: round(t, 4) for label, t in self.marks},
+            "modulos_carregados": len(sys.modules),
+            "pesados_carregados": [m for m in heavy if m in sys.modules],
+        }
+
+
+def parse_importtime(texto: str):
+    """
+    Saída de `python -X importtime` -> DataFrame (modulo, self_ms, cumulativo_ms, nivel),
+    ordenado pelo tempo acumulado.
+    """
+    import pandas as pd
+
+    linhas = []
+    for linha in texto.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        try:
+            _, resto = linha.split(":", 1)
+            self_us, cum_us, nome = resto.split("|", 2)
+        except ValueError:
+            continue
+        nivel = (len(nome) - len(nome.lstrip(" ")) - 1) // 2
+        linhas.append({
+            "modulo": nome.strip(),
+            "self_ms": int(self_us) / 1000.0,
+            "cumulativo_ms": int(cum_us) / 1000.0,
+            "nivel": nivel,
+        })
+    df = pd.DataFrame(linhas, columns=["modulo", "self_ms", "cumulativo_ms", "nivel"])
+    return df.sort_values("cumulativo_ms", ascending=False).reset_index(drop=True)
+
+
+def profile_page(main: str | Path, page: str | None = None, timeout: float = 120.0) -> dict:
+    """
+    Cold start num processo novo: tempo até o primeiro render completo e custo de
+    import por módulo. main: entrypoint (streamlit_app.py); page: caminho relativo
+    a ele (ex: "pages/macro.py") ou None para medir só a Home.
+    """
+    main = Path(main).resolve()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _RUNNER, str(main), page or "", str(timeout)],
+        capture_output=True, text=True, timeout=timeout + 30, cwd=str(main.parent),
+    )
+    resumo = {}
+    for linha in reversed(proc.stdout.strip().splitlines()):
+        try:
+            resumo = json.loads(linha)
+            break
+        except ValueError:
+            continue
+    if not resumo:
+        raise RuntimeError(f"Falha ao perfilar {page or main.name}: {proc.stderr[-2000:]}")
+    resumo["page"] = page or main.name
+    resumo["imports"] = parse_importtime(proc.stderr)
+    return resumo
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+# Carteira colunar: um array por campo, uma posição por lote (compra).
+# Adicionar/remover/editar devolvem uma Portfolio nova (arrays novos, sem
+# mutação): seguro para guardar em st.session_state. Valorização, agregação
+# e risco são operações vetorizadas sobre os lotes (join por nome do título).
+
+CHOQUES_PADRAO_BPS = (-200, -100, 100, 200)
+COLUNAS = ("lote", "titulo", "indexador", "vencimento", "qtd", "pu_custo", "taxa_compra", "data_compra")
+
+
+@dataclass(frozen=True)
+class Portfolio:
+    lote: np.ndarray          # int64, id estável do lote
+    titulo: np.ndarray        # object, nome do título (tipo_titulo do catálogo)
+    indexador: np.ndarray     # object
+    vencimento: np.ndarray    # datetime64[D]
+    qtd: np.ndarray           # float64
+    pu_custo: np.ndarray      # float64, PU pago
+    taxa_compra: np.ndarray   # float64, taxa contratada (% a.a.)
+    data_compra: np.ndarray   # datetime64[D]
+    proximo_lote: int = 1     # nº do próximo lote: removido não tem o número reaproveitado
+
+    # ---------- construção ----------
+
+    @classmethod
+    def vazio(cls) -> Portfolio:
+        return cls(
+            lote=np.empty(0, dtype=np.int64),
+            titulo=np.empty(0, dtype=object),
+            indexador=np.empty(0, dtype=object),
+            vencimento=np.empty(0, dtype="datetime64[D]"),
+            qtd=np.empty(0),
+            pu_custo=np.empty(0),
+            taxa_compra=np.empty(0),
+            data_compra=np.empty(0, dtype="datetime64[D]"),
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> Portfolio:
+        """DataFrame com as colunas de Portfolio (lote opcional: numera a partir de 1)."""
+        if df is None or df.empty:
+            return cls.vazio()
+        n = len(df)
+        lote = df["lote"].to_numpy(dtype=np.int64) if "lote" in df.columns else np.arange(1, n + 1, dtype=np.int64)
+        return cls(
+            proximo_lote=int(lote.max()) + 1,
+            lote=lote,
+            titulo=df["titulo"].astype(str).to_numpy(dtype=object),
+            indexador=df["indexador"].astype(str).to_numpy(dtype=object),
+            vencimento=pd.to_datetime(df["vencimento"]).to_numpy(dtype="datetime64[D]"),
+            qtd=df["qtd"].to_numpy(dtype=float),
+            pu_custo=df["pu_custo"].to_numpy(dtype=float),
+            taxa_compra=df["taxa_compra"].to_numpy(dtype=float),
+            data_compra=pd.to_datetime(df["data_compra"]).to_numpy(dtype="datetime64[D]"),
+        )
+
+    @classmethod
+    def from_arrow(cls, table, proximo_lote: int | None = None) -> Portfolio:
+        """
+        Tabela Arrow (schema CARTEIRA_LOTES, já só com os lotes vigentes) -> Portfolio.
+        Numéricos e datas saem direto do buffer; strings de dicionário viram
+        take nos valores distintos (sem montar um objeto por linha).
+        """
+        import pyarrow as pa
+
+        def texto(nome):
+            col = table.column(nome).combine_chunks()
+            if pa.types.is_dictionary(col.type):
+                return col.dictionary.to_numpy(zero_copy_only=False).astype(object)[col.indices.to_numpy()]
+            return col.to_numpy(zero_copy_only=False).astype(object)
+
+        def data(nome):
+            return table.column(nome).cast(pa.int32()).to_numpy().astype("datetime64[D]")
+
+        lote = table.column("lote").to_numpy().astype(np.int64, copy=False)
+        if proximo_lote is None:
+            proximo_lote = int(lote.max()) + 1 if len(lote) else 1
+        return cls(
+            proximo_lote=proximo_lote,
+            lote=lote,
+            titulo=texto("titulo"),
+            indexador=texto("indexador"),
+            vencimento=data("vencimento"),
+            qtd=table.column("qtd").to_numpy(),
+            pu_custo=table.column("pu_custo").to_numpy(),
+            taxa_compra=table.column("taxa_compra").to_numpy(),
+            data_compra=data("data_compra"),
+        )
+
+    @classmethod
+    def from_legacy(cls, itens: list[dict]) -> Portfolio:
+        """Lista de dicts do formato antigo da sessão (id, indexador, vencimento, taxa_compra, pu_compra, qtd)."""
+        if not itens:
+            return cls.vazio()
+        df = pd.DataFrame(itens)
+        return cls.from_frame(pd.DataFrame({
+            "titulo": df["id"],
+            "indexador": df["indexador"],
+            "vencimento": df["vencimento"],
+            "qtd": df["qtd"],
+            "pu_custo": df["pu_compra"],
+            "taxa_compra": df["taxa_compra"],
+            "data_compra": df["data_compra"] if "data_compra" in df.columns else pd.Timestamp.today().normalize(),
+        }))
+
+    def to_frame(self) -> pd.DataFrame:
+        out = pd.DataFrame({c: getattr(self, c) for c in COLUNAS})
+        out["custo"] = self.custo
+        return out
+
+    # ---------- edição (sempre devolve uma carteira nova) ----------
+
+    def __len__(self) -> int:
+        return len(self.lote)
+
+    @property
+    def vazia(self) -> bool:
+        return len(self.lote) == 0
+
+    @property
+    def custo(self) -> np.ndarray:
+        return self.qtd * self.pu_custo
+
+    def adicionar(self, titulo, indexador, vencimento, qtd, pu_custo, taxa_compra, data_compra=None) -> Portfolio:
+        """Um lote (escalares) ou vários (arrays do mesmo tamanho)."""
+        campos = {
+            "titulo": titulo, "indexador": indexador, "vencimento": vencimento, "qtd": qtd,
+            "pu_custo": pu_custo, "taxa_compra": taxa_compra,
+            "data_compra": pd.Timestamp.today().normalize() if data_compra is None else data_compra,
+        }
+        n = max(np.size(v) for v in campos.values())
+        novos = pd.DataFrame({k: np.broadcast_to(np.atleast_1d(v), (n,)) for k, v in campos.items()})
+        inicio = max(self.proximo_lote, int(self.lote.max()) + 1 if len(self) else 1)
+        novos["lote"] = np.arange(inicio, inicio + len(novos), dtype=np.int64)
+        add = Portfolio.from_frame(novos)
+        return Portfolio(
+            **{c: np.concatenate([getattr(self, c), getattr(add, c)]) for c in COLUNAS},
+            proximo_lote=inicio + len(novos),
+        )
+
+    def remover(self, lotes) -> Portfolio:
+        manter = ~np.isin(self.lote, np.atleast_1d(lotes))
+        return replace(self, **{c: getattr(self, c)[manter] for c in COLUNAS})
+
+    def editar(self, lotes, **campos) -> Portfolio:
+        """Altera campos dos lotes indicados; cada valor é escalar ou array alinhado a lotes."""
+        lotes = np.atleast_1d(lotes)
+        pos = pd.Index(self.lote).get_indexer(lotes)
+        if (pos < 0).any():
+            raise KeyError(f"Lotes inexistentes: {lotes[pos < 0].tolist()}")
+        mudancas = {}
+        for nome, valor in campos.items():
+            if nome == "lote" or nome not in COLUNAS:
+                raise KeyError(f"Campo não editável: {nome}")
+            arr = getattr(self, nome).copy()
+            arr[pos] = valor
+            mudancas[nome] = arr
+        return replace(self, **mudancas)
+
+    # ---------- valorização / agregação / risco ----------
+
+    def valorizar(
+        self,
+        precos: pd.DataFrame,
+        cols_pu: tuple[str, ...] = ("pu_venda", "pu_compra"),
+        historico=None,
+        data=None,
+    ) -> pd.DataFrame:
+        """
+        Marcação a mercado por lote. precos: catálogo atual (tipo_titulo + PUs).
+        Usa o primeiro PU positivo de cols_pu (título sem resgate no dia vem com
+        pu_venda zerado). Título fora do catálogo (ex: vencido, saiu da oferta)
+        usa o último PU do histórico até data (historico: SerieIndex, consulta
+        as-of por id_titulo; lotes em attrs["pu_historico"]); sem nada disso,
+        fica com o PU de custo.
+        """
+        out = self.to_frame()
+        pu_atual = np.full(len(self), np.nan)
+        if precos is not None and not precos.empty:
+            tabela = precos.drop_duplicates("tipo_titulo")
+            pos = pd.Index(tabela["tipo_titulo"].astype(str)).get_indexer(self.titulo)
+            for col in cols_pu:
+                if col not in tabela.columns:
+                    continue
+                pu = np.asarray(pd.to_numeric(tabela[col], errors="coerce"), dtype=float)
+                pu = np.where(pu > 0, pu, np.nan)
+                pu_atual = np.where(np.isnan(pu_atual) & (pos >= 0), pu[np.maximum(pos, 0)], pu_atual)
+
+        faltando = np.isnan(pu_atual)
+        do_historico = np.zeros(len(self), dtype=bool)
+        if historico is not None and faltando.any():
+            from core.transforms.normalize import id_titulo_de
+
+            ids = id_titulo_de(self.titulo[faltando], self.vencimento[faltando])
+            # OUTROS_* junta famílias distintas (Renda+, Educa+, IGP-M): id ambíguo, não usa
+            ids = np.where(pd.Series(ids).str.startswith("OUTROS_").to_numpy(), "", ids)
+            quando = pd.Timestamp.today().normalize() if data is None else data
+            pu_hist = np.full(len(ids), np.nan)
+            for col in cols_pu:
+                if col in historico.campos:
+                    pu = historico.asof_pares(ids, quando, col)
+                    pu_hist = np.where(np.isnan(pu_hist) & (pu > 0), pu, pu_hist)
+            pu_atual[faltando] = pu_hist
+            do_historico[faltando] = ~np.isnan(pu_hist)
+
+        out["pu_atual"] = np.where(np.isnan(pu_atual), self.pu_custo, pu_atual)
+        out["valor_atual"] = self.qtd * out["pu_atual"].to_numpy()
+        out["resultado"] = out["valor_atual"] - out["custo"]
+        out.attrs["pu_historico"] = self.lote[do_historico].tolist()
+        return out
+
+    def agregar(self, valorizada: pd.DataFrame, por: str = "indexador") -> pd.DataFrame:
+        """
+        Somatório por indexador, titulo ou ano (de vencimento) a partir de valorizar().
+        bincount sobre os códigos do grupo: custo, valor_atual, resultado, lotes, peso.
+        """
+        chave = pd.DatetimeIndex(self.vencimento).year if por == "ano" else getattr(self, por)
+        codigos, grupos = pd.factorize(np.asarray(chave), sort=True)
+        n = len(grupos)
+        out = pd.DataFrame({por: grupos})
+        for col in ("custo", "valor_atual", "resultado"):
+            out[col] = np.bincount(codigos, weights=valorizada[col].to_numpy(), minlength=n)
+        out["lotes"] = np.bincount(codigos, minlength=n)
+        total = out["valor_atual"].sum()
+        out["peso"] = out["valor_atual"] / total if total else 0.0
+        return out
+
+    def risco(
+        self,
+        valorizada: pd.DataFrame,
+        metricas: pd.DataFrame,
+        choques_bps=CHOQUES_PADRAO_BPS,
+        data=None,
+    ) -> dict:
+        """
+        metricas: uma linha por título (tipo_titulo, duration_modified_anos), ex:
+        derivado metricas_risco. Duration média ponderada pelo valor, DV01 da
+        carteira e impacto linear (-Dmod * V * dy) por choque.
+        Lote sem linha em metricas (ou metricas vazio) tem a duration calculada
+        pelo prazo até o vencimento (a partir de data) e pela taxa de compra do
+        lote; esses lotes vêm em "dmod_estimado".
+        """
+        valor = valorizada["valor_atual"].to_numpy()
+        dmod = np.full(len(self), np.nan)
+        if metricas is not None and not metricas.empty:
+            tabela = metricas.drop_duplicates("tipo_titulo")
+            pos = pd.Index(tabela["tipo_titulo"].astype(str)).get_indexer(self.titulo)
+            d = tabela["duration_modified_anos"].to_numpy(dtype=float)
+            dmod = np.where(pos >= 0, d[np.maximum(pos, 0)], np.nan)
+
+        estimado = np.isnan(dmod)
+        if estimado.any():
+            from core.precificacao import modified_duration_vec
+
+            hoje = np.datetime64((pd.Timestamp.today() if data is None else pd.Timestamp(data)).date(), "D")
+            prazo = (self.vencimento[estimado] - hoje).astype(float) / 365.25
+            com_cupom = np.array(["juros semestrais" in str(t).lower() for t in self.titulo[estimado]], dtype=bool)
+            taxa = np.nan_to_num(self.taxa_compra[estimado]) / 100.0
+            dmod[estimado] = modified_duration_vec(prazo, taxa, com_cupom)
+        dmod = np.nan_to_num(dmod)
+
+        total = float(valor.sum())
+        soma_dv = float((dmod * valor).sum())
+        return {
+            "valor_total": total,
+            "custo_total": float(self.custo.sum()),
+            "duration_media": soma_dv / total if total > 0 else 0.0,
+            "dv01": soma_dv * 0.0001,
+            "impacto_por_choque": {int(b): -soma_dv * b / 10000.0 for b in choques_bps},
+            "dmod_por_lote": dmod,
+            "dmod_estimado": self.lote[estimado].tolist(),
+        }
+
+
+def como_portfolio(obj) -> Portfolio:
+    """Portfolio a partir do que estiver na sessão (Portfolio, lista antiga de dicts ou nada)."""
+    if isinstance(obj, Portfolio):
+        return obj
+    if isinstance(obj, list):
+        return Portfolio.from_legacy(obj)
+    return Portfolio.vazio()
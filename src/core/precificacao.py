@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import math
+import numpy as np
 import pandas as pd
 
 
@@ -125,6 +126,48 @@ def modified_duration(cashflows: list[Cashflow], y: float) -> float:
     return dmac / (1.0 + y)
 
 
+
+def _fluxos_vec(t_anos, y, com_cupom, cupom_aa: float, freq: int):
+    """
+    Baseline de build_cashflows_from_row vetorizado (arrays de mesmo shape ou
+    broadcast): bullet, ou cupons de cupom_aa/freq a cada 1/freq ano
+    retrocedendo do vencimento + principal. Prazos em anos (t - k/freq) em vez
+    de datas do calendário: diferença de poucos dias por fluxo.
+    Devolve (t, y, preço por 1 de face, soma t * VP); t <= 0 -> preço 0 (vencido).
+    """
+    t, y, cup = np.broadcast_arrays(np.asarray(t_anos, dtype=float), np.asarray(y, dtype=float), np.asarray(com_cupom, dtype=bool))
+    vivo = t > 0
+    pv = np.where(vivo, (1.0 + y) ** -np.where(vivo, t, 0.0), 0.0)   # principal
+    soma_t = np.array(np.where(vivo, t, 0.0) * pv)
+    sel = cup & vivo
+    if sel.any():
+        ts, ys = t[sel], 1.0 + y[sel]
+        pv_s, soma_s = pv[sel], soma_t[sel]
+        c = cupom_aa / freq
+        for k in range(int(np.ceil(ts.max() * freq))):
+            tk = ts - k / freq
+            ok = tk > 0
+            fluxo = np.where(ok, c * ys ** -np.where(ok, tk, 0.0), 0.0)
+            pv_s += fluxo
+            soma_s += tk * fluxo
+        pv[sel], soma_t[sel] = pv_s, soma_s
+    return t, y, pv, soma_t
+
+
+def price_from_yield_vec(t_anos, y, com_cupom, cupom_aa: float = 0.06, freq: int = 2) -> np.ndarray:
+    """Preço (por 1 de face) vetorizado, mesmos fluxos de modified_duration_vec; y em decimal."""
+    return _fluxos_vec(t_anos, y, com_cupom, cupom_aa, freq)[2]
+
+
+def modified_duration_vec(t_anos, y, com_cupom, cupom_aa: float = 0.06, freq: int = 2) -> np.ndarray:
+    """
+    Duration modificada vetorizada (ver _fluxos_vec para o cronograma).
+    t_anos <= 0 -> 0 (vencido); y em decimal.
+    """
+    _, y, pv, soma_t = _fluxos_vec(t_anos, y, com_cupom, cupom_aa, freq)
+    return np.divide(soma_t, pv, out=np.zeros_like(pv), where=pv > 0) / (1.0 + y)
+
+
 def dv01_from_duration(price: float, dmod: float) -> float:
     """
     DV01 aproximado: variação do preço para +1bp (0.0001) em y.
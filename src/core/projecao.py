@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from core.simulador import TAXA_B3_AA, aliquota_ir
+
+# Trajetória mês a mês do saldo de um ou vários títulos (x valores investidos),
+# tudo em arrays 2D (linha = título x valor, coluna = fim de mês):
+# - saldo na curva (taxa contratada + IPCA/Selic projetados mês a mês)
+# - custódia B3 acumulando dia a dia sobre o saldo, com faixa de isenção
+# - IR regressivo se resgatar naquela data
+# Sem loop por mês: fatores por passo -> cumprod; custódia -> cumsum.
+
+# Faixa isenta da custódia B3 por indexador (saldo até o limite não paga).
+# Regra vigente: Tesouro Selic isento até R$ 10 mil por investidor.
+ISENCAO_CUSTODIA = {"SELIC": 10_000.0}
+
+
+@dataclass
+class Trajetorias:
+    datas: pd.DatetimeIndex     # (M,) fins de mês (último passo = maior vencimento)
+    chaves: pd.DataFrame        # (N,) título + valor investido de cada linha
+    saldo: np.ndarray           # (N, M) saldo bruto na curva
+    custodia: np.ndarray        # (N, M) custódia B3 acumulada
+    ir: np.ndarray              # (N, M) IR devido se resgatar na data
+    liquido: np.ndarray         # (N, M) saldo - custódia - IR
+
+    def to_frame(self) -> pd.DataFrame:
+        """Formato longo (uma linha por título x valor x data), pronto para gráfico."""
+        n, m = self.saldo.shape
+        out = self.chaves.loc[self.chaves.index.repeat(m)].reset_index(drop=True)
+        out["data"] = np.tile(self.datas.to_numpy(), n)
+        out["saldo"] = self.saldo.ravel()
+        out["custodia"] = self.custodia.ravel()
+        out["ir"] = self.ir.ravel()
+        out["liquido"] = self.liquido.ravel()
+        return out
+
+
+def focus_por_ano(expectativas: pd.DataFrame, indicador: str) -> dict[int, float]:
+    """{ano: mediana} do snapshot Focus mais recente para o indicador (ex: "IPCA")."""
+    if expectativas is None or expectativas.empty:
+        return {}
+    df = expectativas[expectativas["indicador"].astype(str) == indicador]
+    if df.empty:
+        return {}
+    datas = pd.to_datetime(df["data"])
+    df = df[datas == datas.max()]
+    return {int(a): float(v) for a, v in zip(df["ano"], df["mediana"]) if pd.notna(v)}
+
+
+def caminho_anual(datas: pd.DatetimeIndex, por_ano: dict[int, float], padrao: float) -> np.ndarray:
+    """
+    Taxa anual (%) vigente em cada data: valor do ano no dict; anos depois do
+    último disponível repetem o último (longo prazo); sem dados -> padrao.
+    """
+    anos = np.asarray(datas.year)
+    if not por_ano:
+        return np.full(len(anos), float(padrao))
+    chaves = np.array(sorted(por_ano))
+    valores = np.array([por_ano[a] for a in chaves], dtype=float)
+    pos = np.clip(np.searchsorted(chaves, anos, side="right") - 1, 0, len(chaves) - 1)
+    return valores[pos]
+
+
+def datas_mensais(hoje: pd.Timestamp, ate: pd.Timestamp) -> pd.DatetimeIndex:
+    """Fins de mês entre hoje e ate; o último passo é a própria data ate."""
+    datas = pd.date_range(hoje, ate, freq="ME")
+    if len(datas) == 0 or datas[-1] < ate:
+        datas = datas.append(pd.DatetimeIndex([ate]))
+    return datas.normalize()
+
+
+def projetar_trajetorias(
+    df: pd.DataFrame,
+    valores,
+    ipca_aa: float,
+    selic_aa: float,
+    ipca_por_ano: dict[int, float] | None = None,
+    selic_por_ano: dict[int, float] | None = None,
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+    isencao: dict[str, float] | None = None,
+) -> Trajetorias:
+    """
+    df: títulos (tipo_titulo, indexador, data_vencimento, col_taxa); valores: um
+    número ou lista de valores investidos (produto cartesiano com os títulos).
+    ipca_aa / selic_aa (%): taxa constante; ipca_por_ano / selic_por_ano
+    ({ano: taxa}, ex: focus_por_ano) dão o caminho ano a ano e, se vazios, caem na constante.
+    Depois do vencimento o saldo fica parado (resgatado) e a custódia para.
+    """
+    hoje = (pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)).normalize()
+    isencao = ISENCAO_CUSTODIA if isencao is None else isencao
+    base = df[["tipo_titulo", "indexador", "data_vencimento", col_taxa]].copy()
+    base["data_vencimento"] = pd.to_datetime(base["data_vencimento"])
+    base = base[base["data_vencimento"] > hoje].reset_index(drop=True)
+
+    vals = np.atleast_1d(np.asarray(valores, dtype=float))
+    chaves = base.loc[base.index.repeat(len(vals))].reset_index(drop=True)
+    chaves["valor"] = np.tile(vals, len(base))
+    if chaves.empty:
+        vazio = np.empty((0, 0))
+        return Trajetorias(pd.DatetimeIndex([]), chaves, vazio, vazio, vazio, vazio)
+
+    datas = datas_mensais(hoje, chaves["data_vencimento"].max())
+    d = (datas - hoje).days.to_numpy(dtype=float)                              # (M,)
+    venc = (chaves["data_vencimento"] - hoje).dt.days.to_numpy(dtype=float)    # (N,)
+
+    # dias corridos de cada passo, cortados no vencimento de cada título
+    dias_ate = np.minimum(d[None, :], venc[:, None])                           # (N, M)
+    dt_dias = np.diff(dias_ate, axis=1, prepend=0.0)
+    dt = dt_dias / 365.25
+
+    ipca = caminho_anual(datas, ipca_por_ano or {}, ipca_aa)
+    selic = caminho_anual(datas, selic_por_ano or {}, selic_aa)
+
+    t = chaves[col_taxa].to_numpy(dtype=float)[:, None] / 100.0
+    idx = chaves["indexador"].astype(str).str.upper()
+    e_ipca = idx.str.contains("IPCA", regex=False).to_numpy()[:, None]
+    e_selic = idx.str.contains("SELIC", regex=False).to_numpy()[:, None]
+    taxa_aa = np.where(
+        e_ipca, (1 + t) * (1 + ipca[None, :] / 100.0) - 1,
+        np.where(e_selic, selic[None, :] / 100.0 + t, t),
+    )
+    saldo = chaves["valor"].to_numpy()[:, None] * np.cumprod((1 + taxa_aa) ** dt, axis=1)
+
+    if calc_b3:
+        limite = idx.map(lambda s: next((v for k, v in isencao.items() if k in s), 0.0)).to_numpy(dtype=float)
+        tributavel = np.maximum(0.0, saldo - limite[:, None])
+        custodia = np.cumsum(tributavel * TAXA_B3_AA * dt_dias / 365.0, axis=1)
+    else:
+        custodia = np.zeros_like(saldo)
+
+    if calc_ir:
+        aliq = aliquota_ir(dias_ate) / 100.0
+        ir = aliq * np.maximum(0.0, saldo - chaves["valor"].to_numpy()[:, None] - custodia)
+    else:
+        ir = np.zeros_like(saldo)
+
+    return Trajetorias(datas, chaves, saldo, custodia, ir, saldo - custodia - ir)
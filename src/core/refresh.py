@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+import json
+import threading
+import time
+
+from core.config import PROCESSED_DIR
+from core.manifest import load_manifest, register_dataset
+from core.storage import FileLock, atomic_write_text
+
+# single-flight entre processos: lock + resultado do último refresh concluído
+REFRESH_LOCK_PATH = PROCESSED_DIR / ".refresh.lock"
+REFRESH_LAST_RUN_PATH = PROCESSED_DIR / "refresh_last_run.json"
+
+# single-flight dentro do processo (todas as sessões Streamlit compartilham)
+_inflight_guard = threading.Lock()
+_inflight: Future | None = None
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Etapa do refresh. run() baixa/grava e devolve {dataset: arquivo gravado}.
+    """
+    name: str
+    run: Callable[[], dict[str, Path]]
+    depends_on: tuple[str, ...] = ()
+    label: str = ""
+
+
+@dataclass
+class StageResult:
+    name: str
+    label: str
+    ok: bool
+    seconds: float = 0.0
+    datasets: dict[str, Path] = field(default_factory=dict)
+    changed: list[str] = field(default_factory=list)
+    error: str | None = None
+    skipped: bool = False
+
+
+@dataclass
+class RefreshResult:
+    stages: dict[str, StageResult]
+    seconds: float
+    finished_at: float = 0.0
+    # True quando este chamador só aguardou um refresh iniciado por outro
+    joined: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.stages.values())
+
+    @property
+    def changed(self) -> set[str]:
+        return {d for r in self.stages.values() for d in r.changed}
+
+
+def _result_to_json(result: RefreshResult) -> str:
+    stages = [
+        {
+            "name": r.name, "label": r.label, "ok": r.ok, "seconds": r.seconds,
+            "datasets": {k: str(v) for k, v in r.datasets.items()},
+            "changed": r.changed, "error": r.error, "skipped": r.skipped,
+        }
+        for r in result.stages.values()
+    ]
+    payload = {"seconds": result.seconds, "finished_at": result.finished_at, "stages": stages}
+    return json.dumps(payload, indent=2, ensure_ascii=False)
+
+
+def _result_from_json(text: str) -> RefreshResult:
+    payload = json.loads(text)
+    stages = {}
+    for r in payload["stages"]:
+        r["datasets"] = {k: Path(v) for k, v in r["datasets"].items()}
+        stages[r["name"]] = StageResult(**r)
+    return RefreshResult(stages=stages, seconds=payload["seconds"], finished_at=payload["finished_at"])
+
+
+# =========================
+# ETAPAS PADRÃO
+# =========================
+
+def _stage_titulos() -> dict[str, Path]:
+    from core.datasources.investidor10 import fetch_catalogo, save_catalogo
+
+    return {"tesouro_catalogo": save_catalogo(fetch_catalogo(), PROCESSED_DIR)}
+
+
+def _stage_sgs() -> dict[str, Path]:
+    from core.datasources.bcb_sgs import SGS_SERIES_PADRAO, refresh_sgs_cache, sgs_cache_path
+
+    series = refresh_sgs_cache(list(SGS_SERIES_PADRAO.values()))
+    return {f"sgs_{c}": sgs_cache_path(c) for c, df in series.items() if not df.empty}
+
+
+def _stage_selic() -> dict[str, Path]:
+    from core.datasources.bcb_sgs import SGS_SERIE_SELIC_META, load_sgs_cache, save_selic_meta
+
+    df = load_sgs_cache(SGS_SERIE_SELIC_META)
+    if df.empty:
+        raise ValueError("Série 432 (Meta Selic) vazia no cache SGS.")
+    return {"selic_meta_sgs": save_selic_meta(df, PROCESSED_DIR)}
+
+
+def _stage_focus() -> dict[str, Path]:
+    from core.datasources.bcb_expectativas import FOCUS_IPCA_FILE, update_focus_ipca
+
+    update_focus_ipca(PROCESSED_DIR)
+    return {"focus_ipca": PROCESSED_DIR / FOCUS_IPCA_FILE}
+
+
+def _stage_derivados() -> dict[str, Path]:
+    from core.derivados import get_derivados
+
+    # só recalcula métricas/curvas/telas cujas entradas mudaram
+    get_derivados().update()
+    return {}
+
+
+def default_stages() -> list[Stage]:
+    """
+    Grafo do botão "Forçar Atualização":
+    títulos, SGS e Focus são independentes; a Meta Selic sai do cache SGS;
+    os derivados (core.derivados) rodam depois de títulos e Focus.
+    """
+    return [
+        Stage("titulos", _stage_titulos, label="Títulos"),
+        Stage("sgs", _stage_sgs, label="Séries SGS"),
+        Stage("selic", _stage_selic, depends_on=("sgs",), label="Selic"),
+        Stage("focus", _stage_focus, label="Inflação"),
+        Stage("derivados", _stage_derivados, depends_on=("titulos", "focus"), label="Métricas e curvas"),
+    ]
+
+
+# =========================
+# ORQUESTRADOR
+# =========================
+
+def _validate(stages: list[Stage]) -> dict[str, Stage]:
+    by_name = {s.name: s for s in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("Nomes de etapa repetidos.")
+    for s in stages:
+        missing = [d for d in s.depends_on if d not in by_name]
+        if missing:
+            raise ValueError(f"Etapa '{s.name}' depende de etapas inexistentes: {missing}")
+
+    # detecção de ciclo (DFS)
+    visiting: set[str] = set()
+    done: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Ciclo de dependências envolvendo '{name}'.")
+        visiting.add(name)
+        for d in by_name[name].depends_on:
+            visit(d)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in by_name:
+        visit(name)
+    return by_name
+
+
+def _timed(stage: Stage) -> tuple[dict[str, Path], float, Exception | None]:
+    """Roda a etapa; o tempo é medido também quando ela falha."""
+    t0 = time.perf_counter()
+    try:
+        datasets = stage.run() or {}
+    except Exception as e:
+        return {}, time.perf_counter() - t0, e
+    return datasets, time.perf_counter() - t0, None
+
+
+def run_refresh(
+    stages: list[Stage] | None = None,
+    max_workers: int = 4,
+) -> RefreshResult:
+    """
+    Roda as etapas no mesmo processo, em paralelo, respeitando depends_on.
+    - etapa cuja dependência falhou é marcada como skipped (ok=False)
+    - changed: datasets cuja versão no manifest subiu (conteúdo novo)
+    O tempo total fica limitado pelo caminho mais lento do grafo, não pela soma.
+    """
+    stages = stages if stages is not None else default_stages()
+    by_name = _validate(stages)
+    before = {name: e.version for name, e in load_manifest().items()}
+
+    t0 = time.perf_counter()
+    results: dict[str, StageResult] = {}
+    pending = dict(by_name)
+    running: dict[Future, Stage] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                deps = [results.get(d) for d in stage.depends_on]
+                if any(r is None for r in deps):
+                    continue
+                del pending[name]
+                if not all(r.ok for r in deps):
+                    failed = [r.name for r in deps if not r.ok]
+                    results[name] = StageResult(
+                        name, stage.label or name, ok=False, skipped=True,
+                        error=f"Dependência falhou: {', '.join(failed)}",
+                    )
+                    continue
+                running[pool.submit(_timed, stage)] = stage
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage = running.pop(fut)
+                label = stage.label or stage.name
+                datasets, seconds, erro = fut.result()
+                if erro is not None:
+                    results[stage.name] = StageResult(stage.name, label, ok=False, seconds=seconds, error=str(erro))
+                    continue
+
+                changed = []
+                for ds, path in datasets.items():
+                    # idempotente: quem já gravou com dataset=... não muda de versão aqui
+                    entry = register_dataset(ds, path)
+                    if before.get(ds) != entry.version:
+                        changed.append(ds)
+                results[stage.name] = StageResult(
+                    stage.name, label, ok=True, seconds=seconds,
+                    datasets={k: Path(v) for k, v in datasets.items()}, changed=changed,
+                )
+
+    ordered = {s.name: results[s.name] for s in stages}
+    return RefreshResult(stages=ordered, seconds=time.perf_counter() - t0, finished_at=time.time())
+
+
+def refresh_single_flight(
+    stages: list[Stage] | None = None,
+    max_workers: int = 4,
+    lock_path: str | Path = REFRESH_LOCK_PATH,
+    last_run_path: str | Path = REFRESH_LAST_RUN_PATH,
+) -> RefreshResult:
+    """
+    run_refresh com no máximo um refresh em andamento:
+    - mesmo processo: quem chega durante um refresh aguarda o Future em voo (joined=True)
+    - outros processos: serializados pelo FileLock; quem esperou o lock e encontra
+      um refresh concluído depois do seu pedido reaproveita esse resultado
+    """
+    global _inflight
+    requested_at = time.time()
+
+    with _inflight_guard:
+        fut = _inflight
+        owner = fut is None
+        if owner:
+            fut = _inflight = Future()
+
+    if not owner:
+        result = fut.result()
+        return RefreshResult(result.stages, result.seconds, result.finished_at, joined=True)
+
+    last_run_path = Path(last_run_path)
+    try:
+        with FileLock(lock_path):
+            last = None
+            try:
+                last = _result_from_json(last_run_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+            if last is not None and last.finished_at >= requested_at:
+                result = RefreshResult(last.stages, last.seconds, last.finished_at, joined=True)
+            else:
+                result = run_refresh(stages, max_workers=max_workers)
+                atomic_write_text(last_run_path, _result_to_json(result))
+        fut.set_result(result)
+        return result
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_guard:
+            _inflight = None
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+import fnmatch
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+if TYPE_CHECKING:
+    import pyarrow.dataset as ds
+
+# Strings repetidas viram dicionário (categorical no pandas), datas sem hora viram date32
+# e taxas/medianas cabem em float32. PU e valores SGS ficam em float64 (centavos / fatores diários).
+_CAT = pa.dictionary(pa.int16(), pa.string())
+
+CATALOGO = pa.schema([
+    ("tipo_titulo", _CAT),
+    ("id_titulo", _CAT),
+    ("indexador", _CAT),
+    ("cupom_txt", _CAT),
+    ("vencimento", pa.date32()),
+    ("data_base", pa.timestamp("ms")),   # Investidor10: carimbo com hora da raspagem
+    ("taxa_compra", pa.float32()),
+    ("taxa_venda", pa.float32()),
+    ("pu_compra", pa.float64()),
+    ("pu_venda", pa.float64()),
+    ("minimo_compra", pa.float32()),
+    ("ano_vencimento", pa.int16()),
+])
+
+HISTORICO = pa.schema([
+    ("data_base", pa.date32()),
+    ("id_titulo", _CAT),
+    ("indexador", _CAT),
+    ("cupom_txt", _CAT),
+    ("tipo_titulo", _CAT),
+    ("data_vencimento", pa.date32()),
+    ("taxa_compra", pa.float32()),
+    ("taxa_venda", pa.float32()),
+    ("pu_compra", pa.float64()),
+    ("pu_venda", pa.float64()),
+    ("pu_base", pa.float64()),
+])
+
+EXPECTATIVAS = pa.schema([
+    ("data", pa.date32()),
+    ("indicador", _CAT),
+    ("ano", pa.int16()),
+    ("mediana", pa.float32()),
+])
+
+FOCUS_RAW = pa.schema([
+    ("Indicador", _CAT),
+    ("Data", pa.date32()),
+    ("DataReferencia", pa.int16()),
+    ("Media", pa.float32()),
+    ("Mediana", pa.float32()),
+    ("DesvioPadrao", pa.float32()),
+    ("Minimo", pa.float32()),
+    ("Maximo", pa.float32()),
+    ("numeroRespondentes", pa.int32()),
+    ("baseCalculo", pa.int8()),
+])
+
+SGS = pa.schema([
+    ("data", pa.date32()),
+    ("valor", pa.float64()),
+])
+
+# CSV bruto do Tesouro Transparente (arquivo zstd com todas as datas)
+OFERTA_RAW = pa.schema([
+    ("Tipo Titulo", _CAT),
+    ("Data Vencimento", pa.date32()),
+    ("Data Base", pa.date32()),
+    ("Taxa Compra Manha", pa.float32()),
+    ("Taxa Venda Manha", pa.float32()),
+    ("PU Compra Manha", pa.float64()),
+    ("PU Venda Manha", pa.float64()),
+    ("PU Base Manha", pa.float64()),
+])
+
+# Lotes das carteiras salvas (core.carteiras): histórico por lote, ordenado por título
+CARTEIRA_LOTES = pa.schema([
+    ("lote", pa.int64()),
+    ("versao", pa.int32()),
+    ("removido", pa.bool_()),
+    ("titulo", _CAT),
+    ("indexador", _CAT),
+    ("vencimento", pa.date32()),
+    ("qtd", pa.float64()),
+    ("pu_custo", pa.float64()),
+    ("taxa_compra", pa.float64()),
+    ("data_compra", pa.date32()),
+    ("registrado_em", pa.timestamp("ms")),
+])
+
+# dataset do manifest -> schema (aceita curinga para as séries SGS)
+DATASET_SCHEMAS: dict[str, pa.Schema] = {
+    "tesouro_catalogo": CATALOGO,
+    "tesouro_historico": HISTORICO,
+    "expectativas_historico": EXPECTATIVAS,
+    "expectativas_snapshot": EXPECTATIVAS,
+    "focus_ipca": FOCUS_RAW,
+    "selic_meta_sgs": SGS,
+    "tesouro_oferta_arquivo": OFERTA_RAW,
+    "sgs_*": SGS,
+}
+
+
+def schema_for(dataset: str | None) -> pa.Schema | None:
+    if dataset is None:
+        return None
+    if dataset in DATASET_SCHEMAS:
+        return DATASET_SCHEMAS[dataset]
+    for pattern, schema in DATASET_SCHEMAS.items():
+        if fnmatch.fnmatchcase(dataset, pattern):
+            return schema
+    return None
+
+
+def apply_schema(df: pd.DataFrame, schema: pa.Schema) -> pd.DataFrame:
+    """
+    Converte as colunas do schema presentes no df para os dtypes compactos (lado pandas).
+    Colunas fora do schema ficam como estão. Categorias saem em ordem alfabética,
+    para sort_values continuar ordenando como antes.
+    """
+    df = df.copy()
+    for field in schema:
+        if field.name not in df.columns:
+            continue
+        col = df[field.name]
+        t = field.type
+        if pa.types.is_dictionary(t) and isinstance(col.dtype, pd.CategoricalDtype):
+            # já categórico: só limpa e ordena as categorias (não toca nas linhas)
+            col = col.cat.remove_unused_categories()
+            df[field.name] = col.cat.reorder_categories(sorted(col.cat.categories))
+        elif pa.types.is_dictionary(t):
+            vals = col.astype("string").astype(object).where(col.notna(), None)
+            cats = sorted(v for v in pd.unique(vals) if v is not None)
+            df[field.name] = pd.Categorical(vals, categories=cats)
+        elif pa.types.is_date32(t) and pd.api.types.is_datetime64_dtype(col.dtype):
+            # já é data (sem fuso): trunca no dia direto no numpy
+            df[field.name] = col.to_numpy().astype("datetime64[D]").astype("datetime64[ms]")
+        elif pa.types.is_date32(t):
+            df[field.name] = pd.to_datetime(col, errors="coerce").dt.normalize().astype("datetime64[ms]")
+        elif pa.types.is_timestamp(t):
+            df[field.name] = pd.to_datetime(col, errors="coerce").astype("datetime64[ms]")
+        elif pa.types.is_integer(t):
+            num = pd.to_numeric(col, errors="coerce")
+            df[field.name] = num.astype(t.to_pandas_dtype()) if num.notna().all() else num
+        elif pa.types.is_floating(t):
+            df[field.name] = pd.to_numeric(col, errors="coerce").astype(t.to_pandas_dtype())
+    return df
+
+
+def to_arrow(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """
+    DataFrame -> tabela Arrow com os tipos do schema (date32, dicionário, float32...).
+    """
+    df = apply_schema(df, schema)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return conform_table(table, schema)
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Faz cast das colunas conhecidas para o tipo do schema (arquivos antigos / escritos sem schema)."""
+    for field in schema:
+        i = table.schema.get_field_index(field.name)
+        if i < 0 or table.schema.field(i).type == field.type:
+            continue
+        col = table.column(i)
+        if pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(col.type):
+            col = col.cast(pa.string()).dictionary_encode().cast(field.type)
+        elif pa.types.is_date32(field.type) and pa.types.is_timestamp(col.type):
+            col = col.cast(pa.timestamp("ms")).cast(pa.date32())
+        else:
+            col = col.cast(field.type, safe=False)
+        table = table.set_column(i, pa.field(field.name, field.type), col)
+    return table
+
+
+def validate_table(table: pa.Table, schema: pa.Schema) -> list[str]:
+    """Lista de divergências (coluna: tipo lido != tipo esperado). Vazia = ok."""
+    problems = []
+    for field in schema:
+        i = table.schema.get_field_index(field.name)
+        if i >= 0 and table.schema.field(i).type != field.type:
+            problems.append(f"{field.name}: {table.schema.field(i).type} != {field.type}")
+    return problems
+
+
+def to_frame(table: pa.Table) -> pd.DataFrame:
+    # date_as_object=False: date32 vira datetime64 (e não objetos datetime.date)
+    return table.to_pandas(date_as_object=False, split_blocks=True)
+
+
+def _as_date(v) -> date:
+    return pd.Timestamp(v).date()
+
+
+def row_filter(
+    isin: dict[str, Iterable] | None = None,
+    between: dict[str, tuple] | None = None,
+) -> ds.Expression | None:
+    """
+    Monta o filtro de pushdown para read_parquet.
+    isin: {coluna: valores}; between: {coluna_data: (inicio, fim)} com limites
+    inclusivos e None = aberto. Parâmetros None/vazios são ignorados.
+    """
+    import pyarrow.dataset as ds  # só carrega quando há filtro
+
+    conds = []
+    for col, values in (isin or {}).items():
+        if values is None:
+            continue
+        if isinstance(values, (str, int)):
+            values = [values]
+        conds.append(ds.field(col).isin(list(values)))
+    for col, (start, end) in (between or {}).items():
+        # date funciona tanto contra date32 quanto contra timestamp (arquivos antigos)
+        if start is not None:
+            conds.append(ds.field(col) >= _as_date(start))
+        if end is not None:
+            conds.append(ds.field(col) <= _as_date(end))
+    if not conds:
+        return None
+    expr = conds[0]
+    for c in conds[1:]:
+        expr = expr & c
+    return expr
+
+
+def read_parquet(
+    path: str | Path,
+    dataset: str | None = None,
+    columns: list[str] | None = None,
+    memory_map: bool = True,
+    filters: ds.Expression | None = None,
+) -> pd.DataFrame:
+    """
+    Lê parquet validando contra o schema do dataset; arquivos fora do padrão
+    (gravados antes do schema) são convertidos na leitura.
+    filters (ver row_filter) e columns vão para o leitor: row groups cujas
+    estatísticas não batem com o filtro nem são lidos.
+    """
+    table = pq.read_table(path, columns=columns, memory_map=memory_map, filters=filters)
+    schema = schema_for(dataset)
+    if schema is not None and validate_table(table, schema):
+        table = conform_table(table, schema)
+    return to_frame(table)
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Campos guardados por título (todos float64, NaN = sem valor no dia)
+CAMPOS_PADRAO = ("taxa_compra", "taxa_venda", "pu_compra", "pu_venda")
+
+
+def _to_days(datas) -> np.ndarray:
+    """Datas (escalar, lista, Series, datetime64) -> int64 em dias desde 1970-01-01."""
+    if np.ndim(datas) == 0:
+        return np.array([pd.Timestamp(datas).value // 86_400_000_000_000], dtype=np.int64)
+    arr = pd.to_datetime(np.atleast_1d(np.asarray(datas))).to_numpy(dtype="datetime64[D]")
+    return arr.astype(np.int64)
+
+
+@dataclass
+class _Serie:
+    dias: np.ndarray      # int64, ordenado e sem repetição
+    valores: np.ndarray   # float64 (n_dias x n_campos)
+
+
+class SerieIndex:
+    """
+    Índice por id_titulo: arrays ordenados de datas e valores.
+    Consultas "as-of" (valor na data ou o último disponível antes dela)
+    são um searchsorted por título, sem filtrar o histórico inteiro.
+    """
+
+    def __init__(self, campos: tuple[str, ...] = CAMPOS_PADRAO):
+        self.campos = tuple(campos)
+        self._pos = {c: i for i, c in enumerate(self.campos)}
+        self._series: dict[str, _Serie] = {}
+        self.version = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, campos: tuple[str, ...] = CAMPOS_PADRAO) -> SerieIndex:
+        idx = cls(campos)
+        idx.append(df)
+        return idx
+
+    def _colunas(self, df: pd.DataFrame) -> np.ndarray:
+        return np.column_stack([
+            pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64) if c in df.columns
+            else np.full(len(df), np.nan)
+            for c in self.campos
+        ])
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Incorpora linhas novas (data_base, id_titulo, campos...).
+        Caso comum (datas depois da última do título) é só concatenar;
+        dia já existente para o título é mantido (mesma regra do drop_duplicates
+        de append_to_history).
+        """
+        if df is None or df.empty:
+            return
+        df = df.dropna(subset=["id_titulo", "data_base"])
+        ids = df["id_titulo"].astype(str).to_numpy()
+        dias = _to_days(df["data_base"])
+        vals = self._colunas(df)
+
+        # agrupa por título uma vez (ordem estável: data e, no empate, ordem de chegada)
+        ordem = np.lexsort((np.arange(len(ids)), dias, ids))
+        ids, dias, vals = ids[ordem], dias[ordem], vals[ordem]
+        cortes = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        for ini, fim in zip(np.r_[0, cortes], np.r_[cortes, len(ids)]):
+            tid = ids[ini]
+            d, v = dias[ini:fim], vals[ini:fim]
+            atual = self._series.get(tid)
+            if atual is not None:
+                fora_de_ordem = d[0] <= atual.dias[-1]
+                d = np.concatenate([atual.dias, d])
+                v = np.concatenate([atual.valores, v])
+                if fora_de_ordem:
+                    o = np.argsort(d, kind="stable")
+                    d, v = d[o], v[o]
+            # mantém a primeira ocorrência de cada dia
+            primeiro = np.r_[True, d[1:] != d[:-1]]
+            self._series[tid] = _Serie(d[primeiro], v[primeiro])
+
+    def ids(self) -> list[str]:
+        return sorted(self._series)
+
+    def __contains__(self, id_titulo: str) -> bool:
+        return id_titulo in self._series
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def serie(self, id_titulo: str) -> pd.DataFrame:
+        s = self._series.get(id_titulo)
+        if s is None:
+            return pd.DataFrame(columns=["data_base", *self.campos])
+        out = pd.DataFrame(s.valores, columns=list(self.campos))
+        out.insert(0, "data_base", s.dias.astype("datetime64[D]").astype("datetime64[ns]"))
+        return out
+
+    def ultima_data(self, id_titulo: str) -> pd.Timestamp | None:
+        s = self._series.get(id_titulo)
+        return pd.Timestamp(s.dias[-1].astype("datetime64[D]")) if s is not None else None
+
+    def asof_many(self, id_titulo: str, datas, campo: str = "taxa_compra") -> np.ndarray:
+        """Valores de um título em várias datas (NaN antes da primeira observação)."""
+        dias = _to_days(datas)
+        out = np.full(len(dias), np.nan)
+        s = self._series.get(id_titulo)
+        if s is None:
+            return out
+        pos = np.searchsorted(s.dias, dias, side="right") - 1
+        ok = pos >= 0
+        out[ok] = s.valores[pos[ok], self._pos[campo]]
+        return out
+
+    def asof(self, id_titulo: str, data, campo: str | None = None):
+        """
+        Valor na data (ou o último antes dela).
+        campo=None devolve {campo: valor, "data_base": data efetiva}; sem dado, None.
+        """
+        s = self._series.get(id_titulo)
+        if s is None:
+            return None
+        i = int(np.searchsorted(s.dias, _to_days(data)[0], side="right")) - 1
+        if i < 0:
+            return None
+        if campo is not None:
+            return float(s.valores[i, self._pos[campo]])
+        out = {c: float(s.valores[i, j]) for j, c in enumerate(self.campos)}
+        out["data_base"] = pd.Timestamp(s.dias[i].astype("datetime64[D]"))
+        return out
+
+    def asof_pares(self, ids, datas, campo: str = "taxa_compra") -> np.ndarray:
+        """
+        Versão vetorizada para pares (id_titulo[i], data[i]) — ex: lotes de uma carteira.
+        Um searchsorted por título distinto.
+        """
+        ids = np.asarray(ids, dtype=object).astype(str)
+        dias = _to_days(datas)
+        if len(dias) == 1 and len(ids) > 1:
+            dias = np.repeat(dias, len(ids))
+        out = np.full(len(ids), np.nan)
+        codes, uniq = pd.factorize(ids)
+        j = self._pos[campo]
+        for k, tid in enumerate(uniq):
+            s = self._series.get(tid)
+            if s is None:
+                continue
+            sel = np.flatnonzero(codes == k)
+            pos = np.searchsorted(s.dias, dias[sel], side="right") - 1
+            ok = pos >= 0
+            out[sel[ok]] = s.valores[pos[ok], j]
+        return out
+
+
+# =========================
+# ÍNDICE DO PROCESSO
+# =========================
+
+_lock = threading.Lock()
+_index: SerieIndex | None = None
+
+
+def get_serie_index() -> SerieIndex:
+    """
+    Índice do histórico oficial, construído uma vez por versão do manifest.
+    append_to_history atualiza o índice em memória incrementalmente.
+    """
+    global _index
+    from core.manifest import dataset_version
+    from core.store import get_store
+
+    versao = dataset_version("tesouro_historico")
+    idx = _index
+    if idx is not None and idx.version == versao:
+        return idx
+    with _lock:
+        if _index is None or _index.version != versao:
+            novo = SerieIndex.from_frame(get_store().frame("tesouro_historico"))
+            novo.version = versao
+            _index = novo
+        return _index
+
+
+def notify_append(df_novo: pd.DataFrame, versao_anterior: int, versao_nova: int) -> None:
+    """
+    Chamado após gravar linhas novas no histórico: se o índice em memória
+    estava na versão anterior, só acrescenta as linhas (sem reconstruir).
+    """
+    with _lock:
+        if _index is not None and _index.version == versao_anterior:
+            _index.append(df_novo)
+            _index.version = versao_nova
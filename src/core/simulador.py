@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Projeção "segurar até o vencimento" do Simulador, vetorizada:
+# as mesmas contas da página (IR regressivo, custódia B3, Poupança, CDI),
+# para todos os títulos do filtro de uma vez.
+
+TAXA_B3_AA = 0.0020      # custódia B3 (0,20% a.a. sobre o bruto, aprox.)
+POUPANCA_AA = 0.07       # referência simples da página
+
+
+def aliquota_ir(dias) -> np.ndarray:
+    """IR regressivo (%): 22,5 / 20 / 17,5 / 15 conforme os dias corridos."""
+    d = np.asarray(dias, dtype=float)
+    return np.select([d <= 180, d <= 360, d <= 720], [22.5, 20.0, 17.5], 15.0)
+
+
+def taxa_bruta_anual(taxa, indexador, ipca_proj, selic_proj) -> np.ndarray:
+    """
+    Taxa nominal a.a. (decimal) por indexador, com IPCA/Selic projetados (em %).
+    taxa: (N,) ou (N, 1, ...) para grids; indexador: (N,); ipca_proj/selic_proj:
+    número ou array com broadcast contra taxa (ex: (N,) por título, (I, 1) x (1, S) no grid).
+    """
+    t = np.asarray(taxa, dtype=float) / 100.0
+    idx = pd.Series(np.asarray(indexador)).astype(str).str.upper()
+    ipca = np.asarray(ipca_proj, dtype=float) / 100.0
+    selic = np.asarray(selic_proj, dtype=float) / 100.0
+    e_ipca = idx.str.contains("IPCA", regex=False).to_numpy().reshape(t.shape)
+    e_selic = idx.str.contains("SELIC", regex=False).to_numpy().reshape(t.shape)
+    return np.where(e_ipca, (1 + t) * (1 + ipca) - 1, np.where(e_selic, selic + t, t))
+
+
+def liquido_de_bruto(valor, bruto, anos, aliq, calc_ir: bool, calc_b3: bool):
+    """Bruto no vencimento -> (custo_b3, ir, liquido); arrays com broadcast."""
+    custo_b3 = bruto * (TAXA_B3_AA * anos) if calc_b3 else np.zeros_like(bruto)
+    base_ir = np.maximum(0.0, bruto - valor - custo_b3)
+    ir = base_ir * (aliq / 100.0) if calc_ir else np.zeros_like(bruto)
+    return custo_b3, ir, bruto - custo_b3 - ir
+
+
+def _liquido(valor, taxa_pct, indexador, anos, aliq, ipca_proj, selic_proj, calc_ir: bool, calc_b3: bool):
+    """
+    Núcleo das contas: taxa bruta -> bruto -> custódia -> IR -> líquido.
+    ipca_proj/selic_proj podem ser arrays que fazem broadcast com taxa/anos
+    (ex: superfície de sensibilidade); devolve (taxa_bruta, bruto, custo_b3, ir, liquido).
+    """
+    tb = taxa_bruta_anual(taxa_pct, indexador, ipca_proj, selic_proj)
+    bruto = valor * (1 + tb) ** anos
+    custo_b3, ir, liquido = liquido_de_bruto(valor, bruto, anos, aliq, calc_ir, calc_b3)
+    return tb, bruto, custo_b3, ir, liquido
+
+
+def titulos_vivos(df: pd.DataFrame, col_taxa: str, hoje: pd.Timestamp) -> tuple[pd.DataFrame, np.ndarray]:
+    """Colunas usadas nas contas (+ label_completo/id_titulo) só dos títulos ainda não vencidos, e os dias até o vencimento."""
+    cols = ["tipo_titulo", "indexador", "data_vencimento", col_taxa]
+    extra = [c for c in ("label_completo", "id_titulo") if c in df.columns]
+    out = df[cols + extra].copy()
+    dias = (pd.to_datetime(out["data_vencimento"]) - hoje).dt.days.to_numpy(dtype=float)
+    vivos = dias > 0
+    return out[vivos].reset_index(drop=True), dias[vivos]
+
+
+def cdi_liquido(valor, anos, aliq, selic_proj, calc_ir: bool = True):
+    """Referência CDI (100% da Selic projetada) líquida de IR no mesmo prazo."""
+    cdi_bruto = valor * (1 + np.asarray(selic_proj, dtype=float) / 100.0) ** anos
+    return cdi_bruto - (cdi_bruto - valor) * (aliq / 100.0) if calc_ir else cdi_bruto
+
+
+def simular_catalogo(
+    df: pd.DataFrame,
+    valor: float,
+    ipca_proj: float,
+    selic_proj: float,
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """
+    Projeta valor investido hoje até o vencimento de cada título do df
+    (colunas: tipo_titulo, indexador, data_vencimento, col_taxa).
+    Títulos já vencidos ficam de fora. Saída ordenada pela rentabilidade
+    líquida a.a. (rank 1 = melhor).
+    """
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    out, dias = titulos_vivos(df, col_taxa, hoje)
+    out["dias"] = dias
+    anos = dias / 365.25
+
+    aliq = aliquota_ir(dias)
+    tb, bruto, custo_b3, ir, liquido = _liquido(
+        valor, out[col_taxa], out["indexador"], anos, aliq, ipca_proj, selic_proj, calc_ir, calc_b3
+    )
+
+    poupanca = valor * (1 + POUPANCA_AA) ** anos
+    cdi_liq = cdi_liquido(valor, anos, aliq, selic_proj, calc_ir)
+
+    out["anos"] = anos
+    out["taxa_bruta_aa"] = tb * 100.0
+    out["bruto"] = bruto
+    out["custo_b3"] = custo_b3
+    out["aliquota_ir"] = aliq
+    out["ir"] = ir
+    out["liquido"] = liquido
+    out["lucro_liquido"] = liquido - valor
+    out["rent_liq_aa"] = ((liquido / valor) ** (1 / anos) - 1) * 100.0
+    out["poupanca"] = poupanca
+    out["cdi_liquido"] = cdi_liq
+    out["vs_poupanca"] = liquido - poupanca
+    out["vs_cdi"] = liquido - cdi_liq
+
+    out = out.sort_values("rent_liq_aa", ascending=False, kind="stable").reset_index(drop=True)
+    out.insert(0, "rank", np.arange(1, len(out) + 1))
+    return out
+
+
+@dataclass
+class Superficie:
+    ipca: np.ndarray            # (I,) eixo de IPCA (%)
+    selic: np.ndarray           # (S,) eixo de Selic (%)
+    titulos: pd.DataFrame       # (N,) títulos avaliados (mesma ordem do eixo 0)
+    liquido: np.ndarray         # (N, I, S) valor líquido no vencimento
+    rent_liq_aa: np.ndarray     # (N, I, S) rentabilidade líquida a.a. (%)
+
+
+def sensibilidade(
+    df: pd.DataFrame,
+    valor: float,
+    ipca_grid,
+    selic_grid,
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+) -> Superficie:
+    """
+    Mesmas contas de simular_catalogo para todo o grid IPCA x Selic de uma vez
+    (broadcast N x I x S, sem loop). Títulos já vencidos ficam de fora.
+    """
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    ipca = np.asarray(ipca_grid, dtype=float)
+    selic = np.asarray(selic_grid, dtype=float)
+    tit, dias = titulos_vivos(df, col_taxa, hoje)
+
+    anos = (dias / 365.25)[:, None, None]
+    aliq = aliquota_ir(dias)[:, None, None]
+    _, _, _, _, liquido = _liquido(
+        valor, tit[col_taxa].to_numpy(dtype=float)[:, None, None], tit["indexador"], anos, aliq,
+        ipca[:, None], selic[None, :], calc_ir, calc_b3,
+    )
+    rent = ((liquido / valor) ** (1 / anos) - 1) * 100.0
+    return Superficie(ipca, selic, tit, liquido, rent)
+
+
+# --- Metas (inverso da projeção), para o catálogo todo numa chamada ---
+
+def _bissecao(f, lo: float, hi: float, n: int, iteracoes: int = 60) -> np.ndarray:
+    """Raiz de f crescente em [lo, hi], vetorizada em n problemas. Sem raiz no intervalo (ou f NaN) -> NaN."""
+    a = np.full(n, float(lo))
+    b = np.full(n, float(hi))
+    fa, fb = f(a), f(b)
+    sem_raiz = (fa > 0) | (fb < 0) | np.isnan(fa) | np.isnan(fb)
+    for _ in range(iteracoes):
+        m = (a + b) / 2
+        acima = f(m) > 0
+        b = np.where(acima, m, b)
+        a = np.where(acima, a, m)
+    return np.where(sem_raiz, np.nan, (a + b) / 2)
+
+
+def valor_para_alvo(
+    df: pd.DataFrame,
+    alvo: float,
+    ipca_proj: float,
+    selic_proj: float,
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """
+    Quanto investir hoje em cada título para ter `alvo` líquido no vencimento.
+    Líquido é homogêneo no valor (custódia e IR proporcionais): resolve por
+    divisão, sem iteração. Coluna: valor_necessario.
+    """
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    out, dias = titulos_vivos(df, col_taxa, hoje)
+    anos = dias / 365.25
+    *_, por_real = _liquido(1.0, out[col_taxa], out["indexador"], anos, aliquota_ir(dias), ipca_proj, selic_proj, calc_ir, calc_b3)
+    out["anos"] = anos
+    out["valor_necessario"] = alvo / por_real
+    return out.sort_values("valor_necessario", kind="stable").reset_index(drop=True)
+
+
+def taxa_para_alvo(
+    df: pd.DataFrame,
+    valor: float,
+    ipca_proj: float,
+    selic_proj: float,
+    alvo: float | None = None,
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """
+    Taxa contratada (na forma do título: prefixada, IPCA + x, SELIC + x) que leva
+    `valor` a `alvo` líquido no vencimento; alvo=None -> empatar com o CDI líquido
+    no mesmo prazo. Colunas: taxa_necessaria, folga (taxa atual - necessária, p.p.).
+    """
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    out, dias = titulos_vivos(df, col_taxa, hoje)
+    anos = dias / 365.25
+    aliq = aliquota_ir(dias)
+    meta = cdi_liquido(valor, anos, aliq, selic_proj, calc_ir) if alvo is None else np.full(len(out), float(alvo))
+    idx = out["indexador"]
+
+    def f(taxa):
+        *_, liq = _liquido(valor, taxa, idx, anos, aliq, ipca_proj, selic_proj, calc_ir, calc_b3)
+        return liq - meta
+
+    out["anos"] = anos
+    out["alvo_liquido"] = meta
+    out["taxa_necessaria"] = _bissecao(f, -20.0, 100.0, len(out))
+    out["folga"] = out[col_taxa].astype(float) - out["taxa_necessaria"]
+    return out.sort_values("folga", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def ipca_breakeven(
+    df: pd.DataFrame,
+    valor: float,
+    selic_proj: float,
+    col_taxa: str = "taxa_compra",
+    calc_ir: bool = True,
+    calc_b3: bool = True,
+    hoje: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """
+    IPCA médio (% a.a.) acima do qual cada título IPCA+ rende mais que o CDI
+    líquido no mesmo prazo. Só títulos IPCA. Coluna: ipca_breakeven.
+    """
+    hoje = pd.Timestamp.today() if hoje is None else pd.Timestamp(hoje)
+    out, dias = titulos_vivos(df, col_taxa, hoje)
+    e_ipca = out["indexador"].astype(str).str.upper().str.contains("IPCA", regex=False).to_numpy()
+    out, dias = out[e_ipca].reset_index(drop=True), dias[e_ipca]
+    anos = dias / 365.25
+    aliq = aliquota_ir(dias)
+    meta = cdi_liquido(valor, anos, aliq, selic_proj, calc_ir)
+
+    def f(ipca):
+        *_, liq = _liquido(valor, out[col_taxa], out["indexador"], anos, aliq, ipca, selic_proj, calc_ir, calc_b3)
+        return liq - meta
+
+    out["anos"] = anos
+    out["ipca_breakeven"] = _bissecao(f, -10.0, 50.0, len(out))
+    return out.sort_values("ipca_breakeven", kind="stable").reset_index(drop=True)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from pathlib import Path
+import hashlib
+import os
+import uuid
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _tmp_path(path: Path) -> Path:
+    # mesmo diretório do destino: os.replace só é atômico dentro do mesmo filesystem
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+
+
+def file_digest(path: str | Path) -> str | None:
+    path = Path(path)
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def atomic_write_parquet(
+    df: pd.DataFrame,
+    path: str | Path,
+    dataset: str | None = None,
+    schema=None,
+    **kwargs,
+) -> Path:
+    """
+    Grava parquet em arquivo temporário e troca pelo destino com os.replace.
+    Leitores veem o arquivo antigo ou o novo inteiro, nunca pela metade.
+    dataset: se informado, grava com o schema compacto do dataset (core.schemas)
+    e registra a nova versão no manifest. schema: força um pa.Schema específico.
+    """
+    from core.schemas import schema_for, to_arrow
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = schema if schema is not None else schema_for(dataset)
+    tmp = _tmp_path(path)
+    try:
+        if schema is not None:
+            import pyarrow.parquet as pq
+
+            kwargs.pop("index", None)
+            pq.write_table(to_arrow(df, schema), tmp, **kwargs)
+        else:
+            kwargs.setdefault("index", False)
+            df.to_parquet(tmp, **kwargs)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    if dataset is not None:
+        from core.manifest import register_dataset
+
+        register_dataset(dataset, path)
+    return path
+
+
+def atomic_write_text(path: str | Path, text: str, encoding: str = "utf-8") -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    try:
+        tmp.write_text(text, encoding=encoding)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path
+
+
+class FileLock:
+    """
+    Lock exclusivo entre processos (flock no POSIX, msvcrt no Windows).
+    Bloqueia até conseguir; é liberado no __exit__ ou se o processo morrer.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fh = None
+
+    def __enter__(self) -> FileLock:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        else:
+            self._fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.manifest import resolve
+from core.schemas import conform_table, schema_for, to_frame, validate_table
+
+
+@dataclass(frozen=True)
+class _Loaded:
+    version: int
+    path: str
+    table: pa.Table
+    frame: pd.DataFrame
+
+
+class MarketDataStore:
+    """
+    Cache de processo para os datasets do manifest (um por processo Streamlit).
+    - cada dataset é lido uma vez como tabela Arrow (memory-mapped)
+    - a conversão para pandas também acontece uma vez por versão
+    - frame() devolve uma cópia rasa: as sessões compartilham os mesmos buffers;
+      com Copy-on-Write (pandas >= 3) atribuir numa cópia copia só a coluna, e
+      to_numpy()/values devolvem arrays somente leitura
+    - recarrega só quando a versão no manifest muda
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded: dict[str, _Loaded] = {}
+
+    def _get(self, name: str) -> _Loaded | None:
+        entry = resolve(name)
+        if entry is None:
+            return None
+
+        path = str(entry.abs_path)
+        cur = self._loaded.get(name)
+        if cur is not None and cur.version == entry.version and cur.path == path:
+            return cur
+
+        with self._lock:
+            cur = self._loaded.get(name)
+            if cur is not None and cur.version == entry.version and cur.path == path:
+                return cur
+            # memory_map: páginas do arquivo entram sob demanda e são compartilhadas pelo SO;
+            # os.replace do writer não invalida o mapeamento antigo (inode continua vivo)
+            table = pq.read_table(path, memory_map=True)
+            schema = schema_for(name)
+            if schema is not None and validate_table(table, schema):
+                # arquivo anterior ao schema compacto: converte na leitura
+                table = conform_table(table, schema)
+            frame = to_frame(table)
+            cur = _Loaded(entry.version, path, table, frame)
+            self._loaded[name] = cur
+            return cur
+
+    def table(self, name: str) -> pa.Table | None:
+        """Tabela Arrow atual (imutável por construção)."""
+        cur = self._get(name)
+        return cur.table if cur is not None else None
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """
+        DataFrame atual do dataset (vazio se não existir).
+        Cópia rasa (Copy-on-Write): adicionar/substituir colunas ou atribuir via
+        pandas copia só o que muda; arrays extraídos com to_numpy()/values são
+        somente leitura.
+        """
+        cur = self._get(name)
+        if cur is None:
+            return pd.DataFrame()
+        return cur.frame.copy(deep=False)
+
+    def version(self, name: str) -> int:
+        cur = self._get(name)
+        return cur.version if cur is not None else 0
+
+    def path(self, name: str) -> str | None:
+        cur = self._get(name)
+        return cur.path if cur is not None else None
+
+    def loaded(self) -> dict[str, int]:
+        """{dataset: versão} do que está em memória (diagnóstico)."""
+        return {k: v.version for k, v in self._loaded.items()}
+
+
+_STORE = MarketDataStore()
+
+
+def get_store() -> MarketDataStore:
+    return _STORE
+
+
+def load_frame(name: str) -> pd.DataFrame:
+    return _STORE.frame(name)
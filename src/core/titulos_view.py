@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# View-model do Simulador (pages/titulos.py): todas as colunas de exibição
+# calculadas de uma vez, por operações vetorizadas, e memoizadas por
+# (versão do catálogo, modo). Rerun de widget que não muda nada disso = custo ~0.
+
+MODOS = {
+    "Compra": ("taxa_compra", "pu_compra"),
+    "Venda": ("taxa_venda", "pu_venda"),
+}
+
+_BRL = str.maketrans({",": ".", ".": ","})
+
+_memo_lock = threading.Lock()
+_memo: dict[tuple[int, str], pd.DataFrame] = {}
+
+
+def classificar_indexador(tipo_titulo: pd.Series) -> pd.Series:
+    """IPCA (inclui Renda+/Educa+), SELIC ou PREFIXADO, a partir do nome do título."""
+    t = tipo_titulo.astype(str).str.upper()
+    ipca = t.str.contains("IPCA", regex=False) | t.str.contains("RENDA+", regex=False) | t.str.contains("EDUCA+", regex=False)
+    selic = t.str.contains("SELIC", regex=False)
+    return pd.Series(np.select([ipca, selic], ["IPCA", "SELIC"], "PREFIXADO"), index=tipo_titulo.index)
+
+
+def fmt_brl(valores: pd.Series) -> pd.Series:
+    """R$ 1.234,56 (traço para NaN)."""
+    v = pd.to_numeric(valores, errors="coerce")
+    txt = v.map("R$ {:,.2f}".format, na_action="ignore").str.translate(_BRL)
+    return txt.fillna("-")
+
+
+def fmt_taxa(taxa: pd.Series, indexador: pd.Series) -> pd.Series:
+    """IPCA + 7.50% / SELIC + 0.0455% / 12.90% (traço para NaN)."""
+    v = pd.to_numeric(taxa, errors="coerce").to_numpy(dtype=float)
+    idx = indexador.astype(str).str.upper()
+    com_2 = pd.Series(np.char.mod("%.2f", v), index=taxa.index)
+    com_4 = pd.Series(np.char.mod("%.4f", v), index=taxa.index)
+    out = np.select(
+        [idx.str.contains("IPCA", regex=False), idx.str.contains("SELIC", regex=False)],
+        ["IPCA + " + com_2 + "%", "SELIC + " + com_4 + "%"],
+        com_2 + "%",
+    )
+    return pd.Series(np.where(np.isnan(v), "-", out), index=taxa.index)
+
+
+def build_titulos_view(df: pd.DataFrame, modo: str = "Compra") -> pd.DataFrame:
+    """
+    Catálogo -> DataFrame pronto para a página:
+    indexador corrigido, data_vencimento, prazo_anos, minimo_compra, cupom_txt,
+    rentabilidade_texto / label_completo (pela taxa do modo) e textos da tabela.
+    """
+    col_taxa, col_pu = MODOS[modo]
+    df = df.copy()
+    if df.empty:
+        return df
+
+    if "indexador" not in df.columns:
+        df["indexador"] = classificar_indexador(df["tipo_titulo"])
+    else:
+        # Renda+ vem como OUTROS em catálogos antigos: reclassifica só esses
+        renda = df["tipo_titulo"].astype(str).str.upper().str.contains("RENDA", regex=False)
+        df["indexador"] = np.where(renda, classificar_indexador(df["tipo_titulo"]), df["indexador"].astype(str))
+
+    if "vencimento" in df.columns and "data_vencimento" not in df.columns:
+        df["data_vencimento"] = pd.to_datetime(df["vencimento"])
+    else:
+        df["data_vencimento"] = pd.to_datetime(df["data_vencimento"])
+
+    ref_date = pd.to_datetime(df["data_base"].max()) if "data_base" in df.columns else pd.Timestamp.today()
+    df["ref_date"] = ref_date
+    df["prazo_anos"] = (df["data_vencimento"] - ref_date).dt.days / 365.25
+    df["ano_vencimento"] = df["data_vencimento"].dt.year
+
+    for c in ["taxa_compra", "pu_compra", "taxa_venda", "pu_venda"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(float)
+
+    df["minimo_compra"] = np.where(df["pu_compra"].notna(), np.maximum(30.0, df["pu_compra"] * 0.01), 0.0)
+
+    if "cupom_txt" not in df.columns:
+        juros = df["tipo_titulo"].astype(str).str.contains("Juros", regex=False)
+        df["cupom_txt"] = np.where(juros, "COM JUROS", "SEM CUPOM")
+    else:
+        df["cupom_txt"] = df["cupom_txt"].astype(str)
+
+    df["rentabilidade_texto"] = fmt_taxa(df[col_taxa], df["indexador"])
+    df["label_completo"] = df["tipo_titulo"].astype(str) + " | " + df["rentabilidade_texto"]
+    df["vencimento_txt"] = df["data_vencimento"].dt.strftime("%d/%m/%Y")
+    df["pu_txt"] = fmt_brl(df[col_pu]) if col_pu in df.columns else "-"
+    df["minimo_txt"] = fmt_brl(df["minimo_compra"])
+    return df
+
+
+def titulos_view(modo: str = "Compra") -> pd.DataFrame:
+    """
+    View-model do catálogo atual, memoizado por (versão no manifest, modo).
+    Cópia rasa: filtrar/adicionar colunas é seguro; não altere valores in-place.
+    """
+    from core.store import get_store
+
+    store = get_store()
+    chave = (store.version("tesouro_catalogo"), modo)
+    with _memo_lock:
+        hit = _memo.get(chave)
+    if hit is None:
+        hit = build_titulos_view(store.frame("tesouro_catalogo"), modo)
+        with _memo_lock:
+            # versões antigas saem do memo
+            for k in [k for k in _memo if k[0] != chave[0]]:
+                del _memo[k]
+            _memo[chave] = hit
+    return hit.copy(deep=False)
@@ -1,9 +1,30 @@
 from __future__ import annotations
+import numpy as np
 import pandas as pd
 
+from core.schemas import HISTORICO, apply_schema
+
 
 def _parse_vencimento(series: pd.Series) -> pd.Series:
-    return pd.to_datetime(series, dayfirst=True, errors="coerce")
+    return parse_datas(series)
+
+
+def parse_datas(series: pd.Series) -> pd.Series:
+    """
+    Converte datas 'DD/MM/AAAA' parseando só os valores únicos (o CSV do Tesouro
+    repete as mesmas poucas datas milhares de vezes) e espalhando pelos códigos.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques)
+    parsed = pd.to_datetime(uniques, format="%d/%m/%Y", errors="coerce")
+    falhas = parsed.isna() & uniques.notna()
+    if falhas.any():
+        parsed[falhas] = pd.to_datetime(uniques[falhas], dayfirst=True, errors="coerce")
+    values = parsed.to_numpy()
+    out = np.where(codes >= 0, values[np.clip(codes, 0, None)], np.datetime64("NaT"))
+    return pd.Series(out, index=series.index, dtype=parsed.dtype)
 
 
 def _infer_indexador(tipo_titulo: str) -> str:
@@ -22,6 +43,30 @@ def _has_cupom(tipo_titulo: str) -> bool:
     return "juros semestrais" in t
 
 
+_PREFIXO_ID = {"IPCA": "IPCA", "SELIC": "SELIC", "PREFIXADO": "PRE"}
+
+
+def id_titulo_de(tipo_titulo, data_vencimento) -> np.ndarray:
+    """
+    id_titulo do histórico (ex: IPCA_JS_2035) a partir do nome do título e do
+    vencimento, pela mesma regra de normalize_oferta. Serve para casar nomes
+    do catálogo/carteira com as séries do histórico.
+    """
+    tipos = pd.Series(np.asarray(tipo_titulo, dtype=object))
+    codes, unicos = pd.factorize(tipos)
+    prefix = np.array([_PREFIXO_ID.get(_infer_indexador(t), "OUTROS") for t in unicos] + ["OUTROS"], dtype=object)
+    suf = np.array(["JS" if _has_cupom(t) else "STD" for t in unicos] + ["STD"], dtype=object)
+    ano = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(np.asarray(data_vencimento)))).year
+    ano_txt = np.where(ano.isna(), "<NA>", ano.astype("Int64").astype(str)).astype(object)
+    return prefix[codes] + "_" + suf[codes] + "_" + ano_txt
+
+
+def _categorical_por_codigo(valores: np.ndarray, codes: np.ndarray) -> pd.Categorical:
+    """Equivale a valores[codes] como Categorical (categorias ordenadas), sem criar strings por linha."""
+    cats = sorted(set(valores))
+    return pd.Categorical.from_codes(pd.Categorical(valores, categories=cats).codes[codes], categories=cats)
+
+
 def normalize_oferta(df_raw: pd.DataFrame) -> pd.DataFrame:
     required = [
         "Tipo Titulo",
@@ -38,20 +83,40 @@ def normalize_oferta(df_raw: pd.DataFrame) -> pd.DataFrame:
 
     df = df_raw.copy()
 
-    df["Data Base"] = pd.to_datetime(df["Data Base"], dayfirst=True, errors="coerce")
+    df["Data Base"] = parse_datas(df["Data Base"])
     df["Data Vencimento"] = _parse_vencimento(df["Data Vencimento"])
 
-    df["indexador"] = df["Tipo Titulo"].map(_infer_indexador)
+    # Classificação vetorizada: as regras rodam uma vez por "Tipo Titulo" distinto
+    # e o resultado é espalhado pelas linhas via códigos do categorical.
+    tipo = df["Tipo Titulo"].astype("category")
+    df["Tipo Titulo"] = tipo  # segue categórico até o apply_schema (sem reclassificar strings)
+    tipos_unicos = list(tipo.cat.categories) + [None]  # último = tipo ausente (código -1)
+    codes = tipo.cat.codes.to_numpy().copy()
+    codes[codes < 0] = len(tipos_unicos) - 1
+
+    idx_por_tipo = np.array([_infer_indexador(t) for t in tipos_unicos], dtype=object)
+    cupom_por_tipo = np.array([_has_cupom(t) for t in tipos_unicos], dtype=bool)
+
+    cupom = cupom_por_tipo[codes]
+    df["indexador"] = _categorical_por_codigo(idx_por_tipo, codes)
     df["ano_vencimento"] = df["Data Vencimento"].dt.year
 
     # separar com/sem cupom
-    df["cupom"] = df["Tipo Titulo"].map(_has_cupom)
-    df["cupom_txt"] = df["cupom"].map(lambda x: "COM CUPOM" if x else "SEM CUPOM")
+    df["cupom"] = cupom
+    df["cupom_txt"] = pd.Categorical.from_codes(np.where(cupom, 0, 1), categories=["COM CUPOM", "SEM CUPOM"])
 
     # id do título (ex: IPCA_JS_2035, IPCA_STD_2035, SELIC_STD_2029, PRE_STD_2031)
-    prefix = df["indexador"].map({"IPCA": "IPCA", "SELIC": "SELIC", "PREFIXADO": "PRE"}).fillna("OUTROS")
-    suf = df["cupom"].map(lambda x: "JS" if x else "STD")
-    df["id_titulo"] = prefix + "_" + suf + "_" + df["ano_vencimento"].astype("Int64").astype(str)
+    # monta o texto só para cada par distinto (tipo, ano) e espalha pelos códigos
+    prefix = np.array([_PREFIXO_ID.get(i, "OUTROS") for i in idx_por_tipo], dtype=object)
+    suf = np.where(cupom_por_tipo, "JS", "STD").astype(object)
+    ano = df["ano_vencimento"].to_numpy(dtype="float64")
+    ano_key = np.where(np.isnan(ano), -1, ano).astype(np.int64)
+    par_codes, pares = pd.factorize(codes.astype(np.int64) * 100_000 + (ano_key + 1))
+    par_tipo = pares // 100_000
+    par_ano = pares % 100_000 - 1
+    ano_txt = np.array([str(a) if a >= 0 else "<NA>" for a in par_ano], dtype=object)
+    ids = prefix[par_tipo] + "_" + suf[par_tipo] + "_" + ano_txt
+    df["id_titulo"] = _categorical_por_codigo(ids, par_codes)
 
     # renomear colunas para padrão interno
     df = df.rename(
@@ -89,4 +154,5 @@ def normalize_oferta(df_raw: pd.DataFrame) -> pd.DataFrame:
         .reset_index(drop=True)
     )
 
-    return df
+    # dtypes compactos (categorias, datas sem hora, float32) já na saída
+    return apply_schema(df, HISTORICO)
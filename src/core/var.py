@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from core.mtm import PainelPrecos, painel_precos
+from core.portfolio import Portfolio
+from core.precificacao import price_from_yield_vec
+
+# VaR / Expected Shortfall da carteira atual, com reprecificação completa
+# (preço pelos fluxos baseline de precificacao, não aproximação por duration):
+# - histórico: cada variação diária (ou de h dias) das taxas de todos os títulos
+#   no histórico vira um cenário aplicado às posições de hoje;
+# - Monte Carlo: choques normais com a covariância das variações diárias.
+# Cenários x posições em uma matriz só (sem loop por cenário). O painel de taxas
+# vem de core.mtm: dia novo no histórico estende o painel em memória, e as
+# variações saem de um diff sobre ele (nada é recalculado do zero).
+
+NIVEIS = (0.95, 0.99)
+HORIZONTES = (1, 10)
+MIN_JANELAS = 100          # menos janelas de h dias que isso: choques de 1 dia x sqrt(h)
+N_CAMINHOS_MC = 10_000
+
+
+@dataclass
+class Posicoes:
+    data: pd.Timestamp      # último dia do histórico (base da reprecificação)
+    colunas: np.ndarray     # (P,) coluna do painel de cada título na carteira
+    valor: np.ndarray       # (P,) qtd x PU do dia
+    prazo: np.ndarray       # (P,) anos até o vencimento
+    taxa: np.ndarray        # (P,) % a.a. do dia
+    com_cupom: np.ndarray   # (P,) bool
+
+    @property
+    def total(self) -> float:
+        return float(self.valor.sum())
+
+
+def posicoes(carteira: Portfolio, painel: PainelPrecos) -> Posicoes:
+    """Lotes somados por título do painel, no último dia; vencidos e sem histórico ficam de fora."""
+    col = painel.colunas(carteira.titulo, carteira.vencimento) if len(painel.dias) else np.full(len(carteira), -1)
+    ok = col >= 0
+    S = painel.pu.shape[1]
+    qtd = np.bincount(col[ok], weights=carteira.qtd[ok], minlength=S)
+    if len(painel.dias) == 0:
+        vazio = np.empty(0)
+        return Posicoes(pd.NaT, np.empty(0, dtype=int), vazio, vazio, vazio, np.empty(0, dtype=bool))
+
+    hoje = painel.dias[-1]
+    venc = painel.series["data_vencimento"].to_numpy(dtype="datetime64[D]")
+    prazo = (venc - hoje).astype(float) / 365.25
+    cols = np.flatnonzero((qtd > 0) & (prazo > 0))
+    com_cupom = (painel.series["cupom_txt"].astype(str).str.upper().str.strip() == "COM CUPOM").to_numpy()
+    return Posicoes(
+        data=pd.Timestamp(hoje),
+        colunas=cols,
+        valor=qtd[cols] * painel.pu[-1, cols],
+        prazo=prazo[cols],
+        taxa=painel.taxa[-1, cols],
+        com_cupom=com_cupom[cols],
+    )
+
+
+def variacoes(painel: PainelPrecos, h: int = 1) -> np.ndarray:
+    """
+    (K, S) variações das taxas (p.p.) em janelas de h dias (sobrepostas).
+    Série sem cotação numa das pontas recebe a média das variações do mesmo
+    indexador naquele cenário (título novo ainda sem histórico anda com os pares).
+    """
+    D = len(painel.dias)
+    if D <= h:
+        return np.empty((0, painel.taxa.shape[1]))
+    dy = painel.taxa[h:] - painel.taxa[:-h]
+    valido = painel.observado[h:] & painel.observado[:-h]
+    cenario = valido.any(axis=1)
+    dy, valido = dy[cenario], valido[cenario]
+
+    dy = np.where(valido, dy, np.nan)
+    idx = painel.series["indexador"].astype(str).to_numpy()
+    for grupo in np.unique(idx):
+        g = idx == grupo
+        bloco = dy[:, g]
+        n = valido[:, g].sum(axis=1)
+        media = np.divide(np.nansum(bloco, axis=1), n, out=np.zeros(len(n)), where=n > 0)
+        dy[:, g] = np.where(valido[:, g], bloco, media[:, None])
+    return dy
+
+
+def reprecificar(pos: Posicoes, dy: np.ndarray) -> np.ndarray:
+    """(K, P) choques de taxa (p.p.) -> (K,) resultado da carteira em R$ em cada cenário."""
+    p0 = price_from_yield_vec(pos.prazo, pos.taxa / 100.0, pos.com_cupom)
+    p1 = price_from_yield_vec(pos.prazo[None, :], (pos.taxa[None, :] + dy) / 100.0, pos.com_cupom[None, :])
+    return (p1 / p0 - 1.0) @ pos.valor
+
+
+def var_es(pnl: np.ndarray, nivel: float) -> tuple[float, float]:
+    """VaR e ES (perdas positivas) do vetor de resultados ao nível dado."""
+    if len(pnl) == 0:
+        return float("nan"), float("nan")
+    corte = np.quantile(pnl, 1.0 - nivel)
+    return float(-corte), float(-pnl[pnl <= corte].mean())
+
+
+def _linhas(metodo, pnl, h, niveis, total, escalado) -> list[dict]:
+    out = []
+    for nivel in niveis:
+        v, e = var_es(pnl, nivel)
+        out.append({
+            "metodo": metodo, "horizonte": h, "nivel": nivel, "var": v, "es": e,
+            "var_pct": v / total if total > 0 else float("nan"),
+            "cenarios": len(pnl), "escalado": escalado,
+        })
+    return out
+
+
+def var_historico(pos: Posicoes, painel: PainelPrecos, niveis=NIVEIS, horizontes=HORIZONTES) -> pd.DataFrame:
+    """Simulação histórica: toda variação de h dias do histórico aplicada às posições de hoje."""
+    linhas = []
+    dy1 = variacoes(painel, 1)[:, pos.colunas]
+    for h in horizontes:
+        dy = variacoes(painel, h)[:, pos.colunas] if h > 1 else dy1
+        escalado = h > 1 and len(dy) < MIN_JANELAS
+        if escalado:
+            dy = dy1 * np.sqrt(h)
+        linhas += _linhas("Histórico", reprecificar(pos, dy), h, niveis, pos.total, escalado)
+    return pd.DataFrame(linhas)
+
+
+def var_monte_carlo(
+    pos: Posicoes,
+    painel: PainelPrecos,
+    niveis=NIVEIS,
+    horizontes=HORIZONTES,
+    n_caminhos: int = N_CAMINHOS_MC,
+    semente: int = 0,
+) -> pd.DataFrame:
+    """
+    Choques normais com a covariância das variações diárias dos títulos da
+    carteira (h dias: covariância x h, variações independentes entre dias).
+    """
+    dy1 = variacoes(painel, 1)[:, pos.colunas]
+    if len(dy1) < 2 or len(pos.colunas) == 0:
+        return pd.DataFrame(columns=["metodo", "horizonte", "nivel", "var", "es", "var_pct", "cenarios", "escalado"])
+    cov = np.atleast_2d(np.cov(dy1, rowvar=False))
+    # raiz da covariância por autovalores (amostra curta pode dar matriz só semidefinida)
+    w, v = np.linalg.eigh(cov)
+    raiz = v * np.sqrt(np.clip(w, 0.0, None))
+    z = np.random.default_rng(semente).standard_normal((n_caminhos, len(w))) @ raiz.T
+    linhas = []
+    for h in horizontes:
+        linhas += _linhas("Monte Carlo", reprecificar(pos, z * np.sqrt(h)), h, niveis, pos.total, False)
+    return pd.DataFrame(linhas)
+
+
+def var_carteira(
+    carteira: Portfolio,
+    painel: PainelPrecos | None = None,
+    niveis=NIVEIS,
+    horizontes=HORIZONTES,
+    monte_carlo: bool = True,
+    n_caminhos: int = N_CAMINHOS_MC,
+    semente: int = 0,
+) -> pd.DataFrame:
+    """
+    Tabela VaR/ES: uma linha por método x horizonte (dias úteis) x nível.
+    attrs: data (base), valor (posições reprecificadas).
+    """
+    painel = painel_precos() if painel is None else painel
+    pos = posicoes(carteira, painel)
+    partes = [var_historico(pos, painel, niveis, horizontes)]
+    if monte_carlo:
+        partes.append(var_monte_carlo(pos, painel, niveis, horizontes, n_caminhos, semente))
+    out = pd.concat(partes, ignore_index=True)
+    out.attrs.update(data=pos.data, valor=pos.total)
+    return out
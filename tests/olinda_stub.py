@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+import json
+import threading
+
+# Servidor local no lugar da API Olinda: responde com páginas JSON gravadas.
+# Cada gravação tem o endpoint e os parâmetros OData ($filter, $top, $skip) da
+# requisição original; requisição sem gravação correspondente devolve 404.
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+CHAVES = ("$filter", "$top", "$skip")
+
+
+def _chave(endpoint: str, params: dict) -> tuple:
+    return (endpoint,) + tuple(str(params.get(k, "0" if k == "$skip" else "")) for k in CHAVES)
+
+
+def carregar_gravacoes(nome: str) -> dict[tuple, dict]:
+    dados = json.loads((FIXTURES / nome).read_text(encoding="utf-8"))
+    return {_chave(g["endpoint"], g["params"]): g["body"] for g in dados["gravacoes"]}
+
+
+@contextmanager
+def olinda_stub(nome: str = "olinda_expectativas.json"):
+    """Sobe o servidor numa thread; devolve (base_url, lista de requisições recebidas)."""
+    gravacoes = carregar_gravacoes(nome)
+    recebidas: list[dict] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+            params = dict(parse_qsl(url.query, keep_blank_values=True))
+            recebidas.append({"endpoint": endpoint, **params})
+            body = gravacoes.get(_chave(endpoint, params))
+            if body is None:
+                self.send_error(404, "sem gravação para a requisição")
+                return
+            dados = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json;charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/olinda/servico/Expectativas/versao/v1/odata", recebidas
+    finally:
+        server.shutdown()
+        server.server_close()
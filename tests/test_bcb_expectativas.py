@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from core.datasources.bcb_expectativas import fetch_expectativas_incremental
+from olinda_stub import olinda_stub
+
+
+def _historico(linhas):
+    return pd.DataFrame(linhas, columns=["data", "indicador", "ano", "mediana"]).assign(
+        data=lambda d: pd.to_datetime(d["data"])
+    )
+
+
+def test_serie_sem_historico_pagina_ate_pagina_incompleta():
+    with olinda_stub() as (url, recebidas):
+        df = fetch_expectativas_incremental(["IPCA"], [2026], historico=None, base_url=url, page_size=2)
+
+    assert [r.get("$skip", "0") for r in recebidas] == ["0", "2", "4"]
+    assert all("Data gt" not in r["$filter"] for r in recebidas)
+    assert len(df) == 5
+    assert df["data"].is_monotonic_increasing
+    assert df["data"].max() == pd.Timestamp("2026-01-16")
+    assert set(df["indicador"]) == {"IPCA"} and set(df["ano"]) == {2026}
+
+
+def test_incremental_filtra_pela_ultima_data_armazenada():
+    hist = _historico([("2026-01-02", "Selic", 2026, 12.25), ("2026-01-09", "Selic", 2026, 12.25)])
+    with olinda_stub() as (url, recebidas):
+        df = fetch_expectativas_incremental(["Selic"], [2026], historico=hist, base_url=url, page_size=2)
+
+    assert recebidas[0]["$filter"] == "Indicador eq 'Selic' and DataReferencia eq '2026' and Data gt '2026-01-09'"
+    assert df["data"].tolist() == [pd.Timestamp("2026-01-16")]
+    assert df["mediana"].tolist() == [12.25]
+
+
+def test_resposta_vazia_nao_e_erro():
+    hist = _historico([("2026-01-16", "Selic", 2027, 10.5)])
+    with olinda_stub() as (url, recebidas):
+        df = fetch_expectativas_incremental(["Selic"], [2027], historico=hist, base_url=url, page_size=2)
+
+    assert len(recebidas) == 1
+    assert df.empty
+    assert list(df.columns) == ["data", "mediana", "indicador", "ano"]
+
+
+def test_falha_http_levanta_em_vez_de_parecer_sem_dados():
+    with olinda_stub() as (url, _):
+        with pytest.raises(RuntimeError, match="IPCA 2031"):
+            fetch_expectativas_incremental(["IPCA"], [2026, 2031], historico=None, base_url=url, page_size=2)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from core.carteiras import CarteiraStore
+from core.portfolio import Portfolio
+
+
+def test_salvar_de_novo_sem_mudanca_nao_cria_revisao(tmp_path):
+    store = CarteiraStore(tmp_path)
+    carteira = Portfolio.vazio().adicionar(
+        ["Tesouro Prefixado 2031", "Tesouro IPCA+ 2035"],
+        ["PREFIXADO", "IPCA"],
+        np.array(["2031-01-01", "2035-05-15"], dtype="datetime64[D]"),
+        1.0,
+        500.0,
+        np.nan,   # taxa não informada
+        np.datetime64("NaT", "D"),   # data de compra ausente
+    )
+    salva = store.salvar("teste", carteira)
+    store.salvar("teste", salva)
+
+    hist = store.historico("teste")
+    assert len(hist) == 2
+    assert (hist["versao"] == 1).all()
+
+    editada = salva.editar([salva.lote[0]], qtd=3.0)
+    store.salvar("teste", editada)
+    assert store.historico("teste")["versao"].max() == 2
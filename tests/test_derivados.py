@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import core.manifest
+import core.store
+from core.derivados import Derivado, DerivadosGraph
+
+
+@pytest.fixture
+def fonte(monkeypatch):
+    """Dataset "base" do manifest simulado: hash de conteúdo e frame controlados pelo teste."""
+    estado = {"hash": "h1", "frame": pd.DataFrame({"x": [1.0, 2.0]})}
+    monkeypatch.setattr(core.manifest, "resolve", lambda nome: SimpleNamespace(content_hash=estado["hash"]))
+    monkeypatch.setattr(core.store, "get_store", lambda: SimpleNamespace(frame=lambda nome: estado["frame"]))
+    return estado
+
+
+def _grafo(tmp_path, chamadas, versao_dobro=1):
+    def dobro(inp):
+        chamadas.append("dobro")
+        return inp["base"].assign(x=inp["base"]["x"] * 2)
+
+    def soma(inp):
+        chamadas.append("soma")
+        return pd.DataFrame({"total": [inp["dobro"]["x"].sum()]})
+
+    return DerivadosGraph(
+        [Derivado("soma", ("dobro",), soma), Derivado("dobro", ("base",), dobro, versao=versao_dobro)],
+        base_dir=tmp_path,
+    )
+
+
+def test_constroi_em_ordem_e_nao_refaz_sem_mudanca(tmp_path, fonte):
+    chamadas = []
+    g = _grafo(tmp_path, chamadas)
+
+    assert g.dirty() == ["dobro", "soma"]
+    assert g.update() == ["dobro", "soma"]
+    assert g.get("soma")["total"].tolist() == [6.0]
+
+    # outro grafo (cold start) reaproveita o que está em disco
+    assert _grafo(tmp_path, chamadas).update() == []
+    assert chamadas == ["dobro", "soma"]
+
+
+def test_mudanca_na_entrada_suja_o_derivado_e_os_filhos(tmp_path, fonte):
+    chamadas = []
+    g = _grafo(tmp_path, chamadas)
+    g.update()
+
+    fonte["hash"], fonte["frame"] = "h2", pd.DataFrame({"x": [10.0]})
+    assert g.dirty() == ["dobro", "soma"]
+    assert g.get("soma")["total"].tolist() == [20.0]
+    assert g.dirty() == []
+
+
+def test_saida_igual_nao_refaz_os_filhos(tmp_path, fonte):
+    chamadas = []
+    g = _grafo(tmp_path, chamadas)
+    g.update()
+
+    # hash do manifest mudou, mas o conteúdo (e a saída de "dobro") não
+    fonte["hash"] = "h2"
+    assert g.update() == ["dobro"]
+
+
+def test_subir_versao_do_build_refaz(tmp_path, fonte):
+    _grafo(tmp_path, []).update()
+
+    chamadas = []
+    g = _grafo(tmp_path, chamadas, versao_dobro=2)
+    assert g.dirty() == ["dobro", "soma"]
+    assert g.update(["dobro"]) == ["dobro"]
+    assert g.dirty() == []
+    assert chamadas == ["dobro"]
+
+
+def test_saida_apagada_fica_suja(tmp_path, fonte):
+    g = _grafo(tmp_path, [])
+    g.update()
+    g.path("soma").unlink()
+    assert g.dirty() == ["soma"]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from core.mtm import montar_painel, mtm_historico
+from core.portfolio import Portfolio
+
+
+def historico():
+    dias = pd.to_datetime(["2026-01-05", "2026-01-06", "2026-01-07"])
+    linhas = []
+    for d, pu_pre, pu_ipca in zip(dias, [600.0, 605.0, 610.0], [2000.0, np.nan, 2020.0]):
+        linhas.append(("PRE_STD_2030", "Tesouro Prefixado", "PREFIXADO", "2030-01-01", d, pu_pre, 12.0))
+        if not np.isnan(pu_ipca):
+            linhas.append(("IPCA_STD_2035", "Tesouro IPCA+", "IPCA", "2035-05-15", d, pu_ipca, 7.0))
+    df = pd.DataFrame(linhas, columns=["id_titulo", "tipo_titulo", "indexador", "data_vencimento", "data_base", "pu_venda", "taxa_compra"])
+    df["data_vencimento"] = pd.to_datetime(df["data_vencimento"])
+    df["cupom_txt"] = "SEM CUPOM"
+    return df
+
+
+def carteira():
+    return Portfolio.vazio().adicionar(
+        ["Tesouro Prefixado 2030", "IPCA_STD_2035", "PRE_STD_2030", "Tesouro Renda+ 2065"],
+        ["PREFIXADO", "IPCA", "PREFIXADO", "OUTROS"],
+        np.array(["2030-01-01", "2035-05-15", "2030-01-01", "2065-12-15"], dtype="datetime64[D]"),
+        np.array([2.0, 1.0, 1.0, 1.0]),
+        np.array([590.0, 1990.0, 600.0, 100.0]),
+        10.0,
+        np.array(["2026-01-01", "2026-01-06", "2026-02-01", "2026-01-05"], dtype="datetime64[D]"),
+    )
+
+
+def test_mtm_historico_valor_custo_e_duration():
+    painel = montar_painel(historico())
+    serie = mtm_historico(carteira(), painel)
+
+    # lote 1 (antes do histórico) entra no 1º dia; lote 2 no dia da compra,
+    # com o PU do dia sem cotação preenchido pelo anterior
+    np.testing.assert_allclose(serie["valor"], [2 * 600.0, 2 * 605.0 + 2000.0, 2 * 610.0 + 2020.0])
+    np.testing.assert_allclose(serie["custo"], [1180.0, 3170.0, 3170.0])
+    np.testing.assert_allclose(serie["pnl"], serie["valor"] - serie["custo"])
+
+    pre, ipca = painel.colunas(["PRE_STD_2030", "IPCA_STD_2035"], ["2030-01-01", "2035-05-15"])
+    v_pre, v_ipca = 2 * painel.pu[:, pre], painel.pu[:, ipca] * (np.arange(3) >= 1)
+    esperado = (v_pre * painel.dmod[:, pre] + v_ipca * painel.dmod[:, ipca]) / (v_pre + v_ipca)
+    np.testing.assert_allclose(serie["duration"], esperado)
+    assert (serie["duration"] > 0).all()
+
+    assert serie.attrs["sem_historico"] == [4]
+    assert serie.attrs["apos_historico"] == [3]
+
+
+def test_painel_estendido_igual_ao_montado_de_uma_vez():
+    hist = historico()
+    dias = pd.to_datetime(hist["data_base"])
+    parcial = montar_painel(hist[dias < "2026-01-07"]).estender(hist[dias == "2026-01-07"])
+    inteiro = montar_painel(hist)
+
+    np.testing.assert_array_equal(parcial.dias, inteiro.dias)
+    np.testing.assert_allclose(parcial.pu, inteiro.pu)
+    np.testing.assert_allclose(parcial.dmod, inteiro.dmod)
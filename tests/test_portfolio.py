@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from core.portfolio import Portfolio
+from core.serie_index import SerieIndex
+
+
+def _carteira():
+    return Portfolio.vazio().adicionar(
+        ["Tesouro Prefixado 2031", "Tesouro IPCA+ 2035", "Tesouro Educa+ 2031"],
+        ["PREFIXADO", "IPCA", "OUTROS"],
+        np.array(["2031-01-01", "2035-05-15", "2031-12-15"], dtype="datetime64[D]"),
+        2.0,
+        500.0,
+        10.0,
+        pd.Timestamp("2026-01-02"),
+    )
+
+
+def _historico():
+    return SerieIndex.from_frame(pd.DataFrame({
+        "data_base": pd.to_datetime(["2026-01-05", "2026-01-06", "2026-01-05", "2026-01-05"]),
+        "id_titulo": ["PRE_STD_2031", "PRE_STD_2031", "IPCA_STD_2035", "OUTROS_STD_2031"],
+        "pu_venda": [600.0, 610.0, 0.0, 900.0],
+        "pu_compra": [601.0, 611.0, 2000.0, 901.0],
+    }))
+
+
+def test_valorizar_fora_do_catalogo_usa_ultimo_pu_do_historico():
+    catalogo = pd.DataFrame({"tipo_titulo": ["Tesouro IPCA+ 2035"], "pu_venda": [2100.0]})
+    val = _carteira().valorizar(catalogo, historico=_historico(), data="2026-01-10")
+
+    # catálogo primeiro; fora dele, último PU até a data; OUTROS_* (ambíguo) fica no custo
+    np.testing.assert_allclose(val["pu_atual"], [610.0, 2100.0, 500.0])
+    assert val.attrs["pu_historico"] == [1]
+
+
+def test_valorizar_historico_as_of_e_pu_zerado():
+    val = _carteira().valorizar(pd.DataFrame(), historico=_historico(), data="2026-01-05")
+
+    # pu_venda zerado (sem resgate no dia) cai para pu_compra
+    np.testing.assert_allclose(val["pu_atual"], [600.0, 2000.0, 500.0])
+    assert val.attrs["pu_historico"] == [1, 2]
+
+    antes = _carteira().valorizar(pd.DataFrame(), historico=_historico(), data="2026-01-02")
+    np.testing.assert_allclose(antes["pu_atual"], [500.0, 500.0, 500.0])
+    assert antes.attrs["pu_historico"] == []
+
+
+def test_risco_sem_metrica_estima_duration_pelo_lote():
+    from core.precificacao import modified_duration_vec
+
+    carteira = _carteira()
+    val = carteira.valorizar(pd.DataFrame())
+    metricas = pd.DataFrame({"tipo_titulo": ["Tesouro Prefixado 2031"], "duration_modified_anos": [4.2]})
+    r = carteira.risco(val, metricas, data="2026-01-02")
+
+    prazo = (carteira.vencimento[1:] - np.datetime64("2026-01-02")).astype(float) / 365.25
+    esperado = modified_duration_vec(prazo, np.full(2, 0.10), np.zeros(2, dtype=bool))
+    np.testing.assert_allclose(r["dmod_por_lote"], [4.2, *esperado])
+    assert (r["dmod_por_lote"] > 0).all()
+    assert r["dmod_estimado"] == [2, 3]
+
+    # sem derivado nenhum: todos estimados, nunca risco zero
+    vazio = carteira.risco(val, pd.DataFrame(), data="2026-01-02")
+    assert vazio["dmod_estimado"] == [1, 2, 3] and vazio["dv01"] > 0
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from core.refresh import RefreshResult, Stage, StageResult, _result_to_json, refresh_single_flight
+from core.storage import FileLock
+
+
+def _contador(liberar: threading.Event | None = None):
+    chamadas = []
+
+    def run():
+        chamadas.append(1)
+        if liberar is not None:
+            liberar.wait(5)
+        return {}
+
+    return chamadas, [Stage("lenta", run, label="Lenta")]
+
+
+def _em_thread(fn):
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault("r", fn()))
+    t.start()
+    return t, out
+
+
+def test_mesmo_processo_aguarda_o_refresh_em_voo(tmp_path):
+    liberar = threading.Event()
+    chamadas, stages = _contador(liberar)
+    kw = dict(stages=stages, lock_path=tmp_path / "r.lock", last_run_path=tmp_path / "last.json")
+
+    t1, r1 = _em_thread(lambda: refresh_single_flight(**kw))
+    while not chamadas:
+        time.sleep(0.01)
+    t2, r2 = _em_thread(lambda: refresh_single_flight(**kw))
+    time.sleep(0.05)
+    liberar.set()
+    t1.join(5)
+    t2.join(5)
+
+    assert len(chamadas) == 1
+    assert not r1["r"].joined and r2["r"].joined
+    assert r2["r"].stages["lenta"].ok
+    assert (tmp_path / "last.json").exists()
+
+
+def test_reaproveita_refresh_concluido_por_outro_processo(tmp_path):
+    chamadas, stages = _contador()
+    lock, last = tmp_path / "r.lock", tmp_path / "last.json"
+
+    # "outro processo" segura o lock, termina o refresh e grava o resultado
+    with FileLock(lock):
+        t, r = _em_thread(lambda: refresh_single_flight(stages, lock_path=lock, last_run_path=last))
+        time.sleep(0.05)
+        feito = RefreshResult({"lenta": StageResult("lenta", "Lenta", ok=True, seconds=1.5)}, 1.5, finished_at=time.time())
+        last.write_text(_result_to_json(feito), encoding="utf-8")
+    t.join(5)
+
+    assert chamadas == []
+    assert r["r"].joined
+    assert r["r"].stages["lenta"].seconds == 1.5
+
+
+def test_resultado_anterior_ao_pedido_nao_e_reaproveitado(tmp_path):
+    chamadas, stages = _contador()
+    last = tmp_path / "last.json"
+    velho = RefreshResult({"lenta": StageResult("lenta", "Lenta", ok=True)}, 0.1, finished_at=time.time() - 60)
+    last.write_text(_result_to_json(velho), encoding="utf-8")
+
+    r = refresh_single_flight(stages, lock_path=tmp_path / "r.lock", last_run_path=last)
+
+    assert chamadas == [1]
+    assert not r.joined
+
+
+def test_etapa_com_falha_registra_tempo_e_pula_dependentes(tmp_path):
+    def falha():
+        time.sleep(0.02)
+        raise RuntimeError("fora do ar")
+
+    stages = [Stage("a", falha), Stage("b", lambda: {}, depends_on=("a",))]
+    r = refresh_single_flight(stages, lock_path=tmp_path / "r.lock", last_run_path=tmp_path / "last.json")
+
+    assert not r.ok
+    assert r.stages["a"].error == "fora do ar" and r.stages["a"].seconds >= 0.02
+    assert r.stages["b"].skipped
@@ -0,0 +1,14 @@
+import numpy as np
+
+from core.simulador import _bissecao
+
+
+def test_bissecao_acha_raiz_por_problema():
+    alvo = np.array([0.1, 0.5])
+    np.testing.assert_allclose(_bissecao(lambda x: x - alvo, -0.5, 1.0, 2), alvo)
+
+
+def test_bissecao_sem_raiz_ou_nan_devolve_nan():
+    assert np.isnan(_bissecao(lambda x: x + 10.0, -0.5, 1.0, 1)).all()
+    # título sem taxa: f é NaN nos extremos
+    assert np.isnan(_bissecao(lambda x: x * np.nan, -0.5, 1.0, 2)).all()
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from core.mtm import montar_painel
+from core.portfolio import Portfolio
+from core.precificacao import price_from_yield_vec
+from core.var import posicoes, reprecificar, var_carteira, var_es, var_historico, variacoes
+
+
+def _painel(dias=30):
+    rng = np.random.default_rng(7)
+    datas = pd.bdate_range("2026-01-05", periods=dias)
+    linhas = []
+    for id_titulo, tipo, indexador, venc, taxa0 in [
+        ("PRE_STD_2030", "Tesouro Prefixado", "PREFIXADO", "2030-01-01", 12.0),
+        ("IPCA_STD_2035", "Tesouro IPCA+", "IPCA", "2035-05-15", 7.0),
+    ]:
+        taxas = taxa0 + np.cumsum(rng.normal(0.0, 0.05, dias))
+        for d, t in zip(datas, taxas):
+            linhas.append((id_titulo, tipo, indexador, pd.Timestamp(venc), d, 1000.0, t))
+    df = pd.DataFrame(linhas, columns=["id_titulo", "tipo_titulo", "indexador", "data_vencimento", "data_base", "pu_venda", "taxa_compra"])
+    df["cupom_txt"] = "SEM CUPOM"
+    return montar_painel(df)
+
+
+def _carteira():
+    return Portfolio.vazio().adicionar(
+        ["PRE_STD_2030", "Tesouro IPCA+ 2035", "PRE_STD_2030"],
+        ["PREFIXADO", "IPCA", "PREFIXADO"],
+        np.array(["2030-01-01", "2035-05-15", "2030-01-01"], dtype="datetime64[D]"),
+        np.array([2.0, 1.0, 3.0]),
+        1000.0,
+        10.0,
+        pd.Timestamp("2026-01-02"),
+    )
+
+
+def test_var_es_vetor_conhecido():
+    pnl = np.arange(-50.0, 50.0)
+    v, e = var_es(pnl, 0.95)
+
+    # quantil 5% interpolado: -50 + 0.05 * 99; ES = média das perdas além dele
+    np.testing.assert_allclose(v, 45.05)
+    np.testing.assert_allclose(e, 48.0)
+    assert all(np.isnan(var_es(np.empty(0), 0.95)))
+
+
+def test_reprecificar_pelos_precos_dos_fluxos():
+    painel = _painel()
+    pos = posicoes(_carteira(), painel)
+
+    # lotes do mesmo título somados; valor = qtd x PU do último dia
+    np.testing.assert_allclose(np.sort(pos.valor), [1000.0, 5000.0])
+
+    dy = np.array([[0.0, 0.0], [1.0, 1.0], [-1.0, 0.5]])
+    pnl = reprecificar(pos, dy)
+    p0 = price_from_yield_vec(pos.prazo, pos.taxa / 100.0, pos.com_cupom)
+    p1 = price_from_yield_vec(pos.prazo, (pos.taxa + dy[2]) / 100.0, pos.com_cupom)
+    assert pnl[0] == 0.0 and pnl[1] < 0.0
+    np.testing.assert_allclose(pnl[2], (p1 / p0 - 1.0) @ pos.valor)
+
+
+def test_var_historico_usa_as_variacoes_do_painel():
+    painel = _painel()
+    pos = posicoes(_carteira(), painel)
+    tabela = var_historico(pos, painel, niveis=(0.95,), horizontes=(1, 10))
+
+    um_dia = tabela[tabela["horizonte"] == 1].iloc[0]
+    v, e = var_es(reprecificar(pos, variacoes(painel, 1)[:, pos.colunas]), 0.95)
+    np.testing.assert_allclose([um_dia["var"], um_dia["es"]], [v, e])
+    assert um_dia["cenarios"] == 29 and not um_dia["escalado"]
+    np.testing.assert_allclose(um_dia["var_pct"], v / 6000.0)
+
+    # 20 janelas de 10 dias < MIN_JANELAS: choques de 1 dia x sqrt(10)
+    dez = tabela[tabela["horizonte"] == 10].iloc[0]
+    assert dez["escalado"] and dez["cenarios"] == 29
+    assert dez["var"] > um_dia["var"] > 0
+
+
+def test_monte_carlo_reprodutivel_pela_semente():
+    painel = _painel()
+    a = var_carteira(_carteira(), painel, horizontes=(1,), n_caminhos=2_000, semente=1)
+    b = var_carteira(_carteira(), painel, horizontes=(1,), n_caminhos=2_000, semente=1)
+    c = var_carteira(_carteira(), painel, horizontes=(1,), n_caminhos=2_000, semente=2)
+
+    mc = a["metodo"] == "Monte Carlo"
+    pd.testing.assert_frame_equal(a, b)
+    assert not np.allclose(a.loc[mc, "var"], c.loc[mc, "var"])
+    assert (a.loc[mc, "cenarios"] == 2_000).all()
+    assert a.attrs["valor"] == 6000.0